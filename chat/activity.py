@@ -0,0 +1,57 @@
+# Denormalised last-message pointer on Chat
+# Every new ChatMessage moves its chat's last_message / last_message_at / preview forward
+# with one conditional UPDATE, so the chat list is a single query sorted by activity.
+# backfill_last_messages() recomputes the pointer from the messages themselves and is
+# used by the backfill_chat_activity command (the migrations keep their own copies).
+# REF-005: Django ORM - update(), Subquery() and OuterRef()
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+PREVIEW_LENGTH = 255
+
+
+def preview_for(content):
+    return (content or '')[:PREVIEW_LENGTH]
+
+
+# Point the chat at message unless it already points at a newer one
+def record_message(message, chat_model=None):
+    if chat_model is None:
+        from .models import Chat as chat_model
+    return (
+        chat_model.objects.filter(pk=message.chat_id)
+        .filter(
+            Q(last_message_at__isnull=True)
+            | Q(last_message_at__lt=message.timestamp)
+            | Q(last_message_at=message.timestamp, last_message_id__lt=message.pk)
+        )
+        .update(
+            last_message_id=message.pk,
+            last_message_at=message.timestamp,
+            last_message_preview=preview_for(message.content),
+        )
+    )
+
+
+# Recompute the pointer for chats (all of them by default) from their newest message
+# Runs one UPDATE per chunk of chat ids; returns the number of chats updated
+def backfill_last_messages(chats=None, chat_model=None, message_model=None, chunk_size=1000):
+    if chat_model is None:
+        from .models import Chat as chat_model
+    if message_model is None:
+        from .models import ChatMessage as message_model
+    if chats is None:
+        chats = chat_model.objects.all()
+    latest = message_model.objects.filter(chat_id=OuterRef('pk')).order_by('-timestamp', '-id')
+    ids = list(chats.order_by('pk').values_list('pk', flat=True))
+    updated = 0
+    for start in range(0, len(ids), chunk_size):
+        updated += chat_model.objects.filter(pk__in=ids[start:start + chunk_size]).update(
+            last_message_id=Subquery(latest.values('id')[:1]),
+            last_message_at=Subquery(latest.values('timestamp')[:1]),
+            last_message_preview=Coalesce(
+                Subquery(latest.annotate(preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')[:1]),
+                Value(''),
+            ),
+        )
+    return updated
@@ -4,10 +4,10 @@ from .models import Chat, ChatMessage
 # REF-001: Django Admin - ModelAdmin class
 @admin.register(Chat)
 class ChatAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user1', 'user2', 'status', 'created_at', 'completed_at')
+    list_display = ('id', 'user1', 'user2', 'status', 'created_at', 'last_message_at', 'completed_at')
     list_filter = ('status', 'created_at')
     search_fields = ('user1__username', 'user2__username')
-    readonly_fields = ('created_at', 'completed_at')
+    readonly_fields = ('created_at', 'completed_at', 'last_message', 'last_message_at', 'last_message_preview')
 
 
 @admin.register(ChatMessage)
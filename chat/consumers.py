@@ -0,0 +1,62 @@
+# WebSocket endpoint for live chat: /ws/chat/<username>/
+# The socket joins the chat's channel layer group. Messages typed by the user are saved
+# through post_message() (one insert) and every message sent to the chat, from either
+# participant or from the form POST fallback, is pushed to both open pages.
+# Client frames: {"message": "text"}
+# Server frames: {"type": "chat.message", "id", "chat", "sender", "content", "timestamp"}
+#                {"type": "chat.status", "status": "job_done"}
+import asyncio
+
+from django.contrib.auth.models import User
+
+from core.layers import get_channel_layer
+from core.websocket import CLOSE_FORBIDDEN, CLOSE_NOT_FOUND, database_sync_to_async
+from .messaging import ChatClosed, chat_group, get_active_chat, post_message
+
+MAX_MESSAGE_LENGTH = 5000
+
+
+def _open_chat(user, username):
+    receiver = User.objects.filter(username=username).first()
+    if receiver is None or receiver == user:
+        return None, None
+    return receiver, get_active_chat(user, receiver)
+
+
+async def chat_socket(socket):
+    user = socket.user
+    if not user.is_authenticated:
+        await socket.close(CLOSE_FORBIDDEN)
+        return
+    receiver, chat = await database_sync_to_async(_open_chat)(user, socket.kwargs['username'])
+    if chat is None:
+        await socket.close(CLOSE_NOT_FOUND)
+        return
+
+    await socket.accept()
+    async with get_channel_layer().subscribe(chat_group(chat.id)) as subscription:
+        incoming = asyncio.ensure_future(socket.receive_json())
+        pushed = asyncio.ensure_future(subscription.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait({incoming, pushed}, return_when=asyncio.FIRST_COMPLETED)
+                if pushed in done:
+                    event = pushed.result()
+                    await socket.send_json(event)
+                    if event.get('type') == 'chat.status' and event.get('status') != 'active':
+                        return
+                    pushed = asyncio.ensure_future(subscription.get())
+                if incoming in done:
+                    data = incoming.result()
+                    content = data.get('message') if isinstance(data, dict) else None
+                    if isinstance(content, str) and content.strip():
+                        try:
+                            await database_sync_to_async(post_message)(chat, user, receiver, content[:MAX_MESSAGE_LENGTH])
+                        except ChatClosed as exc:
+                            # Closed since the socket opened - the page reloads into a new chat
+                            await socket.send_json({'type': 'chat.status', 'status': exc.status})
+                            return
+                    incoming = asyncio.ensure_future(socket.receive_json())
+        finally:
+            incoming.cancel()
+            pushed.cancel()
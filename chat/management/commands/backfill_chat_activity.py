@@ -0,0 +1,21 @@
+# Recompute the last-message pointer (last_message, last_message_at, preview) on chats
+# Usage: python manage.py backfill_chat_activity [--chunk-size 1000] [--only-missing]
+from django.core.management.base import BaseCommand
+
+from chat.activity import backfill_last_messages
+from chat.models import Chat
+
+
+class Command(BaseCommand):
+    help = 'Backfill the denormalised last message of each chat from its messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Chats updated per statement')
+        parser.add_argument('--only-missing', action='store_true', help='Skip chats that already have a last message')
+
+    def handle(self, *args, **options):
+        chats = Chat.objects.all()
+        if options['only_missing']:
+            chats = chats.filter(last_message__isnull=True)
+        updated = backfill_last_messages(chats, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} chats.'))
@@ -0,0 +1,115 @@
+# Sending chat messages and pushing them to open chat pages
+# post_message() is the single write path for the form POST and the WebSocket
+# (chat/consumers.py): one ChatMessage insert plus the receiver's notification, then
+# once the transaction commits the message is published on the chat's channel layer
+# group so both participants' sockets append it without reloading the page.
+# get_active_chat() is the single lookup of a pair's active conversation and
+# close_chat() the single way a conversation is marked JobDone.
+# REF-005: Django ORM - create(), filter(), select_for_update()
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.layers import get_channel_layer
+from users.outbox import notify
+from .models import Chat, ChatMessage
+
+
+# Raised by post_message() for a chat that is no longer active
+class ChatClosed(Exception):
+    def __init__(self, chat, status):
+        super().__init__(f'Chat {chat.id} is {status}')
+        self.chat = chat
+        self.status = status
+
+
+def chat_group(chat_id):
+    return f'chat.{chat_id}'
+
+
+# Chats store their participants in a fixed order (user1 has the lower id, enforced by
+# chat_participants_ordered) so one conversation has a single key whichever side opens it
+def participant_pair(user, other):
+    return (user, other) if user.id < other.id else (other, user)
+
+
+# The active chat between two users, or None - a point read on chat_one_active_per_pair
+def find_active_chat(user, other):
+    low, high = participant_pair(user, other)
+    return Chat.objects.filter(user1=low, user2=high, status='active').first()
+
+
+# Find or create the active chat between two users
+# A chat marked as JobDone is left alone and a new one is started. Two requests racing
+# to start the same conversation both try the insert; the partial unique index lets one
+# win and the other reads the winner's row, so there is never more than one active chat.
+def get_active_chat(user, other):
+    chat = find_active_chat(user, other)
+    if chat is not None:
+        return chat
+    low, high = participant_pair(user, other)
+    try:
+        # Savepoint so a lost race doesn't break the caller's transaction
+        with transaction.atomic():
+            return Chat.objects.create(user1=low, user2=high, status='active')
+    except IntegrityError:
+        return Chat.objects.get(user1=low, user2=high, status='active')
+
+
+def message_payload(message):
+    return {
+        'type': 'chat.message',
+        'id': message.id,
+        'chat': message.chat_id,
+        'sender': message.sender.username,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+# Save a message to an active chat (ChatClosed otherwise) and notify the receiver
+# The chat row is locked so a message can't land after close_chat() has committed
+def post_message(chat, sender, receiver, content):
+    with transaction.atomic():
+        status = Chat.objects.select_for_update().filter(pk=chat.pk).values_list('status', flat=True).first()
+        if status != 'active':
+            raise ChatClosed(chat, status)
+        message = ChatMessage.objects.create(
+            chat=chat,
+            sender=sender,
+            receiver=receiver,
+            content=content
+        )
+        # Create notification for the receiver and queue the email in the same transaction
+        # REF-028: ChatGPT - Notification creation for messages
+        # REF-008: Django Email Backend - sent by the send_outbound_email worker
+        notify(
+            receiver,
+            'message',
+            f'New message from {sender.get_full_name() or sender.username}',
+            link=f'/chat/{sender.username}/',
+            # Messages from one sender collect in one unread notification
+            source=f'/chat/{sender.username}/',
+            email_subject=f'New Message from {sender.get_full_name() or sender.username}',
+            email_body=(
+                f'You have received a new message from {sender.get_full_name() or sender.username}.\n\n'
+                f'Message: {content[:100]}{"..." if len(content) > 100 else ""}\n\n'
+                f'View the full conversation in your dashboard.'
+            ),
+        )
+        payload = message_payload(message)
+        transaction.on_commit(lambda: get_channel_layer().group_send(chat_group(chat.id), payload))
+    return message
+
+
+# Tell open chat pages the conversation was closed (they reload into the new chat)
+def publish_status(chat):
+    get_channel_layer().group_send(chat_group(chat.id), {'type': 'chat.status', 'status': chat.status})
+
+
+# Mark a chat as JobDone; open chat pages are told once the change commits
+def close_chat(chat):
+    with transaction.atomic():
+        chat.status = 'job_done'
+        chat.completed_at = timezone.now()
+        chat.save()
+        transaction.on_commit(lambda: publish_status(chat))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+# Frozen copy of chat.activity.backfill_last_messages() as of this migration, so later
+# changes to the app code don't change what it does
+PREVIEW_LENGTH = 255
+
+
+def backfill_last_messages(Chat, ChatMessage, chats, chunk_size=1000):
+    latest = ChatMessage.objects.filter(chat_id=OuterRef('pk')).order_by('-timestamp', '-id')
+    ids = list(chats.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        Chat.objects.filter(pk__in=ids[start:start + chunk_size]).update(
+            last_message_id=Subquery(latest.values('id')[:1]),
+            last_message_at=Subquery(latest.values('timestamp')[:1]),
+            last_message_preview=Coalesce(
+                Subquery(latest.annotate(preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')[:1]),
+                Value(''),
+            ),
+        )
+
+
+def backfill_chat_activity(apps, schema_editor):
+    """Point every existing chat at its newest message"""
+    Chat = apps.get_model('chat', 'Chat')
+    backfill_last_messages(Chat, apps.get_model('chat', 'ChatMessage'), Chat.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_chat_chatmessage_chat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chat',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chat',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['user1', 'status', '-last_message_at'], name='chat_user1_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chat',
+            index=models.Index(fields=['user2', 'status', '-last_message_at'], name='chat_user2_activity_idx'),
+        ),
+        migrations.RunPython(
+            code=backfill_chat_activity,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
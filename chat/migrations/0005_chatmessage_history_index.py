@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chat_last_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['chat', 'timestamp', 'id'], name='chat_message_history_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:59
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+# Frozen copy of chat.activity.backfill_last_messages() as of this migration, so later
+# changes to the app code don't change what it does
+PREVIEW_LENGTH = 255
+
+
+def backfill_last_messages(Chat, ChatMessage, chats):
+    latest = ChatMessage.objects.filter(chat_id=OuterRef('pk')).order_by('-timestamp', '-id')
+    chats.update(
+        last_message_id=Subquery(latest.values('id')[:1]),
+        last_message_at=Subquery(latest.values('timestamp')[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')[:1]),
+            Value(''),
+        ),
+    )
+
+
+def canonicalise_chats(apps, schema_editor):
+    """Store every pair low id first and merge duplicate active chats into the oldest"""
+    Chat = apps.get_model('chat', 'Chat')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    # Both columns are assigned from the row's old values in one UPDATE
+    Chat.objects.filter(user1_id__gt=F('user2_id')).update(user1_id=F('user2_id'), user2_id=F('user1_id'))
+    # Chats with yourself can't be opened from the views
+    Chat.objects.filter(user1_id=F('user2_id')).delete()
+
+    duplicated = (
+        Chat.objects.filter(status='active').values('user1_id', 'user2_id')
+        .annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for pair in duplicated:
+        ids = list(
+            Chat.objects.filter(status='active', user1_id=pair['user1_id'], user2_id=pair['user2_id'])
+            .order_by('created_at', 'id').values_list('id', flat=True)
+        )
+        keep, merged = ids[0], ids[1:]
+        ChatMessage.objects.filter(chat_id__in=merged).update(chat_id=keep)
+        Chat.objects.filter(id__in=merged).delete()
+        backfill_last_messages(Chat, ChatMessage, Chat.objects.filter(id=keep))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_chatmessage_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=canonicalise_chats,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
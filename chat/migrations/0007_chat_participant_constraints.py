@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Separate from 0006 so the constraints are added after the data fix has committed
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_chat_participant_pair'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='chat',
+            constraint=models.CheckConstraint(condition=models.Q(('user1__lt', models.F('user2'))), name='chat_participants_ordered'),
+        ),
+        migrations.AddConstraint(
+            model_name='chat',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('user1', 'user2'), name='chat_one_active_per_pair'),
+        ),
+    ]
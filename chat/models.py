@@ -9,6 +9,8 @@ from django.contrib.auth.models import User
 # Chat conversation model - represents a conversation between two users
 # When a job is completed and verified, the chat is marked as "JobDone"
 # Future messages between the same users create a new chat
+# user1 is always the participant with the lower id (save() orders them) and a pair has
+# at most one active chat; look chats up with chat.messaging.get_active_chat()
 # REF-001: Django Models Documentation - Model definition with choices field
 class Chat(models.Model):
     STATUS_CHOICES = [
@@ -21,17 +23,39 @@ class Chat(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
+    # Latest message, kept up to date when a ChatMessage is created (see chat/activity.py)
+    # so the chat list doesn't look up the last message of every chat
+    last_message = models.ForeignKey(
+        'ChatMessage', related_name='+', on_delete=models.SET_NULL, blank=True, null=True,
+    )
+    last_message_at = models.DateTimeField(blank=True, null=True)
+    last_message_preview = models.CharField(max_length=255, blank=True, default='')
     
     class Meta:
         ordering = ['-created_at']
         # Ensure we can query chats efficiently
         indexes = [
             models.Index(fields=['user1', 'user2', 'status']),
+            # Chat list: a user's active chats by most recent activity
+            models.Index(fields=['user1', 'status', '-last_message_at'], name='chat_user1_activity_idx'),
+            models.Index(fields=['user2', 'status', '-last_message_at'], name='chat_user2_activity_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(user1__lt=models.F('user2')), name='chat_participants_ordered'),
+            # Partial unique index: one active chat per pair, also the index get_active_chat() reads
+            models.UniqueConstraint(
+                fields=['user1', 'user2'], condition=models.Q(status='active'), name='chat_one_active_per_pair',
+            ),
         ]
     
     def __str__(self):
         return f"Chat: {self.user1.username} ↔ {self.user2.username} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        if self.user1_id is not None and self.user2_id is not None and self.user1_id > self.user2_id:
+            self.user1, self.user2 = self.user2, self.user1
+        super().save(*args, **kwargs)
+
     def get_other_user(self, current_user):
         """Helper to get the other user in the chat"""
         return self.user2 if self.user1 == current_user else self.user1
@@ -46,6 +70,10 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']  # Oldest messages first (for chat display)
+        indexes = [
+            # Chat history windows: newest messages of a chat, paged by (timestamp, id)
+            models.Index(fields=['chat', 'timestamp', 'id'], name='chat_message_history_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username} → {self.receiver.username}: {self.content[:20]}"
@@ -0,0 +1,22 @@
+# Signal handlers for the chat app
+# Keeps the denormalised last-message pointer on Chat in step with ChatMessage writes
+# REF-005: Django ORM - update() (see chat/activity.py)
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .activity import backfill_last_messages, record_message
+from .models import Chat, ChatMessage
+
+
+@receiver(post_save, sender=ChatMessage)
+def update_last_message(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        record_message(instance)
+
+
+# Deleting the latest message points the chat back at the one before it
+@receiver(post_delete, sender=ChatMessage)
+def reset_last_message(sender, instance, **kwargs):
+    chats = Chat.objects.filter(pk=instance.chat_id, last_message_id__isnull=True, last_message_at__isnull=False)
+    if chats.exists():
+        backfill_last_messages(chats)
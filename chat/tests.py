@@ -1,3 +1,281 @@
-from django.test import TestCase
+import json
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from jobs.models import Job, JobRequest
+from users.models import Profile
+from . import messaging
+from .models import Chat, ChatMessage
+
+
+class ChatLastMessageTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.others = [User.objects.create_user(username=f'user{i}', password='pw') for i in range(3)]
+        self.chats = [Chat.objects.create(user1=self.alice, user2=other) for other in self.others]
+
+    def _send(self, chat, content):
+        return ChatMessage.objects.create(
+            chat=chat, sender=chat.user1, receiver=chat.user2, content=content,
+        )
+
+    def test_new_message_moves_pointer(self):
+        first = self._send(self.chats[0], 'Hello')
+        second = self._send(self.chats[0], 'x' * 300)
+        chat = Chat.objects.get(pk=self.chats[0].pk)
+        self.assertEqual(chat.last_message, second)
+        self.assertEqual(chat.last_message_at, second.timestamp)
+        self.assertEqual(chat.last_message_preview, 'x' * 255)
+
+        second.delete()
+        chat.refresh_from_db()
+        self.assertEqual((chat.last_message, chat.last_message_preview), (first, 'Hello'))
+
+    def test_list_is_one_query_sorted_by_activity(self):
+        for chat in (self.chats[1], self.chats[0], self.chats[2], self.chats[0]):
+            self._send(chat, f'to {chat.user2.username}')
+        self.client.force_login(self.alice)
+        self.client.get(reverse('chat_list'))  # warm the session
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('chat_list'))
+        chat_queries = [q for q in queries if 'chat_chat' in q['sql'] or 'chat_chatmessage' in q['sql']]
+        self.assertEqual(len(chat_queries), 1)
+        order = [item['other_user'].username for item in response.context['chat_data']]
+        self.assertEqual(order, ['user0', 'user2', 'user1'])
+
+    def test_backfill_command(self):
+        message = self._send(self.chats[1], 'Backfilled')
+        Chat.objects.update(last_message=None, last_message_at=None, last_message_preview='')
+        call_command('backfill_chat_activity', chunk_size=2, stdout=StringIO())
+        chat = Chat.objects.get(pk=self.chats[1].pk)
+        self.assertEqual((chat.last_message, chat.last_message_preview), (message, 'Backfilled'))
+        self.assertIsNone(Chat.objects.get(pk=self.chats[0].pk).last_message_at)
+
+
+
+@override_settings(CHAT_HISTORY_WINDOW=3)
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        self.chat = Chat.objects.create(user1=self.alice, user2=self.bob)
+        for i in range(7):
+            ChatMessage.objects.create(chat=self.chat, sender=self.alice, receiver=self.bob, content=f'm{i}')
+        self.client.force_login(self.bob)
+
+    def test_page_renders_latest_window_then_older_windows(self):
+        response = self.client.get(reverse('chat_detail', args=['alice']))
+        self.assertEqual([m.content for m in response.context['messages']], ['m4', 'm5', 'm6'])
+
+        url = reverse('chat_history', args=[self.chat.id])
+        data = self.client.get(url, {'cursor': response.context['older_cursor']}).json()
+        self.assertEqual([m['content'] for m in data['results']], ['m1', 'm2', 'm3'])
+        data = self.client.get(url, {'cursor': data['cursor']}).json()
+        self.assertEqual(([m['content'] for m in data['results']], data['cursor']), (['m0'], None))
+
+    def test_form_post_skips_the_history_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('chat_detail', args=['alice']), {'message': 'Thanks'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and 'FROM "chat_chatmessage"' in q['sql']])
+        self.assertEqual(ChatMessage.objects.filter(content='Thanks').count(), 1)
+
+    def test_history_is_private_to_participants(self):
+        self.client.force_login(User.objects.create_user(username='eve', password='pw'))
+        response = self.client.get(reverse('chat_history', args=[self.chat.id]))
+        self.assertEqual(response.status_code, 403)
+
+
+# Chat pages over the ASGI WebSocket endpoint (core/asgi.py -> chat/consumers.py)
+# TransactionTestCase so messages are published when their transaction commits
+class ChatWebSocketTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+
+    def _cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        return f'sessionid={client.cookies["sessionid"].value}'.encode()
+
+    def _socket(self, path, user=None, origin=None):
+        from core.asgi import application
+        headers = [(b'host', b'testserver')]
+        if user is not None:
+            headers.append((b'cookie', self._cookie(user)))
+        if origin is not None:
+            headers.append((b'origin', origin.encode()))
+        scope = {'type': 'websocket', 'path': path, 'headers': headers, 'subprotocols': []}
+        return ApplicationCommunicator(application, scope)
+
+    async def _connect(self, socket):
+        await socket.send_input({'type': 'websocket.connect'})
+        return await socket.receive_output(timeout=5)
+
+    async def _next_frame(self, socket):
+        return json.loads((await socket.receive_output(timeout=5))['text'])
+
+    def test_message_is_pushed_to_both_participants(self):
+        alice = self._socket('/ws/chat/bob/', self.alice)
+        bob = self._socket('/ws/chat/alice/', self.bob)
+
+        async def run():
+            self.assertEqual((await self._connect(alice))['type'], 'websocket.accept')
+            self.assertEqual((await self._connect(bob))['type'], 'websocket.accept')
+            await alice.send_input({'type': 'websocket.receive', 'text': json.dumps({'message': 'Hi Bob'})})
+            for socket in (alice, bob):
+                frame = await self._next_frame(socket)
+                self.assertEqual((frame['type'], frame['sender'], frame['content']), ('chat.message', 'alice', 'Hi Bob'))
+            for socket in (alice, bob):
+                await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await socket.wait(timeout=5)
+
+        async_to_sync(run)()
+        message = ChatMessage.objects.get()
+        self.assertEqual((message.sender, message.receiver), (self.alice, self.bob))
+
+    def test_form_post_is_pushed_to_open_socket(self):
+        bob = self._socket('/ws/chat/alice/', self.bob)
+        client = Client()
+        client.force_login(self.alice)
+
+        async def run():
+            await self._connect(bob)
+            await sync_to_async(client.post)('/chat/bob/', {'message': 'Sent from the form'})
+            frame = await self._next_frame(bob)
+            self.assertEqual(frame['content'], 'Sent from the form')
+            await bob.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await bob.wait(timeout=5)
+
+        async_to_sync(run)()
+
+    def test_confirming_the_job_closes_open_sockets(self):
+        Profile.objects.create(user=self.alice, role='customer')
+        job = Job.objects.create(owner=self.bob, title='Fix tap', description='d', location='Cork')
+        job_request = JobRequest.objects.create(
+            job=job, customer=self.alice, message='m', status='awaiting_confirmation', confirmation_code='ABC123',
+        )
+        bob = self._socket('/ws/chat/alice/', self.bob)
+        client = Client()
+        client.force_login(self.alice)
+
+        async def run():
+            await self._connect(bob)
+            await sync_to_async(client.post)(
+                reverse('confirm_completion', args=[job_request.id]), {'confirmation_code': 'abc123'},
+            )
+            self.assertEqual(await self._next_frame(bob), {'type': 'chat.status', 'status': 'job_done'})
+            await bob.wait(timeout=5)
+
+        async_to_sync(run)()
+        self.assertEqual(Chat.objects.get().status, 'job_done')
+
+    def test_message_to_closed_chat_is_rejected(self):
+        chat = messaging.get_active_chat(self.alice, self.bob)
+        Chat.objects.filter(pk=chat.pk).update(status='job_done')
+        with self.assertRaises(messaging.ChatClosed):
+            messaging.post_message(chat, self.alice, self.bob, 'Too late')
+        self.assertFalse(ChatMessage.objects.exists())
+
+    def test_socket_database_calls_retire_old_connections(self):
+        alice = self._socket('/ws/chat/bob/', self.alice)
+
+        async def run():
+            await self._connect(alice)
+            await alice.send_input({'type': 'websocket.receive', 'text': json.dumps({'message': 'Hi'})})
+            await self._next_frame(alice)
+            await alice.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await alice.wait(timeout=5)
+
+        with mock.patch('core.websocket.close_old_connections') as close_old_connections:
+            async_to_sync(run)()
+        # Before and after each of the session lookup, opening the chat and the message save
+        self.assertEqual(close_old_connections.call_count, 6)
+
+    def test_rejected_connections(self):
+        async def run(socket):
+            return (await self._connect(socket))['type']
+
+        self.assertEqual(async_to_sync(run)(self._socket('/ws/chat/bob/')), 'websocket.close')
+        self.assertEqual(async_to_sync(run)(self._socket('/ws/chat/alice/', self.alice)), 'websocket.close')
+        self.assertEqual(async_to_sync(run)(self._socket('/ws/chat/nobody/', self.alice)), 'websocket.close')
+        evil = self._socket('/ws/chat/bob/', self.alice, origin='https://evil.example.com')
+        self.assertEqual(async_to_sync(run)(evil), 'websocket.close')
+
+
+# One active chat per pair of users, however the chat is opened
+class ActiveChatTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+
+    def test_pair_is_stored_in_order(self):
+        chat = messaging.get_active_chat(self.bob, self.alice)
+        self.assertEqual((chat.user1, chat.user2), (self.alice, self.bob))
+        self.assertEqual(messaging.get_active_chat(self.alice, self.bob), chat)
+        swapped = Chat(user1=self.bob, user2=self.alice, status='job_done')
+        swapped.save()
+        self.assertEqual(swapped.user1, self.alice)
+
+    def test_job_done_chat_starts_a_new_one(self):
+        chat = messaging.get_active_chat(self.alice, self.bob)
+        Chat.objects.filter(pk=chat.pk).update(status='job_done')
+        self.assertNotEqual(messaging.get_active_chat(self.bob, self.alice), chat)
+        self.assertEqual(Chat.objects.filter(status='active').count(), 1)
+
+    def test_request_losing_the_race_reads_the_winner(self):
+        winner = Chat.objects.create(user1=self.alice, user2=self.bob)
+        with mock.patch.object(messaging, 'find_active_chat', return_value=None):
+            self.assertEqual(messaging.get_active_chat(self.bob, self.alice), winner)
+        self.assertEqual(Chat.objects.count(), 1)
+
+    def test_parallel_requests_share_one_chat(self):
+        pairs = [(self.alice, self.bob), (self.bob, self.alice)] * 4
+        barrier = threading.Barrier(len(pairs))
+        chats, errors = [], []
+        find_active_chat = messaging.find_active_chat
+
+        waited = threading.local()
+
+        # Every request finishes its read (and misses) before any of them inserts
+        def find_then_wait(user, other):
+            chat = find_active_chat(user, other)
+            if not getattr(waited, 'done', False):
+                waited.done = True
+                barrier.wait()
+            return chat
+
+        def open_chat(user, other):
+            try:
+                for attempt in range(50):
+                    try:
+                        chats.append(messaging.get_active_chat(user, other))
+                        break
+                    except OperationalError as exc:
+                        # The test runner's in-memory SQLite reports a busy table instead of waiting
+                        if 'locked' not in str(exc):
+                            raise
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=open_chat, args=pair) for pair in pairs]
+        with mock.patch.object(messaging, 'find_active_chat', find_then_wait):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual((errors, len(chats)), ([], len(pairs)))
+        self.assertEqual({chat.pk for chat in chats}, {Chat.objects.get().pk})
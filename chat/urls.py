@@ -6,4 +6,5 @@ urlpatterns = [
     path('', views.chat_list, name='chat_list'),
     path('<str:username>/', views.chat_detail, name='chat_detail'),
     path('<int:chat_id>/job-done/', views.mark_chat_job_done, name='mark_chat_job_done'),
+    path('<int:chat_id>/messages/', views.chat_history, name='chat_history'),
 ]
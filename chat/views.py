@@ -3,13 +3,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Q
-from django.utils import timezone
+from django.db.models import F, Q
 from django.contrib import messages as django_messages
-from .models import ChatMessage, Chat
-from users.models import Notification
-from django.core.mail import send_mail
 from django.conf import settings
+from django.http import JsonResponse
+from .models import ChatMessage, Chat
+from .messaging import ChatClosed, close_chat, get_active_chat, message_payload, post_message
+from core.pagination import InvalidCursor, paginate_keyset
 
 
 # Shows list of all active chats the user has
@@ -21,33 +21,44 @@ from django.conf import settings
 # REF-021: Django ORM - select_related() for query optimization
 @login_required
 def chat_list(request):
-    # Get all active chats where user is involved
+    # Get all active chats where user is involved, most recently active first
+    # The last message is read from the chat row itself (see chat/activity.py),
+    # so this is one query however many conversations the user has
     chats = Chat.objects.filter(
         Q(user1=request.user) | Q(user2=request.user),
         status='active'
-    ).select_related('user1', 'user2').order_by('-created_at')
+    ).select_related('user1', 'user2').order_by(
+        F('last_message_at').desc(nulls_last=True), '-created_at'
+    )
 
-    # Get the other user and last message for each chat
+    # Get the other user for each chat
     chat_data = []
     for chat in chats:
-        other_user = chat.get_other_user(request.user)
-        last_message = ChatMessage.objects.filter(chat=chat).order_by('-timestamp').first()
         chat_data.append({
             'chat': chat,
-            'other_user': other_user,
-            'last_message': last_message,
+            'other_user': chat.get_other_user(request.user),
         })
 
     return render(request, 'chat/chat_list.html', {'chat_data': chat_data})
 
 
+# Newest-first keyset window of a chat's messages (index chat_message_history_idx)
+# next_cursor points at the next older window
+HISTORY_SORT_KEYS = ('-timestamp', '-id')
+
+
+def _history_page(chat, cursor):
+    messages = ChatMessage.objects.filter(chat=chat).select_related('sender')
+    window = getattr(settings, 'CHAT_HISTORY_WINDOW', 50)
+    return paginate_keyset(messages, HISTORY_SORT_KEYS, cursor, window)
+
+
 # Individual chat conversation view
 # Shows all messages in the active chat between current user and the specified user
 # Creates a new chat if the previous one was marked as JobDone
 # REF-003: Django Views - Function-based views
 # REF-005: Django ORM - filter(), get_or_create(), order_by()
 # REF-006: Django Decorators - @login_required
-# REF-010: Django Q Objects - OR condition for bidirectional messages
 # REF-018: Tom Dekan - Django chat app tutorial
 @login_required
 def chat_detail(request, username):
@@ -62,69 +73,52 @@ def chat_detail(request, username):
         django_messages.error(request, "You cannot message yourself.")
         return redirect('chat_list')
     
-    # Find or create an active chat between these two users
-    # Check both user1/user2 combinations since order doesn't matter
-    chat = Chat.objects.filter(
-        Q(user1=request.user, user2=receiver) | Q(user1=receiver, user2=request.user),
-        status='active'
-    ).first()
-    
-    # If no active chat exists, create a new one
-    if not chat:
-        chat, created = Chat.objects.get_or_create(
-            user1=request.user if request.user.id < receiver.id else receiver,
-            user2=receiver if request.user.id < receiver.id else request.user,
-            defaults={'status': 'active'}
-        )
-        # If chat exists but is marked as JobDone, create a new one
-        if not created and chat.status == 'job_done':
-            chat = Chat.objects.create(
-                user1=request.user if request.user.id < receiver.id else receiver,
-                user2=receiver if request.user.id < receiver.id else request.user,
-                status='active'
-            )
-    
-    # Get all messages in this chat, ordered chronologically
-    chat_messages = ChatMessage.objects.filter(chat=chat).order_by('timestamp')
+    # Find or create the active chat between these two users (one per pair, race-safe)
+    chat = get_active_chat(request.user, receiver)
 
     # Handle sending a new message
     if request.method == 'POST':
         content = request.POST.get('message')
         if content:
+            # Form fallback for pages without a WebSocket - same write path as chat/consumers.py
             # REF-005: Django ORM - create() method
-            ChatMessage.objects.create(
-                chat=chat,
-                sender=request.user,
-                receiver=receiver,
-                content=content
-            )
-            # Create notification for the receiver
-            # REF-028: ChatGPT - Notification creation for messages
-            Notification.objects.create(
-                user=receiver,
-                notification_type='message',
-                message=f'New message from {request.user.get_full_name() or request.user.username}',
-                link=f'/chat/{request.user.username}/'
-            )
-            # Send email notification
-            # REF-008: Django Email Backend - send_mail()
             try:
-                if receiver.email:
-                    send_mail(
-                        subject=f'New Message from {request.user.get_full_name() or request.user.username}',
-                        message=f'You have received a new message from {request.user.get_full_name() or request.user.username}.\n\nMessage: {content[:100]}{"..." if len(content) > 100 else ""}\n\nView the full conversation in your dashboard.',
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[receiver.email],
-                        fail_silently=True,
-                    )
-            except Exception:
-                pass
+                post_message(chat, request.user, receiver, content)
+            except ChatClosed:
+                django_messages.error(request, "This chat was marked as Job Done - your message was not sent.")
             return redirect(f'/chat/{receiver.username}/')
 
+    # Only the most recent messages are rendered; older ones are fetched on demand
+    # from chat_history with the page's cursor
+    history = _history_page(chat, None)
+
     return render(request, 'chat/chat_detail.html', {
         'receiver': receiver,
         'chat': chat,
-        'messages': chat_messages
+        # Shown oldest first
+        'messages': list(reversed(history.items)),
+        'older_cursor': history.next_cursor,
+    })
+
+
+# Older messages of a chat as JSON, for the "Load older messages" link
+# ?cursor= is the older_cursor of the page (or of the previous response); messages come
+# back oldest first together with the cursor for the next older window
+# REF-003: Django Views - Function-based views
+# REF-005: Django ORM - keyset pagination on (timestamp, id)
+# REF-006: Django Decorators - @login_required
+@login_required
+def chat_history(request, chat_id):
+    chat = get_object_or_404(Chat, id=chat_id)
+    if request.user.id not in (chat.user1_id, chat.user2_id):
+        return JsonResponse({'error': 'Not a participant in this chat'}, status=403)
+    try:
+        history = _history_page(chat, request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'results': [message_payload(message) for message in reversed(history.items)],
+        'cursor': history.next_cursor,
     })
 
 
@@ -143,9 +137,7 @@ def mark_chat_job_done(request, chat_id):
         return redirect('chat_list')
     
     # Mark chat as JobDone
-    chat.status = 'job_done'
-    chat.completed_at = timezone.now()
-    chat.save()
+    close_chat(chat)
     
     django_messages.success(request, "Chat marked as Job Done. Future messages will start a new conversation.")
     return redirect('chat_list')
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Blob
+
+
+# Stored upload blobs and their reference counts (core/blobs.py)
+# REF-001: Django Admin - ModelAdmin class
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "refcount", "created_at", "released_at")
+    search_fields = ("name",)
+    readonly_fields = ("name", "size", "refcount", "created_at", "released_at")
@@ -2,6 +2,10 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections are routed by path to the handlers
+in ``websocket_routes`` (see core/websocket.py). This is the entry point served in
+production (Procfile: gunicorn with uvicorn workers); locally use any ASGI server,
+e.g. ``uvicorn core.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +17,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up - these modules use the ORM
+from chat.consumers import chat_socket  # noqa: E402
+from core.websocket import route_websocket  # noqa: E402
+
+websocket_routes = [
+    (r'^/ws/chat/(?P<username>[^/]+)/$', chat_socket),
+]
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await route_websocket(websocket_routes, scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,162 @@
+# Reference counts for the content-addressed upload store (core/storage.py)
+# Every file field in BLOB_FIELDS stores its uploads as blobs. Saving or deleting one of
+# those rows moves the count on the blob's core.models.Blob row (core/signals.py), in
+# the same transaction as the write; bulk_create skips signals, so callers that use it
+# retain() the new names themselves. A blob whose count reaches zero is kept for a
+# grace period (a page cached just before the change may still link it) and then
+# removed by collect_garbage() - `manage.py collect_blobs`.
+# REF-005: Django ORM - update() with F() expressions, get_or_create pattern
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Blob
+from .storage import BLOB_PREFIX, blob_storage, is_blob_name
+
+# (model label, file field) pairs stored in the blob store
+BLOB_FIELDS = (
+    ('jobs.JobRequestImage', 'image'),
+    ('jobs.JobReview', 'photo'),
+    ('users.Qualification', 'document'),
+)
+DEFAULT_GC_GRACE_HOURS = 24
+
+
+def blob_fields():
+    return [(apps.get_model(label), field) for label, field in BLOB_FIELDS]
+
+
+def blob_field(model):
+    for label, field in BLOB_FIELDS:
+        if model._meta.label == label:
+            return field
+    return None
+
+
+def _counts(names):
+    return Counter(name for name in names if is_blob_name(name))
+
+
+# Add one reference per occurrence of each blob name
+def retain(names):
+    for name, count in _counts(names).items():
+        increment = {'refcount': F('refcount') + count, 'released_at': None}
+        if Blob.objects.filter(name=name).update(**increment):
+            continue
+        try:
+            with transaction.atomic():
+                Blob.objects.create(name=name, size=blob_storage().size(name), refcount=count)
+        except IntegrityError:
+            # Another upload of the same bytes created the row first
+            Blob.objects.filter(name=name).update(**increment)
+
+
+# Drop one reference per occurrence; blobs reaching zero start their grace period
+def release(names):
+    now = timezone.now()
+    for name, count in _counts(names).items():
+        Blob.objects.filter(name=name).update(
+            refcount=Greatest(F('refcount') - count, Value(0)),
+            released_at=Case(When(refcount__lte=count, then=Value(now)), default=F('released_at')),
+        )
+
+
+# Point every row holding old_name at new_name (e.g. after its metadata was stripped
+# into a new blob). Rows are saved one by one so their signals move the counts, queue
+# variants and bump page versions as for any other change of file.
+def replace_references(old_name, new_name):
+    replaced = 0
+    with transaction.atomic():
+        for model, field in blob_fields():
+            for instance in model.objects.filter(**{field: old_name}):
+                setattr(instance, field, new_name)
+                instance.save(update_fields=[field])
+                replaced += 1
+    return replaced
+
+
+# Set every count from the rows that actually reference each blob (repairs drift from
+# raw SQL or imports that bypassed the signals); returns the number of rows corrected
+def recount():
+    actual = Counter()
+    for model, field in blob_fields():
+        actual.update(_counts(model.objects.exclude(**{field: ''}).values_list(field, flat=True).iterator()))
+    corrected = 0
+    now = timezone.now()
+    for blob in Blob.objects.all().iterator():
+        refcount = actual.pop(blob.name, 0)
+        if blob.refcount != refcount:
+            released_at = (blob.released_at or now) if refcount == 0 else None
+            Blob.objects.filter(pk=blob.pk).update(refcount=refcount, released_at=released_at)
+            corrected += 1
+    storage = blob_storage()
+    for name, refcount in actual.items():
+        if storage.exists(name):
+            retain([name] * refcount)
+            corrected += 1
+    return corrected
+
+
+def gc_cutoff(hours=None):
+    if hours is None:
+        hours = getattr(settings, 'BLOB_GC_GRACE_HOURS', DEFAULT_GC_GRACE_HOURS)
+    return timezone.now() - timedelta(hours=hours)
+
+
+def _delete_blob_file(storage, name):
+    from .images import delete_variants
+    storage.delete(name)
+    delete_variants(name)
+
+
+# Delete blobs unreferenced since before cutoff, and blob files older than cutoff that
+# never got a Blob row (their upload's transaction rolled back). Returns the names
+# removed, or that would be removed with dry_run.
+def collect_garbage(cutoff, dry_run=False):
+    storage = blob_storage()
+    removed = []
+    unreferenced = Blob.objects.filter(refcount=0, released_at__lt=cutoff)
+    for blob in unreferenced.iterator():
+        if dry_run:
+            removed.append(blob.name)
+            continue
+        # The row is locked and re-checked, and the file goes before the lock is
+        # released, so a blob retained or re-uploaded (core/storage.py) since the query
+        # survives, and an upload waiting on the lock finds neither row nor file
+        with transaction.atomic():
+            if not unreferenced.select_for_update().filter(pk=blob.pk).exists():
+                continue
+            unreferenced.filter(pk=blob.pk).delete()
+            _delete_blob_file(storage, blob.name)
+        removed.append(blob.name)
+
+    root = storage.path(BLOB_PREFIX)
+    cutoff_ts = cutoff.timestamp()
+    for directory, _, filenames in os.walk(root):
+        old = {}
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.getmtime(path) < cutoff_ts:
+                old[os.path.relpath(path, storage.location).replace(os.sep, '/')] = path
+        if not old:
+            continue
+        known = set(Blob.objects.filter(name__in=list(old)).values_list('name', flat=True))
+        for name, path in old.items():
+            # Skip files freshened by an upload of the same bytes since the walk
+            if name in known or os.path.getmtime(path) >= cutoff_ts:
+                continue
+            if not dry_run:
+                if is_blob_name(name):
+                    _delete_blob_file(storage, name)
+                else:
+                    # Temporary file left by an interrupted upload
+                    os.remove(path)
+            removed.append(name)
+    return removed
@@ -0,0 +1,33 @@
+# Conditional GET (ETag / Last-Modified) from a precomputed version stamp
+# A view looks up a cheap version of what it is about to render (updated_at columns,
+# counters) with one indexed query, answers 304 Not Modified from that when the client's
+# copy is current, and only otherwise loads and renders the full object graph, stamping
+# the response with the same validators.
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+# Strong ETag over everything the representation depends on
+def make_etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+# 304 response when the request's If-None-Match / If-Modified-Since match, else None
+def not_modified(request, etag, last_modified=None):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,264 @@
+# Downscaled variants of uploaded photos (profile photos, review photos, job request images)
+# Each upload gets WebP and JPEG copies at the fixed IMAGE_VARIANT_WIDTHS narrower than
+# the original, stored under a path derived from the upload's name:
+#     job_requests/2025/01/boiler.jpg -> variants/job_requests/2025/01/boiler.320w.webp
+# so a variant can be found without any database column. Variants always live in
+# default_storage, whichever storage holds the upload. Pages ask for variants through
+# the responsive_images template tags (core/templatetags/responsive_images.py), which
+# fall back to the original until its variants exist.
+# Generation runs after the upload's transaction commits, in a small shared thread pool:
+# several images from one request are resized in parallel and the request never waits.
+# The same pool strips identifying metadata from new uploads (core/uploads.py).
+# REF-001: Django File storage - default_storage open/save/exists/url
+# REF-005: Django cache framework - remembering which variants exist
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .blobs import replace_references
+from .storage import ContentAddressedStorage
+
+DEFAULT_WIDTHS = (160, 320, 640, 1280)
+VARIANT_DIR = 'variants'
+# (file extension, Pillow format, content type) - WebP first, JPEG for older browsers
+VARIANT_FORMATS = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 4},
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+# Known variant sets are kept for a day; "none yet" is rechecked after a minute so a
+# variant written by another process is picked up
+CACHE_TIMEOUT = 60 * 60 * 24
+MISSING_TIMEOUT = 60
+
+
+def variant_widths():
+    return tuple(sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def variant_name(name, width, ext):
+    root, _ = os.path.splitext(name)
+    return f'{VARIANT_DIR}/{root}.{width}w.{ext}'
+
+
+def _cache_key(name):
+    return 'image-variants:' + hashlib.md5(name.encode()).hexdigest()
+
+
+# Widths whose variants (every format) exist for the upload called name
+def available_widths(name):
+    widths = cache.get(_cache_key(name))
+    if widths is None:
+        widths = tuple(
+            width for width in variant_widths()
+            if all(default_storage.exists(variant_name(name, width, ext)) for ext, _, _ in VARIANT_FORMATS)
+        )
+        cache.set(_cache_key(name), widths, CACHE_TIMEOUT if widths else MISSING_TIMEOUT)
+    return widths
+
+
+def _encode(image, width, fmt):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    if fmt == 'JPEG' and resized.mode != 'RGB':
+        resized = resized.convert('RGB')
+    buffer = BytesIO()
+    resized.save(buffer, fmt, **SAVE_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+# Write the missing variants of one upload (read from storage); returns the widths now
+# available. Files that aren't readable images get no variants (the original is served)
+def generate_variants(name, storage=None):
+    storage = storage or default_storage
+    widths = variant_widths()
+    try:
+        with storage.open(name, 'rb') as source, Image.open(source) as image:
+            # Let the JPEG decoder scale down by a power of two while still covering
+            # the largest variant, instead of decoding every pixel of a phone photo
+            image.draft('RGB', (widths[-1], widths[-1]))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+            done = []
+            for width in widths:
+                if width >= image.width:
+                    break
+                for ext, fmt, _ in VARIANT_FORMATS:
+                    path = variant_name(name, width, ext)
+                    if default_storage.exists(path):
+                        continue
+                    default_storage.save(path, ContentFile(_encode(image, width, fmt)))
+                done.append(width)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return ()
+    cache.set(_cache_key(name), tuple(done), CACHE_TIMEOUT)
+    return tuple(done)
+
+
+# Remove every variant of an upload that is being deleted
+def delete_variants(name):
+    for width in variant_widths():
+        for ext, _, _ in VARIANT_FORMATS:
+            default_storage.delete(variant_name(name, width, ext))
+    cache.delete(_cache_key(name))
+
+
+# Metadata that can identify the uploader: EXIF (GPS position, camera serial), XMP
+# and free-text comments
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+STRIP_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+
+# Replace the stored file with data; on local disk the new file is moved into place
+# in one step so readers never see it half written
+def _overwrite(storage, name, data):
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        storage.delete(name)
+        storage.save(name, ContentFile(data))
+        return
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'wb') as temp:
+        temp.write(data)
+    os.replace(temp_path, path)
+
+
+# Re-encode an uploaded image without its metadata, applying the EXIF orientation to
+# the pixels first; returns False when there was nothing to strip or it isn't an image
+# A content-addressed blob (core/storage.py) is never rewritten: the clean copy becomes
+# a new blob and the rows holding the old one are moved to it.
+def strip_metadata(name, storage=None):
+    storage = storage or default_storage
+    try:
+        with storage.open(name, 'rb') as source, Image.open(source) as image:
+            fmt = image.format
+            if fmt not in STRIP_OPTIONS or not any(key in image.info for key in METADATA_KEYS):
+                return False
+            icc_profile = image.info.get('icc_profile')
+            image = ImageOps.exif_transpose(image)
+            buffer = BytesIO()
+            options = dict(STRIP_OPTIONS[fmt], icc_profile=icc_profile) if icc_profile else STRIP_OPTIONS[fmt]
+            image.save(buffer, fmt, **options)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return False
+    if not isinstance(storage, ContentAddressedStorage):
+        _overwrite(storage, name, buffer.getvalue())
+        return True
+    new_name = storage.save(name, ContentFile(buffer.getvalue()))
+    if new_name != name:
+        replace_references(name, new_name)
+    return True
+
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                thread_name_prefix='image-variants',
+            )
+        return _executor
+
+
+def _finished(key, future):
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def _run(task, name, storage):
+    try:
+        return task(name, storage)
+    finally:
+        # Pool threads are long lived; don't leave a database connection open in them
+        connection.close()
+
+
+# Run task(name, storage) for each upload name on the shared pool and return the
+# futures; a name already queued or running for the same task is not queued twice
+def _schedule(task, names, storage=None):
+    executor = _get_executor()
+    futures = []
+    for name in names:
+        if not name:
+            continue
+        key = (task.__name__, name)
+        with _lock:
+            future = _pending.get(key)
+            if future is None:
+                future = executor.submit(_run, task, name, storage)
+                _pending[key] = future
+        future.add_done_callback(lambda f, key=key: _finished(key, f))
+        futures.append(future)
+    return futures
+
+
+def schedule_variants(names, storage=None):
+    return _schedule(generate_variants, names, storage)
+
+
+# Schedule once the surrounding transaction commits, so a rolled back upload is skipped
+# Uploads whose variants are already known (a re-saved row) are left alone
+def schedule_variants_on_commit(names, storage=None):
+    names = [name for name in names if name and not cache.get(_cache_key(name))]
+    if names:
+        transaction.on_commit(lambda: schedule_variants(names, storage))
+
+
+def schedule_metadata_strip_on_commit(names, storage=None):
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: _schedule(strip_metadata, names, storage))
+
+
+# Block until everything queued so far has been processed (management commands, tests)
+def wait_for_image_tasks(timeout=None):
+    with _lock:
+        futures = list(_pending.values())
+    wait(futures, timeout=timeout)
+
+
+# Variant URLs for a FieldFile: {'webp': [(width, url), ...], 'jpg': [...]}, empty
+# lists until the variants exist
+def variant_urls(fieldfile):
+    if not fieldfile:
+        return {ext: [] for ext, _, _ in VARIANT_FORMATS}
+    widths = available_widths(fieldfile.name)
+    return {
+        ext: [(width, default_storage.url(variant_name(fieldfile.name, width, ext))) for width in widths]
+        for ext, _, _ in VARIANT_FORMATS
+    }
+
+
+# URL of the narrowest JPEG variant at least width pixels wide, or the original upload
+def variant_url(fieldfile, width):
+    if not fieldfile:
+        return ''
+    for variant_width, url in variant_urls(fieldfile)['jpg']:
+        if variant_width >= width:
+            return url
+    return fieldfile.url
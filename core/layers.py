@@ -0,0 +1,131 @@
+# Channel layer - group publish/subscribe for pushing events to open connections
+# Chat WebSockets (chat/consumers.py) subscribe to a group per conversation and the
+# notification stream (users/live.py) to a group per user; writers publish to those
+# groups once their transaction commits. The backend is chosen by the
+# CHANNEL_LAYER setting, like CACHES:
+#     CHANNEL_LAYER = {'BACKEND': 'core.layers.InProcessChannelLayer', 'OPTIONS': {...}}
+# InProcessChannelLayer keeps subscribers in memory, which suits a single ASGI process
+# and the test suite. It does not deliver across processes: a group_send() in one
+# gunicorn worker never reaches subscribers in another, so with several workers live
+# events are missed. A multi-worker or multi-node deployment plugs in a shared backend
+# (e.g. Redis or PostgreSQL LISTEN/NOTIFY) implementing the same three methods.
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_LAYER = {'BACKEND': 'core.layers.InProcessChannelLayer'}
+
+
+class BaseChannelLayer(ABC):
+    # Start receiving messages sent to group - returns a Subscription
+    # Must be called from the event loop that will read the subscription
+    @abstractmethod
+    def subscribe(self, group):
+        pass
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        pass
+
+    # Deliver message (a JSON-serialisable dict) to every subscriber of group
+    # Safe to call from sync code in any thread; returns the number of subscribers reached
+    @abstractmethod
+    def group_send(self, group, message):
+        pass
+
+    # Whether anyone may be listening on group, so publishers can skip building a
+    # message nobody will read; a layer that can't tell says True
+    def has_subscribers(self, group):
+        return True
+
+
+class Subscription:
+    def __init__(self, layer, group, maxsize):
+        self.layer = layer
+        self.group = group
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    async def get(self):
+        return await self.queue.get()
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client that stopped reading loses messages rather than growing memory
+            self.dropped += 1
+
+    def close(self):
+        self.layer.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class InProcessChannelLayer(BaseChannelLayer):
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._groups = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, group):
+        subscription = Subscription(self, group, self.capacity)
+        with self._lock:
+            self._groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._groups.get(subscription.group)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._groups[subscription.group]
+
+    def group_send(self, group, message):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+    def group_size(self, group):
+        with self._lock:
+            return len(self._groups.get(group, ()))
+
+    def has_subscribers(self, group):
+        return self.group_size(group) > 0
+
+
+_layer = None
+_layer_lock = threading.Lock()
+
+
+def get_channel_layer():
+    global _layer
+    if _layer is None:
+        with _layer_lock:
+            if _layer is None:
+                config = getattr(settings, 'CHANNEL_LAYER', DEFAULT_LAYER)
+                _layer = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _layer
+
+
+# Drop the configured layer (tests switching CHANNEL_LAYER)
+def reset_channel_layer():
+    global _layer
+    with _layer_lock:
+        _layer = None
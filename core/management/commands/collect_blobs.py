@@ -0,0 +1,26 @@
+# Delete content-addressed uploads nothing references any more (core/blobs.py)
+# Usage: python manage.py collect_blobs [--hours 24] [--recount] [--dry-run]
+from django.core.management.base import BaseCommand
+
+from core.blobs import collect_garbage, gc_cutoff, recount
+
+
+class Command(BaseCommand):
+    help = 'Garbage-collect upload blobs left unreferenced for longer than the grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, help='Grace period in hours (default BLOB_GC_GRACE_HOURS)')
+        parser.add_argument('--recount', action='store_true', help='Recompute reference counts from the rows first')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the blobs that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            corrected = recount()
+            self.stdout.write(f'Corrected {corrected} reference counts.')
+        cutoff = gc_cutoff(options['hours'])
+        removed = collect_garbage(cutoff, dry_run=options['dry_run'])
+        if options['dry_run'] or options['verbosity'] > 1:
+            for name in removed:
+                self.stdout.write(name)
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(removed)} blobs unreferenced since before {cutoff:%Y-%m-%d %H:%M}.'))
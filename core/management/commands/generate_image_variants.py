@@ -0,0 +1,33 @@
+# Write the downscaled variants (core/images.py) of photos uploaded before they were
+# generated automatically, or after IMAGE_VARIANT_WIDTHS changes
+# Usage: python manage.py generate_image_variants
+from django.core.management.base import BaseCommand
+
+from core import images
+from jobs.models import JobRequestImage, JobReview
+from users.models import Profile
+
+# Images queued on the thread pool before waiting for them to finish
+BATCH_SIZE = 200
+# (model, image field) pairs that get variants
+IMAGE_FIELDS = (
+    (Profile, 'photo'),
+    (JobReview, 'photo'),
+    (JobRequestImage, 'image'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate missing WebP/JPEG variants of uploaded photos'
+
+    def handle(self, *args, **options):
+        count = 0
+        for model, field in IMAGE_FIELDS:
+            names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).values_list(field, flat=True)
+            for name in names.iterator():
+                images.schedule_variants([name])
+                count += 1
+                if count % BATCH_SIZE == 0:
+                    images.wait_for_image_tasks()
+        images.wait_for_image_tasks()
+        self.stdout.write(self.style.SUCCESS(f'Checked variants of {count} images.'))
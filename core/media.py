@@ -0,0 +1,166 @@
+# Serving user uploads at MEDIA_URL
+# serve_media answers GET/HEAD for files under MEDIA_ROOT with:
+#   - ETag / Last-Modified validators and 304 Not Modified (core/conditional.py)
+#   - single byte ranges (Range / If-Range -> 206, 416), so video seeking and resumed
+#     downloads of large documents work
+#   - Cache-Control: content-addressed names (core/storage.py) and their variants never
+#     change, so they are cacheable for a year as immutable; other uploads for
+#     MEDIA_CACHE_SECONDS
+#   - access checks (MEDIA_ACCESS_CHECKS) - callables check(request, name) returning
+#     True (allowed, cacheable only by the browser), False (hidden: 404) or None (no
+#     opinion);
+#     users/media.py keeps qualification documents to their tradesman and staff
+# With MEDIA_ACCEL set, Django still makes every decision above but hands the bytes to
+# the front-end server: 'x-accel-redirect' (nginx internal location MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or 'x-sendfile' (Apache mod_xsendfile, lighttpd).
+# REF-003: Django Views - Function-based views
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_http_date_safe
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_safe
+
+from .conditional import not_modified, set_validators
+from .images import VARIANT_DIR
+from .storage import BLOB_PREFIX
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_CACHE_SECONDS = 60 * 60
+CHUNK_SIZE = 64 * 1024
+# Content-addressed blobs and the variants made from them
+IMMUTABLE_RE = re.compile(rf'^(?:{VARIANT_DIR}/)?{BLOB_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})[.a-z0-9]*$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Types shown in the browser; anything else (HTML, SVG, scripts uploaded as a
+# "document") is sent as a download so it can't run on this site's origin
+INLINE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/gif', 'application/pdf'}
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def is_immutable(name):
+    return IMMUTABLE_RE.match(name) is not None
+
+
+# First definite answer from MEDIA_ACCESS_CHECKS, None when no check cares about name
+def check_access(request, name):
+    for path in getattr(settings, 'MEDIA_ACCESS_CHECKS', ()):
+        allowed = import_string(path)(request, name)
+        if allowed is not None:
+            return allowed
+    return None
+
+
+def file_etag(name, stat):
+    match = IMMUTABLE_RE.match(name)
+    if match and not name.startswith(VARIANT_DIR + '/'):
+        return f'"{match.group(1)}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+# (start, end) inclusive for a satisfiable single range, None to send the whole file
+# (no Range header, one this doesn't handle, or an If-Range that no longer matches)
+def requested_range(request, size, etag, last_modified):
+    header = request.META.get('HTTP_RANGE', '').strip()
+    match = RANGE_RE.match(header)
+    if not match or match.groups() == ('', ''):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(last_modified.timestamp()):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, (min(int(last), size - 1) if last else size - 1)
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, name, size, etag, last_modified):
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    try:
+        byte_range = requested_range(request, size, etag, last_modified)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    accel = getattr(settings, 'MEDIA_ACCEL', '')
+    if accel == 'x-accel-redirect':
+        # nginx serves the file (and any Range) from its internal location
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/').rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{quote(name)}'
+    elif accel == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    elif byte_range is not None:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    if content_type not in INLINE_TYPES:
+        response['Content-Disposition'] = 'attachment'
+    return response
+
+
+def _cache_headers(response, name, private):
+    directives = ['private' if private else 'public']
+    if is_immutable(name):
+        directives += [f'max-age={IMMUTABLE_MAX_AGE}', 'immutable']
+    else:
+        directives.append(f"max-age={getattr(settings, 'MEDIA_CACHE_SECONDS', DEFAULT_CACHE_SECONDS)}")
+    response['Cache-Control'] = ', '.join(directives)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = default_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    if not path or not os.path.isfile(full_path):
+        raise Http404('Not found')
+    allowed = check_access(request, path)
+    if allowed is False:
+        # Same answer as a missing file, so private names can't be probed
+        raise Http404('Not found')
+
+    stat = os.stat(full_path)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+    etag = file_etag(path, stat)
+    response = not_modified(request, etag, last_modified)
+    if response is None:
+        response = _file_response(request, full_path, path, stat.st_size, etag, last_modified)
+        set_validators(response, etag, last_modified)
+    return _cache_headers(response, path, private=allowed is True)
@@ -0,0 +1,24 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+# One stored file in the content-addressed upload store (core/storage.py)
+# refcount is the number of rows whose file field holds this name (core/blobs.py);
+# released_at records when it last dropped to zero, and `manage.py collect_blobs`
+# deletes blobs left unreferenced for longer than BLOB_GC_GRACE_HOURS
+# REF-001: Django Models Documentation - unique fields, partial indexes
+class Blob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    released_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['released_at'], condition=Q(refcount=0), name='core_blob_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
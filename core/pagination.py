@@ -0,0 +1,220 @@
+# Keyset (cursor) pagination shared by the list views
+# Instead of OFFSET, each page continues from the sort-key values of the last row shown,
+# so page 50 costs the same index range read as page 1. Cursors are opaque url-safe
+# strings that encode the direction and the boundary row's key values.
+# REF-005: Django ORM - filter() with Q objects, order_by() with F().desc()
+# REF-010: Django Q Objects - lexicographic "row after" conditions
+import base64
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# One page of results plus the cursors to move either way
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.next_url = None
+        self.prev_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    # Query strings for the next/previous links, keeping the current filters
+    def build_links(self, request, param='cursor'):
+        for attr, cursor in (('next_url', self.next_cursor), ('prev_url', self.prev_cursor)):
+            if cursor is None:
+                setattr(self, attr, None)
+                continue
+            params = request.GET.copy()
+            params[param] = cursor
+            setattr(self, attr, f'{request.path}?{params.urlencode()}')
+        return self
+
+    def cursors(self):
+        return {'next': self.next_cursor, 'previous': self.prev_cursor}
+
+
+# Sort keys are written like order_by() arguments: '-date_posted', 'user__username', 'id'
+# The last key must be unique so every row has a distinct position. NULLs sort last.
+def _parse_keys(keys):
+    return [(key.lstrip('-'), key.startswith('-')) for key in keys]
+
+
+def ordering_for(keys, reverse=False):
+    ordering = []
+    for field, descending in _parse_keys(keys):
+        if reverse:
+            # Walking backwards flips both the direction and where the NULLs sit
+            expression = F(field).asc(nulls_first=True) if descending else F(field).desc(nulls_first=True)
+        else:
+            expression = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+        ordering.append(expression)
+    return ordering
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps({'d': direction, 'v': [_encode_value(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, key_count):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction, values = payload['d'], payload['v']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Malformed cursor')
+    if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != key_count:
+        raise InvalidCursor('Malformed cursor')
+    return direction, values
+
+
+def _key_value(obj, field):
+    # Rows from values() querysets are dicts keyed by the full lookup
+    if isinstance(obj, dict):
+        return obj.get(field)
+    value = obj
+    for part in field.split('__'):
+        value = getattr(value, part, None)
+        if value is None:
+            return None
+    return value
+
+
+# Rows strictly after (or before) the boundary row in the (NULLS LAST) ordering
+def _beyond(field, descending, value, after):
+    if value is None:
+        # NULLs are last: nothing comes after a NULL, every non-NULL comes before it
+        return None if after else Q(**{f'{field}__isnull': False})
+    lookup = 'lt' if descending == after else 'gt'
+    condition = Q(**{f'{field}__{lookup}': value})
+    if after:
+        condition |= Q(**{f'{field}__isnull': True})
+    return condition
+
+
+def _equal(field, value):
+    if value is None:
+        return Q(**{f'{field}__isnull': True})
+    return Q(**{field: value})
+
+
+def _boundary_filter(keys, values, after):
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for (field, descending), value in zip(_parse_keys(keys), values):
+        beyond = _beyond(field, descending, value, after)
+        if beyond is not None:
+            condition |= prefix & beyond
+        prefix &= _equal(field, value)
+    return condition
+
+
+# Read the page size from ?page_size=, clamped to a sane range
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+# Return one KeysetPage of queryset ordered by keys, starting from cursor (None = first page)
+def paginate_keyset(queryset, keys, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    direction, values = 'n', None
+    if cursor:
+        direction, values = decode_cursor(cursor, len(keys))
+
+    backwards = direction == 'p'
+    qs = queryset.order_by(*ordering_for(keys, reverse=backwards))
+    if values is not None:
+        try:
+            qs = qs.filter(_boundary_filter(keys, values, after=not backwards))
+        except (ValidationError, ValueError, TypeError):
+            # Well-formed but edited: the values don't fit the key fields
+            raise InvalidCursor('Malformed cursor')
+
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(obj, d):
+        return encode_cursor(d, [_key_value(obj, field) for field, _ in _parse_keys(keys)])
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = cursor_for(rows[-1], 'n')
+        if values is not None and (has_more or not backwards):
+            prev_cursor = cursor_for(rows[0], 'p')
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+
+class CursorOutOfRange(LookupError):
+    pass
+
+
+# Keyset pagination over an already ordered list of sort-key tuples (e.g. from a cache)
+# The last value of each tuple must be the unique key. Items of the returned page are the
+# tuples themselves; cursors are interchangeable with paginate_keyset() on the same keys.
+# Raises CursorOutOfRange when the cursor row isn't in the list or the page would run past
+# the end of an incomplete list, so callers can fall back to the database.
+def paginate_key_list(key_rows, keys, cursor=None, per_page=DEFAULT_PAGE_SIZE, complete=True):
+    start, backwards = 0, False
+    if cursor:
+        direction, values = decode_cursor(cursor, len(keys))
+        backwards = direction == 'p'
+        position = next((i for i, row in enumerate(key_rows) if row[-1] == values[-1]), None)
+        if position is None:
+            raise CursorOutOfRange('Cursor row is not in the list')
+        start = max(position - per_page, 0) if backwards else position + 1
+
+    end = position if backwards else start + per_page
+    if end > len(key_rows) and not complete:
+        raise CursorOutOfRange('Page extends past the cached rows')
+    rows = [tuple(row) for row in key_rows[start:end]]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if end < len(key_rows) or not complete:
+            next_cursor = encode_cursor('n', rows[-1])
+        if start > 0:
+            prev_cursor = encode_cursor('p', rows[0])
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -0,0 +1,114 @@
+# Read replica routing
+# With DATABASE_REPLICA_URL set, settings add a 'replica' alias and the read-heavy pages
+# (directory, open jobs board, tradesman profiles) wrapped in @replica_reads run their
+# queries there, leaving the primary to the writes from chat, notifications and jobs.
+# Everything else, and every write, uses 'default'.
+# Read-your-writes: replicas lag the primary, so once a request writes,
+# ReplicaRoutingMiddleware sets a short-lived cookie that pins that browser to the
+# primary for DATABASE_REPLICA_PIN_SECONDS; reads later in the writing request go to the
+# primary too. Pages built from other users' writes may trail them by the replica lag.
+# Without a replica alias the router has no opinion and all traffic stays on 'default'.
+# REF-006: Django Decorators - view decorators
+# REF-024: dj-database-url package for parsing database URLs (settings)
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE = 'db_primary_pin'
+DEFAULT_PIN_SECONDS = 5
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Always read from the primary and don't pin on write: the session row is written by
+# SessionMiddleware on most logged-in requests and must be read back immediately
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+class RoutingState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.use_replica = False
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def replica_configured():
+    databases = connections.settings
+    if REPLICA_DB_ALIAS not in databases:
+        return False
+    # Under test the replica mirrors the test database (settings TEST MIRROR); a second
+    # connection to it wouldn't see the rows of the test's open transaction
+    return databases[REPLICA_DB_ALIAS]['NAME'] != databases[DEFAULT_DB_ALIAS]['NAME']
+
+
+def pin_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+def reading_from_replica():
+    state = _state.get()
+    return state is not None and state.use_replica and not state.wrote and not state.pinned
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_configured():
+            return None
+        if model._meta.app_label not in PRIMARY_ONLY_APPS and reading_from_replica():
+            return REPLICA_DB_ALIAS
+        # Also overrides the instance hint, so relations of rows read from the replica
+        # are fetched from the primary once the request has written
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not replica_configured():
+            return None
+        state = _state.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    # Both aliases hold the same rows
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+# Tracks writes for the current request and pins the browser to the primary after one
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds(), httponly=True, samesite='Lax')
+        return response
+
+
+# Run a read-only view's queries on the replica (GET/HEAD from browsers not pinned to
+# the primary); the view may still write, which switches its later reads to the primary
+def replica_reads(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        state = _state.get()
+        if state is None or request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        state.use_replica = True
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            state.use_replica = False
+    return wrapper
@@ -36,6 +36,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Iteration 5: Serve static files in production
+    'core.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,6 +63,19 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
+
+# Group pub/sub used to push chat messages and notification events to open
+# WebSockets and SSE streams (see core/layers.py)
+# The in-process layer only reaches clients connected to the same process: with more
+# than one worker (WEB_CONCURRENCY) or node, a chat message or notification written in
+# one process doesn't reach sockets held by another until the page reloads or
+# reconnects. Run a single ASGI worker or point CHANNEL_LAYER_BACKEND at a shared layer.
+CHANNEL_LAYER = {
+    'BACKEND': os.getenv('CHANNEL_LAYER_BACKEND', 'core.layers.InProcessChannelLayer'),
+}
+# Messages rendered on a chat page; older ones load in windows of the same size
+CHAT_HISTORY_WINDOW = int(os.getenv('CHAT_HISTORY_WINDOW', '50'))
 
 
 import dj_database_url
@@ -82,6 +96,52 @@ else:
         }
     }
 
+# Read replica for the read-heavy pages (core/routers.py); under test it mirrors 'default'
+database_replica_url = os.getenv('DATABASE_REPLICA_URL')
+if database_replica_url:
+    DATABASES['replica'] = dj_database_url.config(default=database_replica_url)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Seconds a browser reads only from the primary after it writes, so users see their own
+# changes while the replica catches up
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', '5'))
+
+
+# Cache - per-process memory by default; set CACHE_DIR to share a file-based cache
+# between gunicorn workers (used by the tradesman search result cache)
+# 'throttle' holds the jobs API rate limit histories (jobs/throttles.py). Without
+# CACHE_DIR each worker counts on its own, so a client gets up to the worker count times
+# the configured rate and the counts reset on restart - set CACHE_DIR in production.
+# REF-005: Django cache framework - CACHES setting
+if os.getenv('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR'),
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(os.getenv('CACHE_DIR'), 'throttle'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'throttle',
+        },
+    }
+# Seconds a cached directory result list lives (it is also invalidated on every relevant write)
+TRADESMAN_SEARCH_CACHE_TIMEOUT = int(os.getenv('TRADESMAN_SEARCH_CACHE_TIMEOUT', '300'))
+# Directory result cache - invalidated by bumping a version in the cache, which only
+# reaches the other gunicorn workers through a shared backend, so it is on by default
+# only with CACHE_DIR (a system check rejects it with the per-process memory cache)
+TRADESMAN_SEARCH_CACHE_ENABLED = os.getenv(
+    'TRADESMAN_SEARCH_CACHE_ENABLED', 'true' if os.getenv('CACHE_DIR') else 'false',
+).lower() == 'true'
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -121,6 +181,34 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Profile photos, qualifications, job request and review images
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Widths of the WebP/JPEG variants made from uploaded photos (core/images.py) and the
+# number of threads resizing them
+IMAGE_VARIANT_WIDTHS = tuple(int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '160,320,640,1280').split(','))
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))
+# Uploads stream to temporary files on disk in chunks and are capped per file and per
+# request, in bytes and (for images, read from the header) pixels - core/uploads.py
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+UPLOAD_MAX_FILE_BYTES = int(os.getenv('UPLOAD_MAX_FILE_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv('UPLOAD_MAX_REQUEST_BYTES', str(40 * 1024 * 1024)))
+UPLOAD_MAX_IMAGE_PIXELS = int(os.getenv('UPLOAD_MAX_IMAGE_PIXELS', '40000000'))
+UPLOAD_MAX_REQUEST_PIXELS = int(os.getenv('UPLOAD_MAX_REQUEST_PIXELS', '120000000'))
+DATA_UPLOAD_MAX_NUMBER_FILES = int(os.getenv('DATA_UPLOAD_MAX_NUMBER_FILES', '20'))
+# Uploads are served at MEDIA_URL by core/media.py (ranges, validators, cache headers,
+# access checks). Behind nginx set MEDIA_ACCEL=x-accel-redirect with an internal
+# location MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT, or MEDIA_ACCEL=x-sendfile for
+# Apache/lighttpd, and the front-end server sends the bytes
+MEDIA_ACCEL = os.getenv('MEDIA_ACCEL', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Browser cache lifetime of uploads whose names aren't content hashes
+MEDIA_CACHE_SECONDS = int(os.getenv('MEDIA_CACHE_SECONDS', '3600'))
+MEDIA_ACCESS_CHECKS = ['users.media.qualification_document_access']
+# Job request images, review photos and qualification documents are stored once per
+# distinct file (core/storage.py); `manage.py collect_blobs` deletes those unreferenced
+# for longer than this
+BLOB_GC_GRACE_HOURS = int(os.getenv('BLOB_GC_GRACE_HOURS', '24'))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -141,5 +229,21 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@jobdone.com')
+# Notification emails are queued in OutboundEmail and sent by `manage.py send_outbound_email`
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+# Seconds a worker owns a claimed batch; rows still 'sending' after this are retried
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+# Read notifications older than this are removed by `manage.py prune_notifications`
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+
+# Jobs REST API (jobs/views.py) - per-client rate limits, tracked in the 'throttle' cache
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('API_ANON_RATE', '120/minute'),
+        'user': os.getenv('API_USER_RATE', '600/minute'),
+        'job_writes': os.getenv('API_JOB_WRITE_RATE', '60/minute'),
+    },
+}
 
 
@@ -0,0 +1,45 @@
+# Signal handlers for the core app - keep blob reference counts (core/blobs.py) in step
+# with the rows holding content-addressed uploads, inside the writing transaction
+# REF-001: Django Models Documentation - model signals (pre_save, post_save, post_delete)
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from jobs.models import JobRequestImage, JobReview
+from users.models import Qualification
+from .blobs import blob_field, release, retain
+
+
+def _stored_name(instance, field):
+    return getattr(instance, field).name or ''
+
+
+# Remember which blob the row held before this save, so a replaced file is released
+@receiver(pre_save, sender=JobRequestImage)
+@receiver(pre_save, sender=JobReview)
+@receiver(pre_save, sender=Qualification)
+def remember_stored_blob(sender, instance, update_fields=None, **kwargs):
+    field = blob_field(sender)
+    if instance._state.adding or (update_fields is not None and field not in update_fields):
+        instance._stored_blob = None
+        return
+    instance._stored_blob = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first() or ''
+
+
+@receiver(post_save, sender=JobRequestImage)
+@receiver(post_save, sender=JobReview)
+@receiver(post_save, sender=Qualification)
+def count_stored_blob(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, '_stored_blob', None)
+    if kwargs.get('raw') or (previous is None and not created):
+        return
+    name = _stored_name(instance, blob_field(sender))
+    if name != previous:
+        retain([name])
+        release([previous or ''])
+
+
+@receiver(post_delete, sender=JobRequestImage)
+@receiver(post_delete, sender=JobReview)
+@receiver(post_delete, sender=Qualification)
+def release_stored_blob(sender, instance, **kwargs):
+    release([_stored_name(instance, blob_field(sender))])
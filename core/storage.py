@@ -0,0 +1,90 @@
+# Content-addressed storage for user uploads that are often uploaded more than once
+# (job request images, review photos, qualification documents)
+# A file is named after the SHA-256 of its bytes, computed while it is streamed to a
+# temporary file, so the same photo uploaded twice is stored once:
+#     blobs/3f/a2/3fa2...c9.jpg
+# The name never points at different bytes, which makes its URL safe to cache forever.
+# Rows referencing a blob are counted in core.models.Blob (core/blobs.py), and
+# `manage.py collect_blobs` deletes blobs nothing references any more.
+# REF-001: Django File storage - custom FileSystemStorage
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .models import Blob
+
+BLOB_PREFIX = 'blobs'
+BLOB_NAME_RE = re.compile(rf'^{BLOB_PREFIX}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[a-z0-9]{{1,10}})?$')
+
+
+def is_blob_name(name):
+    return bool(name) and BLOB_NAME_RE.match(name) is not None
+
+
+def blob_name(digest, ext=''):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def _extension(name):
+    ext = os.path.splitext(name or '')[1].lower()
+    return ext if re.fullmatch(r'\.[a-z0-9]{1,10}', ext) else ''
+
+
+@deconstructible(path='core.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+    # The digest decides the name, so there is never another file to avoid
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        blobs_dir = os.path.join(self.location, BLOB_PREFIX)
+        os.makedirs(blobs_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=blobs_dir, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            final_name = blob_name(digest.hexdigest(), _extension(name))
+            final_path = self.path(final_name)
+            with transaction.atomic():
+                # Restart the grace period of an unreferenced blob with these bytes. The
+                # UPDATE waits on collect_blobs, which deletes a blob's row and file under
+                # the row lock: either it already has (no row, no file - written below)
+                # or it will find the blob revived and keep it until this upload commits.
+                Blob.objects.filter(name=final_name, refcount=0).update(released_at=timezone.now())
+                if os.path.exists(final_path):
+                    os.remove(temp_path)
+                    # Freshen it so collect_blobs doesn't take it for an old orphan before
+                    # this upload's row commits
+                    os.utime(final_path)
+                else:
+                    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(temp_path, self.file_permissions_mode)
+                    os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return final_name
+
+
+_blob_storage = None
+
+
+# Storage callable for the FileFields holding blobs (keeps it out of migrations)
+def blob_storage():
+    global _blob_storage
+    if _blob_storage is None:
+        _blob_storage = ContentAddressedStorage()
+    return _blob_storage
@@ -0,0 +1,41 @@
+# Template helpers for uploaded photos - serve downscaled variants (core/images.py)
+#     {% load responsive_images %}
+#     {% responsive_image review.photo sizes="200px" alt="Review photo" style="max-width:200px" %}
+#     <a href="{{ img.image|variant_url:1280 }}">
+# responsive_image renders a <picture> with a WebP srcset and a JPEG srcset so the
+# browser downloads the smallest file that fills the slot; until the variants exist it
+# renders a plain <img> of the original.
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from core import images
+
+register = template.Library()
+
+
+def _srcset(candidates):
+    return ', '.join(f'{url} {width}w' for width, url in candidates)
+
+
+@register.simple_tag
+def responsive_image(fieldfile, sizes='100vw', alt='', **attrs):
+    if not fieldfile:
+        return ''
+    urls = images.variant_urls(fieldfile)
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    if not urls['jpg']:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', fieldfile.url, alt, extra)
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((content_type, _srcset(urls[ext]), sizes)
+         for ext, _, content_type in images.VARIANT_FORMATS if ext != 'jpg'),
+    )
+    return format_html(
+        '<picture style="display:contents">{}<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}></picture>',
+        sources, urls['jpg'][-1][1], _srcset(urls['jpg']), sizes, alt, extra,
+    )
+
+
+@register.filter
+def variant_url(fieldfile, width):
+    return images.variant_url(fieldfile, int(width))
@@ -0,0 +1,35 @@
+# Text normalisation shared by the directory search (users/search.py) and the
+# trade taxonomy (jobs/trades.py) so both reduce words the same way
+# Stemming is the Snowball English (Porter2) stemmer: "plumbing" -> "plumb",
+# "decorator" / "decorating" -> "decor", "electrical" -> "electr"
+# REF-030: ChatGPT - Trade filtering / search variant logic
+import re
+import threading
+
+import snowballstemmer
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Stemmer objects keep per-word state, so each thread gets its own
+_local = threading.local()
+
+
+def _stemmer():
+    stemmer = getattr(_local, 'stemmer', None)
+    if stemmer is None:
+        stemmer = _local.stemmer = snowballstemmer.stemmer('english')
+    return stemmer
+
+
+# Lower-case words of a piece of text, unstemmed
+def words(text):
+    return WORD_RE.findall((text or '').lower())
+
+
+# Reduce a lower-case word to its stem so different forms of a trade match each other
+def stem(word):
+    return _stemmer().stemWord(word)
+
+
+def tokenize(text):
+    return [stem(word) for word in words(text)]
@@ -0,0 +1,107 @@
+# Upload limits for user files (profile and review photos, job request images,
+# qualification documents)
+# LimitedUploadHandler runs first in FILE_UPLOAD_HANDLERS, ahead of Django's
+# TemporaryFileUploadHandler, so every file streams to a temporary file on disk in
+# 64 KB chunks and is dropped as soon as it passes UPLOAD_MAX_FILE_BYTES, or the
+# request's files together pass UPLOAD_MAX_REQUEST_BYTES. Dropped files are reported
+# through upload_errors(); views then check the images that arrived with check_images(),
+# which reads only each header to enforce the pixel caps before anything decodes them.
+# Accepted images have their metadata (EXIF location, camera details) stripped in the
+# background after the upload commits (core/images.py strip_metadata).
+# REF-003: Django Views - request.FILES for file upload
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from .images import schedule_metadata_strip_on_commit
+
+DEFAULT_MAX_FILE_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_REQUEST_BYTES = 40 * 1024 * 1024
+DEFAULT_MAX_IMAGE_PIXELS = 40_000_000
+DEFAULT_MAX_REQUEST_PIXELS = 120_000_000
+# Formats Pillow may decode for uploaded photos
+IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+def _limit(name, default):
+    return getattr(settings, name, default)
+
+
+def upload_errors(request):
+    return getattr(request, 'upload_errors', [])
+
+
+def _reject(request, message):
+    if request is not None:
+        if not hasattr(request, 'upload_errors'):
+            request.upload_errors = []
+        request.upload_errors.append(message)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_bytes = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file_bytes = 0
+
+    # Pass chunks through to the next handler, counting them against both caps
+    def receive_data_chunk(self, raw_data, start):
+        self.file_bytes += len(raw_data)
+        self.request_bytes += len(raw_data)
+        max_file = _limit('UPLOAD_MAX_FILE_BYTES', DEFAULT_MAX_FILE_BYTES)
+        max_request = _limit('UPLOAD_MAX_REQUEST_BYTES', DEFAULT_MAX_REQUEST_BYTES)
+        if self.file_bytes > max_file:
+            _reject(self.request, f'{self.file_name} is larger than {filesizeformat(max_file)}.')
+            raise SkipFile()
+        if self.request_bytes > max_request:
+            _reject(self.request, f'{self.file_name} was not uploaded: files in one upload are limited to {filesizeformat(max_request)}.')
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+# Width and height from the image header only, or None for files that aren't a
+# supported image. Pillow reads just enough of the file to find the dimensions.
+def image_size(uploaded_file):
+    uploaded_file.seek(0)
+    try:
+        with Image.open(uploaded_file) as image:
+            if image.format not in IMAGE_FORMATS:
+                return None
+            return image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        uploaded_file.seek(0)
+
+
+# Error messages for images that aren't a supported format or are over the per-image
+# or (all of images together) per-request pixel caps
+# Documents (qualification certificates) may be PDFs, so only the handler's byte caps apply
+def check_images(images):
+    errors = []
+    max_pixels = _limit('UPLOAD_MAX_IMAGE_PIXELS', DEFAULT_MAX_IMAGE_PIXELS)
+    max_request_pixels = _limit('UPLOAD_MAX_REQUEST_PIXELS', DEFAULT_MAX_REQUEST_PIXELS)
+    total = 0
+    for uploaded_file in images:
+        size = image_size(uploaded_file)
+        if size is None:
+            errors.append(f'{uploaded_file.name} is not a JPEG, PNG, WebP or GIF image.')
+            continue
+        pixels = size[0] * size[1]
+        total += pixels
+        if pixels > max_pixels:
+            errors.append(f'{uploaded_file.name} is {size[0]}x{size[1]} pixels; images are limited to {max_pixels // 1_000_000} megapixels.')
+        elif total > max_request_pixels:
+            errors.append(f'{uploaded_file.name} was not uploaded: images in one upload are limited to {max_request_pixels // 1_000_000} megapixels in total.')
+    return errors
+
+
+# Strip metadata from the stored copies of new uploads once their rows commit
+def process_uploads_on_commit(fieldfiles):
+    schedule_metadata_strip_on_commit([fieldfile.name for fieldfile in fieldfiles if fieldfile])
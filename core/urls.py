@@ -1,9 +1,10 @@
-from . import views
+import re
+
+from . import media, views
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.urls import include
 from django.conf import settings
-from django.conf.urls.static import static
 
 # REF-003: Django URL Routing - Main URL configuration with include()
 urlpatterns = [
@@ -13,7 +14,10 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('chat/', include('chat.urls')),
 ]
-# REF-003: Django URL Routing - static() for serving uploaded media in development (Iteration 4)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# REF-003: Django URL Routing - uploaded media (Iteration 4), served in every environment
+# by core/media.py unless MEDIA_URL points at another host
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), media.serve_media, name='media'),
+    ]
 
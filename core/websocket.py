@@ -0,0 +1,152 @@
+# Minimal WebSocket support for the ASGI application (core/asgi.py)
+# Django's ASGI handler only speaks HTTP, so WebSocket connections are routed here by
+# path to plain async handlers. A handler gets a WebSocket wrapper around the ASGI
+# receive/send callables with the user already resolved from the session cookie.
+# A socket can stay open far longer than a request, and no request_started /
+# request_finished signal ever fires for it, so ORM work from WebSocket code goes through
+# database_sync_to_async(), which retires dead or expired connections around each call.
+# REF-002: Django Authentication - session-based user lookup
+import json
+import re
+from functools import wraps
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, load_backend
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http.request import validate_host
+from django.utils.crypto import constant_time_compare
+
+# Close codes (RFC 6455 / IANA registry)
+CLOSE_NORMAL = 1000
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_NOT_FOUND = 4404
+CLOSE_FORBIDDEN = 4403
+
+
+# sync_to_async for functions using the ORM: like a request, each call starts and ends
+# by closing connections that are broken or past CONN_MAX_AGE, so a long-lived socket
+# never keeps reusing one the database has dropped
+def database_sync_to_async(func):
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run)
+
+
+class WebSocketClosed(Exception):
+    pass
+
+
+class WebSocket:
+    def __init__(self, scope, receive, send):
+        self.scope = scope
+        self._receive = receive
+        self._send = send
+        self.user = scope.get('user') or AnonymousUser()
+        self.kwargs = scope.get('url_kwargs', {})
+        self.closed = False
+
+    # The connect message has already been read by route_websocket()
+    async def accept(self):
+        await self._send({'type': 'websocket.accept'})
+
+    async def close(self, code=CLOSE_NORMAL):
+        if not self.closed:
+            self.closed = True
+            await self._send({'type': 'websocket.close', 'code': code})
+
+    # Next text frame from the client, decoded as JSON (None for frames that aren't)
+    async def receive_json(self):
+        message = await self._receive()
+        if message['type'] == 'websocket.disconnect':
+            self.closed = True
+            raise WebSocketClosed()
+        try:
+            return json.loads(message.get('text') or message.get('bytes') or '')
+        except ValueError:
+            return None
+
+    async def send_json(self, data):
+        await self._send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+    return None
+
+
+# Browsers send Origin on WebSocket handshakes; refuse pages from other sites so a
+# logged-in user's cookie can't be used from a third-party page
+def origin_allowed(scope):
+    origin = _header(scope, 'origin')
+    if origin is None:
+        return True
+    origin_host = urlsplit(origin).netloc.lower()
+    host = (_header(scope, 'host') or '').lower()
+    allowed = list(settings.ALLOWED_HOSTS) or (['localhost', '127.0.0.1', '[::1]', 'testserver'] if settings.DEBUG else [])
+    return origin_host == host or validate_host(origin_host.rsplit(':', 1)[0], allowed)
+
+
+# Same checks as django.contrib.auth.get_user(), reading the session from the cookie
+def _user_from_session(session_key):
+    if not session_key:
+        return AnonymousUser()
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(session_key)
+    try:
+        user_id = session[SESSION_KEY]
+        backend_path = session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    user = load_backend(backend_path).get_user(user_id)
+    if user is None:
+        return AnonymousUser()
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or not constant_time_compare(session_hash, user.get_session_auth_hash()):
+        return AnonymousUser()
+    return user
+
+
+async def get_scope_user(scope):
+    cookie = SimpleCookie()
+    cookie.load(_header(scope, 'cookie') or '')
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    return await database_sync_to_async(_user_from_session)(morsel.value if morsel else None)
+
+
+# Dispatch a websocket scope to the first (pattern, handler) whose regex matches the path
+# The handler decides whether to accept(); closing before accepting rejects the handshake
+async def route_websocket(routes, scope, receive, send):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    for pattern, handler in routes:
+        match = re.match(pattern, scope['path'])
+        if match:
+            break
+    else:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    if not origin_allowed(scope):
+        await send({'type': 'websocket.close', 'code': CLOSE_POLICY_VIOLATION})
+        return
+    scope = dict(scope, url_kwargs=match.groupdict(), user=await get_scope_user(scope))
+    socket = WebSocket(scope, receive, send)
+    try:
+        await handler(socket)
+    except WebSocketClosed:
+        pass
+    finally:
+        await socket.close()
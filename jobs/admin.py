@@ -1,9 +1,27 @@
 from django.contrib import admin
-from .models import Job, JobRequest, JobReview, JobRequestImage, OpenJobCompletion
+from .models import (
+    Job, JobRequest, JobReview, JobRequestImage, JobTombstone, OpenJobCompletion, OpenJobFeedEntry, Trade, TradeAlias,
+)
+
+# Trade taxonomy - aliases are normalised keys (see jobs/trades.py)
+# REF-001: Django Admin - TabularInline for related aliases
+class TradeAliasInline(admin.TabularInline):
+    model = TradeAlias
+    extra = 1
+
+
+@admin.register(Trade)
+class TradeAdmin(admin.ModelAdmin):
+    list_display = ("name",)
+    search_fields = ("name", "aliases__key")
+    inlines = [TradeAliasInline]
+
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
-    list_display = ("title", "location", "hourly_rate", "date_posted")
+    list_display = ("title", "location", "trade", "trade_category", "hourly_rate", "date_posted")
+    # "Trade category: Empty" lists jobs whose trade text matches no alias yet
+    list_filter = ("trade_category",)
     search_fields = ("title", "location")
 
 
@@ -16,9 +34,12 @@ class JobRequestAdmin(admin.ModelAdmin):
 
 @admin.register(JobReview)
 class JobReviewAdmin(admin.ModelAdmin):
-    list_display = ("job_request", "rating", "created_at")
+    list_display = ("job_request", "completion", "rating", "created_at")
     list_filter = ("rating", "created_at")
-    search_fields = ("job_request__job__title", "job_request__customer__username")
+    search_fields = (
+        "job_request__job__title", "job_request__customer__username",
+        "completion__job__title", "completion__tradesman__username",
+    )
 
 
 # REF-001: Django Admin - model registration (Iteration 4 US 28 - job request images)
@@ -36,3 +57,21 @@ class OpenJobCompletionAdmin(admin.ModelAdmin):
     list_filter = ("status", "completed_at")
     search_fields = ("job__title", "tradesman__username", "confirmation_code")
     readonly_fields = ("confirmation_code", "confirmation_generated_at", "completed_at", "confirmed_at")
+
+
+# Per-tradesman open job feed (maintained by jobs/feed.py)
+# REF-001: Django Admin - ModelAdmin class
+@admin.register(OpenJobFeedEntry)
+class OpenJobFeedEntryAdmin(admin.ModelAdmin):
+    list_display = ("tradesman", "job", "date_posted", "completion_status")
+    list_filter = ("completion_status",)
+    search_fields = ("job__title", "tradesman__username")
+    list_select_related = ("tradesman", "job")
+
+
+# Deleted jobs reported by the change feed (jobs/changes.py)
+# REF-001: Django Admin - ModelAdmin class
+@admin.register(JobTombstone)
+class JobTombstoneAdmin(admin.ModelAdmin):
+    list_display = ("job_id", "deleted_at")
+    search_fields = ("job_id",)
@@ -0,0 +1,54 @@
+# Incremental change feed for clients mirroring the job list (GET /api/jobs/changes/)
+# Changed jobs are read in (updated_at, id) order from jobs_job_updated_idx and deletes
+# from JobTombstone in (deleted_at, id) order. The cursor holds the position reached in
+# each, so a poll returns only what changed since the previous one. Rows newer than a
+# short settle window are held back until transactions that stamped them before the
+# cursor moved on have committed, so no change is skipped.
+# REF-005: Django ORM - keyset filters on indexed columns
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.pagination import InvalidCursor, decode_cursor, encode_cursor, paginate_keyset
+from .models import Job, JobTombstone
+
+JOB_KEYS = ('updated_at', 'id')
+TOMBSTONE_KEYS = ('deleted_at', 'id')
+DEFAULT_SETTLE_SECONDS = 2
+
+
+# Feed cursor: the job position and the tombstone position, '.'-separated ('' = start)
+def _split_cursor(cursor):
+    if not cursor:
+        return None, None
+    parts = cursor.split('.')
+    if len(parts) != 2:
+        raise InvalidCursor('Malformed cursor')
+    for part, keys in zip(parts, (JOB_KEYS, TOMBSTONE_KEYS)):
+        if part:
+            decode_cursor(part, len(keys))
+    return parts[0] or None, parts[1] or None
+
+
+def _position(rows, keys, previous):
+    if not rows:
+        return previous or ''
+    return encode_cursor('n', [getattr(rows[-1], key) for key in keys])
+
+
+# One batch of up to limit changed jobs and limit deletes after cursor
+# Returns (jobs, tombstones, next_cursor, has_more)
+def changes_since(cursor, limit):
+    job_cursor, tombstone_cursor = _split_cursor(cursor)
+    settle = getattr(settings, 'JOBS_CHANGE_FEED_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    horizon = timezone.now() - timedelta(seconds=settle)
+    changed = paginate_keyset(Job.objects.filter(updated_at__lt=horizon), JOB_KEYS, job_cursor, limit)
+    deleted = paginate_keyset(
+        JobTombstone.objects.filter(deleted_at__lt=horizon), TOMBSTONE_KEYS, tombstone_cursor, limit,
+    )
+    next_cursor = '.'.join([
+        _position(changed.items, JOB_KEYS, job_cursor),
+        _position(deleted.items, TOMBSTONE_KEYS, tombstone_cursor),
+    ])
+    return changed.items, deleted.items, next_cursor, changed.has_next or deleted.has_next
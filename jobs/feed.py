@@ -0,0 +1,95 @@
+# Fan-out-on-write feed of open customer jobs per tradesman
+# When a customer posts an open job it is copied into OpenJobFeedEntry for every tradesman
+# whose trade matches (an indexed trade id lookup), and completion state is written onto
+# the entry as it changes. Tradesmen without a trade category see every open job, so
+# jobs whose trade is blank or unrecognised still reach someone. Reading the feed is then one range scan on
+# (tradesman, date_posted) with no trade matching or completion lookups.
+# REF-005: Django ORM - bulk_create(), update(), values_list()
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Job, OpenJobCompletion, OpenJobFeedEntry
+
+
+def is_open_job(job):
+    return job.owner_id is not None and (
+        Job.objects.filter(pk=job.pk, owner__profile__role='customer').exists()
+    )
+
+
+# Tradesmen in the trade plus those with no trade (only the latter for a job without one)
+def _matching_tradesman_ids(trade_category_id):
+    trades = Q(profile__trade_category=None)
+    if trade_category_id is not None:
+        trades |= Q(profile__trade_category_id=trade_category_id)
+    return set(User.objects.filter(trades, profile__role='tradesman').values_list('id', flat=True))
+
+
+# Make the job's feed entries match the tradesmen currently in its trade
+def fan_out_job(job):
+    tradesman_ids = _matching_tradesman_ids(job.trade_category_id) if is_open_job(job) else set()
+    with transaction.atomic():
+        OpenJobFeedEntry.objects.filter(job=job).exclude(tradesman_id__in=tradesman_ids).delete()
+        existing = set(OpenJobFeedEntry.objects.filter(job=job).values_list('tradesman_id', flat=True))
+        statuses = dict(
+            OpenJobCompletion.objects.filter(job=job).values_list('tradesman_id', 'status')
+        )
+        OpenJobFeedEntry.objects.bulk_create(
+            [
+                OpenJobFeedEntry(
+                    tradesman_id=tradesman_id,
+                    job=job,
+                    date_posted=job.date_posted,
+                    completion_status=statuses.get(tradesman_id, ''),
+                )
+                for tradesman_id in tradesman_ids - existing
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+# Rebuild one tradesman's feed, e.g. after they change trade (every open job when
+# trade_category_id is None)
+def rebuild_tradesman_feed(tradesman_id, trade_category_id):
+    with transaction.atomic():
+        clear_tradesman_feed(tradesman_id)
+        statuses = dict(
+            OpenJobCompletion.objects.filter(tradesman_id=tradesman_id).values_list('job_id', 'status')
+        )
+        jobs = Job.objects.filter(owner__profile__role='customer')
+        if trade_category_id is not None:
+            jobs = jobs.filter(trade_category_id=trade_category_id)
+        jobs = jobs.values_list('id', 'date_posted')
+        entries = OpenJobFeedEntry.objects.bulk_create(
+            [
+                OpenJobFeedEntry(
+                    tradesman_id=tradesman_id,
+                    job_id=job_id,
+                    date_posted=date_posted,
+                    completion_status=statuses.get(job_id, ''),
+                )
+                for job_id, date_posted in jobs.iterator(chunk_size=500)
+            ],
+            batch_size=500,
+        )
+    return len(entries)
+
+
+# Empty the feed of a user who is no longer a tradesman
+def clear_tradesman_feed(user_id):
+    OpenJobFeedEntry.objects.filter(tradesman_id=user_id).delete()
+
+
+# Rebuild every tradesman's feed - returns the number of entries written
+def rebuild_all_feeds():
+    total = 0
+    tradesmen = User.objects.filter(profile__role='tradesman').values_list('id', 'profile__trade_category_id')
+    for tradesman_id, trade_category_id in tradesmen:
+        total += rebuild_tradesman_feed(tradesman_id, trade_category_id)
+    return total
+
+
+def record_completion_status(job_id, tradesman_id, status):
+    OpenJobFeedEntry.objects.filter(job_id=job_id, tradesman_id=tradesman_id).update(completion_status=status)
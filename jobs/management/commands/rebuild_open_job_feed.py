@@ -0,0 +1,13 @@
+# Recompute every tradesman's materialised open-job feed
+# Usage: python manage.py rebuild_open_job_feed
+from django.core.management.base import BaseCommand
+
+from jobs.feed import rebuild_all_feeds
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-tradesman open job feed from open jobs and completions'
+
+    def handle(self, *args, **options):
+        count = rebuild_all_feeds()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} open job feed entries.'))
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:36
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copies of the taxonomy helpers as they were when this migration was written (old
+# suffix stemmer included; jobs/0017 re-keys the aliases), so later changes to
+# jobs/trades.py and core/text.py don't change what it does. Unlike the original code,
+# unknown job trades are left unlinked instead of becoming new trades.
+WORD_RE = re.compile(r'[a-z0-9]+')
+SUFFIXES = (
+    ('ians', ''), ('ings', ''), ('ical', 'ic'), ('ries', ''), ('ian', ''), ('ing', ''),
+    ('ers', ''), ('ies', 'y'), ('er', ''), ('ry', ''), ('s', ''),
+)
+DEFAULT_TRADES = {
+    'Plumber': ['plumbing', 'plumbers', 'heating engineer', 'gas fitter'],
+    'Electrician': ['electrical', 'electric', 'electricians', 'sparky'],
+    'Carpenter': ['carpentry', 'joiner', 'joinery', 'woodwork'],
+    'Painter': ['painting', 'decorator', 'decorating', 'painter and decorator'],
+    'Roofer': ['roofing', 'roof repair', 'guttering'],
+    'Builder': ['building', 'construction', 'bricklayer', 'bricklaying'],
+    'Plasterer': ['plastering', 'drylining'],
+    'Tiler': ['tiling', 'tiles'],
+    'Gardener': ['gardening', 'landscaper', 'landscaping'],
+    'Locksmith': ['locks'],
+    'Cleaner': ['cleaning'],
+    'Handyman': ['odd jobs', 'general maintenance'],
+}
+
+
+def stem(word):
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def trade_key(text):
+    return ' '.join(stem(word) for word in WORD_RE.findall((text or '').lower()))
+
+
+def seed_default_trades(Trade, TradeAlias):
+    for name, synonyms in DEFAULT_TRADES.items():
+        trade, _ = Trade.objects.get_or_create(name=name)
+        for text in [name, *synonyms]:
+            key = trade_key(text)
+            if key:
+                TradeAlias.objects.get_or_create(key=key, defaults={'trade': trade})
+
+
+def resolve_trade(text, TradeAlias):
+    key = trade_key(text)
+    if not key:
+        return None
+    words = key.split()
+    aliases = {
+        alias.key: alias.trade
+        for alias in TradeAlias.objects.filter(key__in={key, *words}).select_related('trade')
+    }
+    for candidate in [key, *words]:
+        if candidate in aliases:
+            return aliases[candidate]
+    return None
+
+
+def map_job_trades(apps, schema_editor):
+    """Seed the built-in trades and link existing free-text Job.trade values to them"""
+    Trade = apps.get_model('jobs', 'Trade')
+    TradeAlias = apps.get_model('jobs', 'TradeAlias')
+    Job = apps.get_model('jobs', 'Job')
+    seed_default_trades(Trade, TradeAlias)
+    texts = Job.objects.exclude(trade__isnull=True).exclude(trade='').values_list('trade', flat=True).distinct()
+    for text in list(texts):
+        trade = resolve_trade(text, TradeAlias)
+        if trade is not None:
+            Job.objects.filter(trade=text).update(trade_category=trade)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_openjobcompletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='trade_category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='jobs.trade'),
+        ),
+        migrations.CreateModel(
+            name='TradeAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Normalised text, e.g. "plumb" for Plumbing/Plumber', max_length=100, unique=True)),
+                ('trade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='jobs.trade')),
+            ],
+            options={
+                'verbose_name_plural': 'trade aliases',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.RunPython(
+            code=map_job_trades,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_open_job_feed(apps, schema_editor):
+    """Fan existing open customer jobs out to the tradesmen in their trade"""
+    Job = apps.get_model('jobs', 'Job')
+    OpenJobCompletion = apps.get_model('jobs', 'OpenJobCompletion')
+    OpenJobFeedEntry = apps.get_model('jobs', 'OpenJobFeedEntry')
+    Profile = apps.get_model('users', 'Profile')
+    statuses = {
+        (job_id, tradesman_id): status
+        for job_id, tradesman_id, status in OpenJobCompletion.objects.values_list('job_id', 'tradesman_id', 'status')
+    }
+    tradesmen = Profile.objects.filter(role='tradesman', trade_category__isnull=False).values_list('user_id', 'trade_category_id')
+    for tradesman_id, trade_category_id in tradesmen:
+        jobs = Job.objects.filter(
+            owner__profile__role='customer', trade_category_id=trade_category_id,
+        ).values_list('id', 'date_posted')
+        OpenJobFeedEntry.objects.bulk_create(
+            [
+                OpenJobFeedEntry(
+                    tradesman_id=tradesman_id,
+                    job_id=job_id,
+                    date_posted=date_posted,
+                    completion_status=statuses.get((job_id, tradesman_id), ''),
+                )
+                for job_id, date_posted in jobs
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_trade_taxonomy'),
+        ('users', '0008_profile_trade_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpenJobFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_posted', models.DateTimeField()),
+                ('completion_status', models.CharField(blank=True, choices=[('awaiting_confirmation', 'Awaiting Confirmation'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='', max_length=25)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='jobs.job')),
+                ('tradesman', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_job_feed', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'open job feed entries',
+                'ordering': ['-date_posted', '-job_id'],
+                'indexes': [models.Index(fields=['tradesman', '-date_posted', '-job'], name='jobs_feed_tradesman_idx')],
+                'unique_together': {('tradesman', 'job')},
+            },
+        ),
+        migrations.RunPython(
+            code=backfill_open_job_feed,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SYNTHETIC_PREFIX = 'Completed: '
+SYNTHETIC_MESSAGE = 'Completed open job: '
+
+
+def link_open_job_reviews(apps, schema_editor):
+    """Move reviews off the synthetic "Completed: <title>" jobs onto their OpenJobCompletion"""
+    Job = apps.get_model('jobs', 'Job')
+    JobRequest = apps.get_model('jobs', 'JobRequest')
+    JobReview = apps.get_model('jobs', 'JobReview')
+    OpenJobCompletion = apps.get_model('jobs', 'OpenJobCompletion')
+
+    synthetic_requests = JobRequest.objects.filter(
+        job__title__startswith=SYNTHETIC_PREFIX,
+        message__startswith=SYNTHETIC_MESSAGE,
+        job__owner__isnull=False,
+    ).select_related('job')
+    moved_request_ids, synthetic_job_ids = [], set()
+    for job_request in synthetic_requests:
+        synthetic_job_ids.add(job_request.job_id)
+        open_title = job_request.job.title[len(SYNTHETIC_PREFIX):]
+        completion = (
+            OpenJobCompletion.objects.filter(
+                job__owner_id=job_request.customer_id,
+                job__title=open_title,
+                tradesman_id=job_request.job.owner_id,
+                status='completed',
+                review__isnull=True,
+            )
+            .order_by('-completed_at')
+            .first()
+        )
+        if completion is None:
+            continue
+        JobReview.objects.filter(job_request=job_request).update(job_request=None, completion=completion)
+        moved_request_ids.append(job_request.id)
+
+    JobRequest.objects.filter(id__in=moved_request_ids).delete()
+    # Only drop synthetic jobs that have nothing left pointing at them
+    Job.objects.filter(id__in=synthetic_job_ids, requests__isnull=True).delete()
+
+
+def unlink_open_job_reviews(apps, schema_editor):
+    """Recreate the synthetic job and request for every open job completion review"""
+    Job = apps.get_model('jobs', 'Job')
+    JobRequest = apps.get_model('jobs', 'JobRequest')
+    JobReview = apps.get_model('jobs', 'JobReview')
+    for review in JobReview.objects.filter(completion__isnull=False).select_related('completion__job'):
+        open_job = review.completion.job
+        job, _ = Job.objects.get_or_create(
+            owner_id=review.completion.tradesman_id,
+            title=f'{SYNTHETIC_PREFIX}{open_job.title}',
+            defaults={
+                'description': f'{SYNTHETIC_MESSAGE}{open_job.description}',
+                'location': open_job.location,
+                'trade': open_job.trade,
+                'trade_category_id': open_job.trade_category_id,
+            },
+        )
+        job_request, _ = JobRequest.objects.get_or_create(
+            job=job,
+            customer_id=open_job.owner_id,
+            defaults={'message': f'{SYNTHETIC_MESSAGE}{open_job.title}', 'status': 'completed'},
+        )
+        review.job_request = job_request
+        review.completion = None
+        review.save(update_fields=['job_request', 'completion'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_openjobfeedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobreview',
+            name='completion',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review', to='jobs.openjobcompletion'),
+        ),
+        migrations.AlterField(
+            model_name='jobreview',
+            name='job_request',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review', to='jobs.jobrequest'),
+        ),
+        migrations.RunPython(
+            code=link_open_job_reviews,
+            reverse_code=unlink_open_job_reviews,
+        ),
+        migrations.AddConstraint(
+            model_name='jobreview',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('completion__isnull', True), ('job_request__isnull', False)), models.Q(('completion__isnull', False), ('job_request__isnull', True)), _connector='OR'), name='jobs_review_single_target'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0012_open_job_completion_reviews'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['date_posted', 'id'], name='jobs_job_posted_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_existing_jobs(apps, schema_editor):
+    """Start the version stamp of existing jobs at their posting time"""
+    apps.get_model('jobs', 'Job').objects.update(updated_at=F('date_posted'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0013_job_posted_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(
+            code=stamp_existing_jobs,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['updated_at', 'id'], name='jobs_job_updated_idx'),
+        ),
+    ]
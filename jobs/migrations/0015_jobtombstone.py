@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0014_job_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='jobs_tombstone_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0015_jobtombstone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobrequestimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.blob_storage, upload_to='job_requests/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='jobreview',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.blob_storage, upload_to='reviews/%Y/%m/'),
+        ),
+    ]
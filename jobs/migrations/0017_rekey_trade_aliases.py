@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:12
+
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+# TradeAlias keys move from the old suffix table to the Snowball English stemmer
+# (core/text.py). The helpers and built-in taxonomy are copied here so later changes to
+# jobs/trades.py don't change this migration.
+WORD_RE = re.compile(r'[a-z0-9]+')
+DEFAULT_TRADES = {
+    'Plumber': ['plumbing', 'plumbers', 'heating engineer', 'gas fitter'],
+    'Electrician': ['electrical', 'electric', 'electricians', 'sparky'],
+    'Carpenter': ['carpentry', 'joiner', 'joinery', 'woodwork'],
+    'Painter': ['painting', 'decorator', 'decorating', 'painter and decorator'],
+    'Roofer': ['roofing', 'roof repair', 'guttering'],
+    'Builder': ['building', 'construction', 'bricklayer', 'bricklaying'],
+    'Plasterer': ['plastering', 'drylining'],
+    'Tiler': ['tiling', 'tiles'],
+    'Gardener': ['gardening', 'landscaper', 'landscaping'],
+    'Locksmith': ['locks'],
+    'Cleaner': ['cleaning'],
+    'Handyman': ['odd jobs', 'general maintenance'],
+}
+
+
+def rekey_trade_aliases(apps, schema_editor):
+    """Restem alias keys, reseed the built-in aliases and add the linked free-text trades"""
+    Trade = apps.get_model('jobs', 'Trade')
+    TradeAlias = apps.get_model('jobs', 'TradeAlias')
+    Job = apps.get_model('jobs', 'Job')
+    Profile = apps.get_model('users', 'Profile')
+    stemmer = snowballstemmer.stemmer('english')
+
+    def trade_key(text):
+        return ' '.join(stemmer.stemWords(WORD_RE.findall((text or '').lower())))
+
+    # Best effort for aliases whose original text is gone (admin-added ones)
+    for alias in list(TradeAlias.objects.all()):
+        key = trade_key(alias.key)
+        if key == alias.key:
+            continue
+        if not key or TradeAlias.objects.filter(key=key).exists():
+            alias.delete()
+        else:
+            alias.key = key
+            alias.save(update_fields=['key'])
+
+    for name, synonyms in DEFAULT_TRADES.items():
+        trade, _ = Trade.objects.get_or_create(name=name)
+        for text in [name, *synonyms]:
+            TradeAlias.objects.get_or_create(key=trade_key(text), defaults={'trade': trade})
+
+    # The stored free text of linked jobs and profiles keeps resolving to the same trade
+    for model in (Job, Profile):
+        linked = (
+            model.objects.exclude(trade_category=None).exclude(trade=None).exclude(trade='')
+            .values_list('trade', 'trade_category_id').distinct()
+        )
+        for text, trade_id in linked:
+            key = trade_key(text)
+            if key:
+                TradeAlias.objects.get_or_create(key=key[:100], defaults={'trade_id': trade_id})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0016_content_addressed_uploads'),
+        ('users', '0015_search_document_stemming'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=rekey_trade_aliases,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:05
+
+from django.db import migrations
+
+
+def backfill_untraded_feeds(apps, schema_editor):
+    """Give tradesmen without a trade category every open customer job"""
+    Job = apps.get_model('jobs', 'Job')
+    OpenJobCompletion = apps.get_model('jobs', 'OpenJobCompletion')
+    OpenJobFeedEntry = apps.get_model('jobs', 'OpenJobFeedEntry')
+    Profile = apps.get_model('users', 'Profile')
+    jobs = list(Job.objects.filter(owner__profile__role='customer').values_list('id', 'date_posted'))
+    tradesmen = Profile.objects.filter(role='tradesman', trade_category__isnull=True).values_list('user_id', flat=True)
+    for tradesman_id in tradesmen:
+        statuses = dict(OpenJobCompletion.objects.filter(tradesman_id=tradesman_id).values_list('job_id', 'status'))
+        OpenJobFeedEntry.objects.bulk_create(
+            [
+                OpenJobFeedEntry(
+                    tradesman_id=tradesman_id,
+                    job_id=job_id,
+                    date_posted=date_posted,
+                    completion_status=statuses.get(job_id, ''),
+                )
+                for job_id, date_posted in jobs
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0017_rekey_trade_aliases'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=backfill_untraded_feeds,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
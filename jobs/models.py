@@ -1,5 +1,35 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.storage import blob_storage
+from .trades import resolve_trade
+
+
+# Trade taxonomy - one row per trade, with the different ways people write it as aliases
+# Profiles and jobs link to a Trade so trade filtering is an indexed id lookup
+# REF-001: Django Models Documentation - ForeignKey, unique fields
+class Trade(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+# Synonym/alias for a Trade, stored in normalised (stemmed) form - see jobs/trades.py
+class TradeAlias(models.Model):
+    trade = models.ForeignKey(Trade, on_delete=models.CASCADE, related_name='aliases')
+    key = models.CharField(max_length=100, unique=True, help_text='Normalised text, e.g. "plumb" for Plumbing/Plumber')
+
+    class Meta:
+        ordering = ['key']
+        verbose_name_plural = 'trade aliases'
+
+    def __str__(self):
+        return f"{self.key} -> {self.trade.name}"
 
 
 # Job model - represents a service offering or job posting
@@ -17,10 +47,32 @@ class Job(models.Model):
     # Trade field - specifies what type of trade this job is for (plumber, electrician, etc.)
     # Used to filter open jobs so tradesmen only see jobs relevant to their trade
     trade = models.CharField(max_length=100, blank=True, null=True)
+    # Normalised trade the free text maps to (set automatically on save)
+    trade_category = models.ForeignKey(Trade, on_delete=models.SET_NULL, related_name='jobs', blank=True, null=True)
+    # Version stamp for conditional GETs of the jobs API (ETag / Last-Modified)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Jobs API pages, newest first (keyset on date_posted, id)
+            models.Index(fields=['date_posted', 'id'], name='jobs_job_posted_idx'),
+            # Latest change of a filtered job list
+            models.Index(fields=['updated_at', 'id'], name='jobs_job_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.location}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'trade' in update_fields:
+            self.trade_category = resolve_trade(self.trade) if self.trade else None
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'trade_category'}
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at'}
+        super().save(*args, **kwargs)
+
 
 
 # JobRequest model - tracks when a customer requests a tradesman's service
@@ -53,26 +105,55 @@ class JobRequest(models.Model):
 
 
 # JobReview model - stores customer reviews after job completion
+# A review belongs to exactly one of a JobRequest (a customer hiring a tradesman's
+# service) or an OpenJobCompletion (a tradesman completing a customer's open job)
 # REF-001: Django Models - OneToOneField prevents duplicate reviews; ImageField (Iteration 4 US 28)
 class JobReview(models.Model):
-    job_request = models.OneToOneField(JobRequest, on_delete=models.CASCADE, related_name='review')
+    job_request = models.OneToOneField(JobRequest, on_delete=models.CASCADE, related_name='review', null=True, blank=True)
+    completion = models.OneToOneField(
+        'OpenJobCompletion', on_delete=models.CASCADE, related_name='review', null=True, blank=True,
+    )
     rating = models.PositiveSmallIntegerField()
     comment = models.TextField(blank=True)
-    photo = models.ImageField(upload_to='reviews/%Y/%m/', blank=True, null=True)
+    # Content-addressed: a photo uploaded twice is stored once (core/storage.py)
+    photo = models.ImageField(upload_to='reviews/%Y/%m/', storage=blob_storage, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']  # Most recent reviews first
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(job_request__isnull=False, completion__isnull=True)
+                    | models.Q(job_request__isnull=True, completion__isnull=False)
+                ),
+                name='jobs_review_single_target',
+            ),
+        ]
+
+    # The customer who wrote the review
+    @property
+    def reviewer(self):
+        if self.completion_id:
+            return self.completion.job.owner
+        return self.job_request.customer
+
+    @property
+    def reviewed_job(self):
+        if self.completion_id:
+            return self.completion.job
+        return self.job_request.job
 
     def __str__(self):
-        return f"Review for {self.job_request.job.title} ({self.rating}/5)"
+        return f"Review for {self.reviewed_job.title} ({self.rating}/5)"
 
 
 # Iteration 4 (US 28): Photos attached to job requests (customers upload when requesting)
 # REF-001: Django Models Documentation - ForeignKey and ImageField
 class JobRequestImage(models.Model):
     job_request = models.ForeignKey(JobRequest, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='job_requests/%Y/%m/')
+    # Content-addressed: a photo uploaded twice is stored once (core/storage.py)
+    image = models.ImageField(upload_to='job_requests/%Y/%m/', storage=blob_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -104,3 +185,45 @@ class OpenJobCompletion(models.Model):
     def __str__(self):
         return f"{self.tradesman.username} completed {self.job.title} ({self.status})"
 
+
+
+# Materialised open-job feed - one row per (tradesman, open customer job in their trade)
+# Written when a customer posts an open job (fan-out on write, see jobs/feed.py) so the
+# tradesman dashboard and open jobs board are a single indexed range read per tradesman.
+# completion_status mirrors this tradesman's OpenJobCompletion for the job, if any.
+# REF-001: Django Models Documentation - Meta indexes and unique_together
+class OpenJobFeedEntry(models.Model):
+    tradesman = models.ForeignKey(User, on_delete=models.CASCADE, related_name='open_job_feed')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='feed_entries')
+    # Copied from the job so the feed can be ordered without joining it
+    date_posted = models.DateTimeField()
+    completion_status = models.CharField(
+        max_length=25, choices=OpenJobCompletion.STATUS_CHOICES, blank=True, default='',
+    )
+
+    class Meta:
+        unique_together = [['tradesman', 'job']]
+        ordering = ['-date_posted', '-job_id']
+        indexes = [
+            models.Index(fields=['tradesman', '-date_posted', '-job'], name='jobs_feed_tradesman_idx'),
+        ]
+        verbose_name_plural = 'open job feed entries'
+
+    def __str__(self):
+        return f"{self.job.title} for {self.tradesman.username}"
+
+
+# Record of a deleted job for the jobs change feed (jobs/changes.py), so clients mirroring
+# the job list learn about deletes as well as changes. Written by the Job post_delete signal.
+# REF-001: Django Models Documentation - Meta indexes
+class JobTombstone(models.Model):
+    job_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='jobs_tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
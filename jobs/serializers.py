@@ -1,7 +1,37 @@
+# Serializers for the jobs REST API (jobs/views.py)
 from rest_framework import serializers
+
 from .models import Job
+from .trades import resolve_trade
+
+
+# Job.save() maps the free-text trade to a Trade; bulk writes skip save(), so they do it here
+def resolve_trades(jobs):
+    trades = {}
+    for job in jobs:
+        if job.trade and job.trade not in trades:
+            trades[job.trade] = resolve_trade(job.trade)
+        job.trade_category = trades.get(job.trade) if job.trade else None
+
+
+class JobListSerializer(serializers.ListSerializer):
+    # A batch of new jobs is one multi-row INSERT
+    def create(self, validated_data):
+        jobs = [Job(**item) for item in validated_data]
+        resolve_trades(jobs)
+        return Job.objects.bulk_create(jobs, batch_size=500)
+
 
 class JobSerializer(serializers.ModelSerializer):
     class Meta:
         model = Job
         fields = '__all__'
+        read_only_fields = ('owner', 'trade_category', 'date_posted')
+        list_serializer_class = JobListSerializer
+
+    # fields=('id', 'title') limits the output to those fields
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
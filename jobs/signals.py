@@ -0,0 +1,57 @@
+# Signal handlers for the jobs app - keep the open-job feed (jobs/feed.py) in sync,
+# leave a tombstone for the change feed (jobs/changes.py) when a job is deleted, link
+# jobs and profiles to a trade when an admin adds an alias for their text, and
+# queue downscaled variants (core/images.py) of review photos and job request images
+# REF-001: Django Models Documentation - model signals (post_save, post_delete)
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.images import schedule_variants_on_commit
+from .feed import fan_out_job, record_completion_status
+from .models import Job, JobRequestImage, JobReview, JobTombstone, OpenJobCompletion, TradeAlias
+from .trades import link_unmatched_trades
+
+
+# New open jobs fan out to matching tradesmen; a changed trade re-targets the entries
+@receiver(post_save, sender=Job)
+def fan_out_open_job(sender, instance, created, update_fields=None, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if not created and update_fields is not None and not {'trade', 'trade_category', 'owner'} & set(update_fields):
+        return
+    fan_out_job(instance)
+
+
+# Unknown trade text stays unlinked until an alias for it exists
+@receiver(post_save, sender=TradeAlias)
+def link_trades_for_alias(sender, **kwargs):
+    if not kwargs.get('raw'):
+        link_unmatched_trades()
+
+
+# Written in the deleting transaction, so a rolled back delete leaves no tombstone
+@receiver(post_delete, sender=Job)
+def record_job_tombstone(sender, instance, **kwargs):
+    JobTombstone.objects.create(job_id=instance.pk)
+
+
+@receiver(post_save, sender=OpenJobCompletion)
+def sync_feed_completion_status(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        record_completion_status(instance.job_id, instance.tradesman_id, instance.status)
+
+
+@receiver(post_delete, sender=OpenJobCompletion)
+def clear_feed_completion_status(sender, instance, **kwargs):
+    record_completion_status(instance.job_id, instance.tradesman_id, '')
+
+
+# Several images saved by one request are resized in parallel once it commits
+@receiver(post_save, sender=JobReview)
+@receiver(post_save, sender=JobRequestImage)
+def generate_image_variants(sender, instance, update_fields=None, **kwargs):
+    field = 'photo' if sender is JobReview else 'image'
+    if kwargs.get('raw') or (update_fields is not None and field not in update_fields):
+        return
+    fieldfile = getattr(instance, field)
+    schedule_variants_on_commit([fieldfile.name], fieldfile.storage)
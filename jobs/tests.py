@@ -1,3 +1,291 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import Profile
+from .feed import fan_out_job, rebuild_tradesman_feed
+from .models import Job, JobTombstone, OpenJobCompletion, OpenJobFeedEntry, Trade, TradeAlias
+from .throttles import JobWriteThrottle
+from .trades import matching_trade_ids, resolve_trade
+
+
+class JobApiTests(TestCase):
+    def setUp(self):
+        caches['throttle'].clear()
+        self.owner = User.objects.create_user(username='owner', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        for i in range(5):
+            Job.objects.create(
+                title=f'Job {i}', description='d', location='Cork' if i % 2 else 'Dublin',
+                trade='Plumber' if i < 3 else 'Electrician', owner=self.owner if i < 4 else self.other,
+            )
+        self.url = reverse('job_list')
+
+    def test_pages_newest_first_with_cursor(self):
+        data = self.client.get(self.url, {'page_size': 2, 'fields': 'id,title'}).json()
+        self.assertEqual([job['title'] for job in data['results']], ['Job 4', 'Job 3'])
+        self.assertEqual(set(data['results'][0]), {'id', 'title'})
+        titles = []
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            titles += [job['title'] for job in data['results']]
+        self.assertEqual(titles, ['Job 2', 'Job 1', 'Job 0'])
+
+    def test_filters(self):
+        def titles(**params):
+            return sorted(job['title'] for job in self.client.get(self.url, params).json()['results'])
+
+        self.assertEqual(titles(trade='plumb'), ['Job 0', 'Job 1', 'Job 2'])
+        self.assertEqual(titles(location='cork'), ['Job 1', 'Job 3'])
+        self.assertEqual(titles(owner=self.other.id), ['Job 4'])
+        self.assertEqual(titles(trade='electrician', location='dublin'), ['Job 4'])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'fields': 'title,password'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'owner': 'me'}).status_code, 400)
+
+    def test_export_streams_every_job(self):
+        response = self.client.get(self.url, {'export': 'json', 'fields': 'id,location', 'location': 'dublin'})
+        self.assertTrue(response.streaming)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([row['location'] for row in rows], ['Dublin'] * 3)
+        self.assertEqual(set(rows[0]), {'id', 'location'})
+
+    def test_writes_need_the_owner(self):
+        job = Job.objects.get(title='Job 0')
+        detail = reverse('job_detail', args=[job.id])
+        self.assertEqual(self.client.post(self.url, {'title': 'x'}).status_code, 403)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.patch(detail, {'title': 'Mine now'}, content_type='application/json').status_code, 403)
+        self.client.force_login(self.owner)
+        response = self.client.patch(detail, {'title': 'Renamed'}, content_type='application/json')
+        self.assertEqual(response.json()['title'], 'Renamed')
+
+    def test_bulk_create_and_update(self):
+        customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=customer, role='customer')
+        plumber = User.objects.create_user(username='plumber', password='pw')
+        Profile.objects.create(user=plumber, role='tradesman', trade='Plumber')
+        self.client.force_login(customer)
+        bulk = reverse('job_bulk')
+
+        items = [{'title': f'Leak {i}', 'description': 'd', 'location': 'Cork', 'trade': 'Plumber'} for i in range(3)]
+        response = self.client.post(bulk, items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        created = Job.objects.filter(owner=customer)
+        self.assertEqual(created.count(), 3)
+        self.assertEqual(OpenJobFeedEntry.objects.filter(tradesman=plumber).count(), 3)
+
+        ids = [job['id'] for job in response.json()]
+        changes = [{'id': ids[0], 'title': 'Burst pipe'}, {'id': ids[1], 'trade': 'Electrician'}]
+        response = self.client.patch(bulk, changes, content_type='application/json')
+        self.assertEqual([job['title'] for job in response.json()], ['Burst pipe', 'Leak 1'])
+        self.assertEqual(Job.objects.get(id=ids[1]).trade_category.name, 'Electrician')
+        self.assertEqual(OpenJobFeedEntry.objects.filter(tradesman=plumber).count(), 2)
+
+        theirs = [{'id': Job.objects.get(title='Job 0').id, 'title': 'Hijacked'}]
+        self.assertEqual(self.client.patch(bulk, theirs, content_type='application/json').status_code, 403)
+        too_many = [items[0]] * 101
+        self.assertEqual(self.client.post(bulk, too_many, content_type='application/json').status_code, 400)
+
+    def test_writes_are_throttled_per_user(self):
+        self.client.force_login(self.owner)
+        job = {'title': 'New', 'description': 'd', 'location': 'Cork'}
+        with mock.patch.object(JobWriteThrottle, 'rate', '2/minute', create=True):
+            statuses = [self.client.post(self.url, job, content_type='application/json').status_code for _ in range(3)]
+            self.assertEqual(statuses, [201, 201, 429])
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+            # Counted in the shared throttle cache, not the default one
+            cache.clear()
+            self.assertEqual(self.client.post(self.url, job, content_type='application/json').status_code, 429)
+
+    def test_conditional_get(self):
+        job = Job.objects.get(title='Job 0')
+        detail = reverse('job_detail', args=[job.id])
+        response = self.client.get(detail)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.client.get(detail, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        listing = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(self.client.get(self.url, {'page_size': 2}, HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 304)
+
+        job.title = 'Changed'
+        job.save(update_fields=['title'])
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {'page_size': 2}, HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 200)
+
+    def test_deleting_an_older_job_moves_last_modified(self):
+        # Every job last changed an hour ago, so a delete lands in a later second
+        Job.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        Job.objects.get(title='Job 0').delete()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Job 0', [job['title'] for job in response.json()['results']])
+
+    @override_settings(JOBS_CHANGE_FEED_SETTLE_SECONDS=0)
+    def test_change_feed_returns_deltas(self):
+        url = reverse('job_changes')
+
+        def sync(cursor=None, page_size=3):
+            changed, deleted = [], []
+            while True:
+                data = self.client.get(url, {'cursor': cursor or '', 'page_size': page_size}).json()
+                changed += [job['title'] for job in data['changed']]
+                deleted += [tombstone['id'] for tombstone in data['deleted']]
+                cursor = data['cursor']
+                if not data['has_more']:
+                    return changed, deleted, cursor
+
+        changed, deleted, cursor = sync()
+        self.assertEqual(changed, [f'Job {i}' for i in range(5)])
+        self.assertEqual(sync(cursor)[:2], ([], []))
+
+        job = Job.objects.get(title='Job 1')
+        job.title = 'Job 1 (edited)'
+        job.save()
+        gone = Job.objects.get(title='Job 3')
+        gone_id = gone.id
+        gone.delete()
+        changed, deleted, cursor = sync(cursor)
+        self.assertEqual((changed, deleted), (['Job 1 (edited)'], [gone_id]))
+        self.assertEqual(JobTombstone.objects.get().job_id, gone_id)
+        self.assertEqual(sync(cursor)[:2], ([], []))
+        self.assertEqual(self.client.get(url, {'cursor': 'nonsense'}).status_code, 400)
+
+
+# Free-text trades resolve through the seeded taxonomy (jobs/trades.py)
+class TradeTaxonomyTests(TestCase):
+    def test_aliases_resolve_whole_phrases_and_single_words(self):
+        plumber = Trade.objects.get(name='Plumber')
+        painter = Trade.objects.get(name='Painter')
+        for text in ('Plumber', 'plumbing', 'PLUMBERS', 'Emergency plumber', 'heating engineer'):
+            with self.subTest(text=text):
+                self.assertEqual(resolve_trade(text), plumber)
+        self.assertEqual(resolve_trade('Painter and Decorator'), painter)
+        self.assertEqual(resolve_trade('decorating'), painter)
+        self.assertEqual(matching_trade_ids('plu'), {plumber.id})
+
+    def test_unknown_trades_stay_unlinked_until_an_alias_exists(self):
+        trades = Trade.objects.count()
+        owner = User.objects.create_user(username='owner', password='pw')
+        job = Job.objects.create(owner=owner, title='Fix', description='d', location='Cork', trade='plumbr')
+        tradesman = User.objects.create_user(username='tradesman', password='pw')
+        profile = Profile.objects.create(user=tradesman, role='tradesman', trade='plumbr')
+        self.assertIsNone(resolve_trade('asdf'))
+        self.assertIsNone(job.trade_category)
+        self.assertIsNone(profile.trade_category)
+        self.assertEqual(Trade.objects.count(), trades)
+
+        # An admin adds the typo as an alias
+        TradeAlias.objects.create(key='plumbr', trade=Trade.objects.get(name='Plumber'))
+        job.refresh_from_db()
+        profile.refresh_from_db()
+        self.assertEqual(job.trade_category.name, 'Plumber')
+        self.assertEqual(profile.trade_category.name, 'Plumber')
+
+
+# Fan-out-on-write open job feed (jobs/feed.py)
+class OpenJobFeedTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.plumber = self._tradesman('plumber', 'Plumber')
+        self.other_plumber = self._tradesman('plumber2', 'plumbing')
+        self.electrician = self._tradesman('sparky', 'Electrician')
+
+    def _tradesman(self, username, trade):
+        user = User.objects.create_user(username=username, password='pw')
+        Profile.objects.create(user=user, role='tradesman', trade=trade)
+        return user
+
+    def _feed(self, tradesman):
+        return list(
+            OpenJobFeedEntry.objects.filter(tradesman=tradesman).values_list('job__title', 'completion_status')
+        )
+
+    def _job(self, title, trade, owner=None):
+        return Job.objects.create(owner=owner or self.customer, title=title, description='d', location='Cork', trade=trade)
+
+    def test_open_jobs_fan_out_to_their_trade(self):
+        leak = self._job('Leak', 'plumbing')
+        self._job('Rewire', 'Electrician')
+        # A tradesman's own service is not an open job
+        self._job('Plumbing service', 'Plumber', owner=self.plumber)
+        self.assertEqual(self._feed(self.plumber), [('Leak', '')])
+        self.assertEqual(self._feed(self.other_plumber), [('Leak', '')])
+        self.assertEqual(self._feed(self.electrician), [('Rewire', '')])
+
+        # Re-targeted when the job's trade changes; fan_out_job is idempotent
+        leak.trade = 'Electrician'
+        leak.save(update_fields=['trade'])
+        fan_out_job(leak)
+        self.assertEqual(self._feed(self.plumber), [])
+        self.assertEqual(self._feed(self.electrician), [('Rewire', ''), ('Leak', '')])
+
+    def test_rebuild_follows_trade_and_completion_state(self):
+        self._job('Leak', 'Plumber')
+        rewire = self._job('Rewire', 'Electrician')
+        OpenJobCompletion.objects.create(job=rewire, tradesman=self.plumber, status='awaiting_confirmation')
+        OpenJobFeedEntry.objects.filter(tradesman=self.plumber).delete()
+
+        self.assertEqual(rebuild_tradesman_feed(self.plumber.id, Trade.objects.get(name='Plumber').id), 1)
+        self.assertEqual(self._feed(self.plumber), [('Leak', '')])
+        # Changing trade rebuilds through the profile signal
+        profile = self.plumber.profile
+        profile.trade = 'Electrician'
+        profile.save()
+        self.assertEqual(self._feed(self.plumber), [('Rewire', 'awaiting_confirmation')])
+        # Without a trade every open job is in the feed
+        self.assertEqual(rebuild_tradesman_feed(self.plumber.id, None), 2)
+        self.assertEqual(self._feed(self.plumber), [('Rewire', 'awaiting_confirmation'), ('Leak', '')])
+
+    def test_tradesman_without_trade_sees_every_open_job(self):
+        generalist = self._tradesman('generalist', '')
+        self._job('Leak', 'Plumber')
+        odd_job = self._job('Odd job', 'Chimney sweep')  # no such trade
+        self.assertIsNone(odd_job.trade_category)
+        self.assertEqual(self._feed(generalist), [('Odd job', ''), ('Leak', '')])
+        self.assertEqual(self._feed(self.plumber), [('Leak', '')])
+
+        # The open jobs board reads the same feed
+        self.client.force_login(generalist)
+        response = self.client.get(reverse('open_jobs_board'), {'format': 'json'})
+        self.assertEqual([job['title'] for job in response.json()['results']], ['Odd job', 'Leak'])
+
+        # Joining a trade narrows the feed, leaving a customer empties it
+        profile = generalist.profile
+        profile.trade = 'Plumber'
+        profile.save()
+        self.assertEqual(self._feed(generalist), [('Leak', '')])
+        profile.role = 'customer'
+        profile.trade = ''
+        profile.save()
+        self.assertEqual(self._feed(generalist), [])
+
+    def test_open_job_needs_a_trade(self):
+        self.client.force_login(self.customer)
+        job = {'title': 'Fix sink', 'description': 'd', 'location': 'Cork', 'trade': ' '}
+        response = self.client.post(reverse('post_open_job'), job)
+        self.assertEqual(response.status_code, 200)  # the form again
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post(reverse('post_open_job'), {**job, 'trade': 'Plumber'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._feed(self.plumber), [('Fix sink', '')])
@@ -0,0 +1,37 @@
+# Rate limits for the jobs REST API - per client, so one busy client can't use up the
+# database for everyone. Anonymous clients are keyed by IP, signed-in ones by user id;
+# rates are REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] in core/settings.py.
+# Request histories live in the 'throttle' cache alias, which settings point at the
+# shared CACHE_DIR so every worker counts against the same limit.
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+
+class SharedCacheThrottle:
+    @property
+    def cache(self):
+        return caches[THROTTLE_CACHE_ALIAS]
+
+
+class ClientAnonThrottle(SharedCacheThrottle, AnonRateThrottle):
+    pass
+
+
+class ClientUserThrottle(SharedCacheThrottle, UserRateThrottle):
+    pass
+
+
+# Tighter limit on writes (a bulk request counts once, and is capped in size by the view)
+class JobWriteThrottle(ClientUserThrottle):
+    scope = 'job_writes'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+JOB_THROTTLES = [ClientAnonThrottle, ClientUserThrottle, JobWriteThrottle]
@@ -0,0 +1,92 @@
+# Trade taxonomy helpers
+# Free-text trades ("Plumbing", "plumbers", "Emergency plumber") are reduced to a
+# normalised key with the shared stemmer and looked up in TradeAlias, so Profile.trade and
+# Job.trade can be linked to one Trade row and filtered by an indexed id instead of
+# icontains chains. Text that matches no alias leaves the row unlinked (trade_category
+# NULL) - only the seed data and the admin create trades, so typos ("plumbr") don't become
+# trades. Admins find unmatched rows with the "Trade category: empty" filter, and adding
+# an alias for them links them (link_unmatched_trades, run on every TradeAlias save).
+# REF-005: Django ORM - get_or_create(), filter() with __in lookups
+from django.db.models import Q
+
+from core.text import tokenize
+
+# Built-in taxonomy: canonical trade -> other ways people describe it
+DEFAULT_TRADES = {
+    'Plumber': ['plumbing', 'plumbers', 'heating engineer', 'gas fitter'],
+    'Electrician': ['electrical', 'electric', 'electricians', 'sparky'],
+    'Carpenter': ['carpentry', 'joiner', 'joinery', 'woodwork'],
+    'Painter': ['painting', 'decorator', 'decorating', 'painter and decorator'],
+    'Roofer': ['roofing', 'roof repair', 'guttering'],
+    'Builder': ['building', 'construction', 'bricklayer', 'bricklaying'],
+    'Plasterer': ['plastering', 'drylining'],
+    'Tiler': ['tiling', 'tiles'],
+    'Gardener': ['gardening', 'landscaper', 'landscaping'],
+    'Locksmith': ['locks'],
+    'Cleaner': ['cleaning'],
+    'Handyman': ['odd jobs', 'general maintenance'],
+}
+
+
+def trade_key(text):
+    return ' '.join(tokenize(text))
+
+
+# Create the built-in trades and their aliases (safe to run repeatedly)
+def seed_default_trades():
+    from .models import Trade, TradeAlias
+    for name, synonyms in DEFAULT_TRADES.items():
+        trade, _ = Trade.objects.get_or_create(name=name)
+        for text in [name, *synonyms]:
+            key = trade_key(text)
+            if key:
+                TradeAlias.objects.get_or_create(key=key, defaults={'trade': trade})
+
+
+# Trade for a piece of free text: the whole phrase first, then any single word of it
+# ("Emergency plumber" -> Plumber); None when nothing matches
+def resolve_trade(text):
+    from .models import TradeAlias
+    key = trade_key(text)
+    if not key:
+        return None
+    words = key.split()
+    aliases = {
+        alias.key: alias.trade
+        for alias in TradeAlias.objects.filter(key__in={key, *words}).select_related('trade')
+    }
+    if key in aliases:
+        return aliases[key]
+    for word in words:
+        if word in aliases:
+            return aliases[word]
+    return None
+
+
+# Link the jobs and profiles whose trade text matched nothing before but does now
+# Rows are saved one by one so their signals move feeds and the search cache
+def link_unmatched_trades():
+    from users.models import Profile
+    from .models import Job
+    linked = 0
+    for model in (Job, Profile):
+        unmatched = model.objects.filter(trade_category=None).exclude(trade=None).exclude(trade='')
+        texts = [text for text in unmatched.values_list('trade', flat=True).distinct() if resolve_trade(text)]
+        for instance in unmatched.filter(trade__in=texts):
+            instance.save(update_fields=['trade'])
+            linked += 1
+    return linked
+
+
+# Ids of every trade a search box value could mean - exact phrase, single words, or a
+# prefix of an alias ("plu" while typing). Used for trade__in filters.
+def matching_trade_ids(text):
+    from .models import TradeAlias
+    key = trade_key(text)
+    if not key:
+        return set()
+    words = key.split()
+    return set(
+        TradeAlias.objects.filter(Q(key__in={key, *words}) | Q(key__startswith=key))
+        .values_list('trade_id', flat=True)
+    )
@@ -3,5 +3,7 @@ from . import views
 
 urlpatterns = [
     path('jobs/', views.job_list, name='job_list'),
-    path('jobs/<int:id>/', views.job_detail, name='job_detail'),
+    path('jobs/bulk/', views.job_bulk, name='job_bulk'),
+    path('jobs/changes/', views.job_changes, name='job_changes'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
 ]
@@ -1,55 +1,211 @@
 # REST API endpoints for jobs - used for JSON API calls
-# These were from the original React frontend setup, keeping them for API compatibility
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from django.shortcuts import get_object_or_404
-from django.utils.decorators import method_decorator
+# These were from the original React frontend setup, kept at the same URLs and now served
+# by a Django REST Framework viewset over JobSerializer. Lists are cursor-paginated
+# newest first; ?export=json streams every match instead, so neither holds more than a
+# page (or a chunk) of rows in memory. Batch clients create or update many jobs in one
+# request through /api/jobs/bulk/. GETs carry ETag / Last-Modified and are answered
+# with 304 from the jobs' updated_at (and deletions) when the client's copy is current.
+# Mirrors poll /api/jobs/changes/ for what changed or was deleted since their last sync.
+# REF-005: Django ORM - bulk_create(), bulk_update(), iterator(chunk_size)
 import json
-from .models import Job
-
-
-# GET all jobs or POST a new job
-@csrf_exempt
-def job_list(request):
-    if request.method == 'GET':
-        jobs = list(Job.objects.values())
-        return JsonResponse(jobs, safe=False)
-
-    elif request.method == 'POST':
-        data = json.loads(request.body)
-        job = Job.objects.create(
-            title=data.get('title'),
-            description=data.get('description'),
-            location=data.get('location'),
-            hourly_rate=data.get('hourly_rate')
-        )
-        return JsonResponse({'message': 'Job created successfully', 'job_id': job.id}, status=201)
-
-
-# GET, PUT, or DELETE a specific job by ID
-@csrf_exempt
-def job_detail(request, id):
-    job = get_object_or_404(Job, pk=id)
-
-    if request.method == 'GET':
-        return JsonResponse({
-            'id': job.id,
-            'title': job.title,
-            'description': job.description,
-            'location': job.location,
-            'hourly_rate': str(job.hourly_rate) if job.hourly_rate else None,
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from core.conditional import make_etag, not_modified, set_validators
+from core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, page_size_from
+from .changes import changes_since
+from .feed import fan_out_job
+from .models import Job, JobTombstone
+from .serializers import JobSerializer, resolve_trades
+from .throttles import JOB_THROTTLES
+from .trades import matching_trade_ids
+
+# Rows fetched per database round trip while streaming an export
+EXPORT_CHUNK_SIZE = 500
+# Most jobs a single bulk request may create or update
+BULK_MAX_ITEMS = 100
+
+
+class JobCursorPagination(CursorPagination):
+    ordering = ('-date_posted', '-id')  # index jobs_job_posted_idx
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class IsOwnerOrReadOnly(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return request.method in permissions.SAFE_METHODS or obj.owner_id == request.user.id
+
+
+class JobViewSet(viewsets.ModelViewSet):
+    serializer_class = JobSerializer
+    pagination_class = JobCursorPagination
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    throttle_classes = JOB_THROTTLES
+
+    # ?trade=plumb&location=cork&owner=12
+    def get_queryset(self):
+        jobs = Job.objects.all()
+        params = self.request.query_params
+        trade = params.get('trade', '').strip()
+        location = params.get('location', '').strip()
+        owner = params.get('owner', '').strip()
+        if trade:
+            jobs = jobs.filter(trade_category__in=matching_trade_ids(trade))
+        if location:
+            jobs = jobs.filter(location__icontains=location)
+        if owner:
+            if not owner.isdigit():
+                raise ValidationError({'owner': 'Must be a user id.'})
+            jobs = jobs.filter(owner_id=int(owner))
+        return jobs
+
+    # ?fields=id,title - unknown names are an error rather than silently dropped
+    def selected_fields(self):
+        requested = [f.strip() for f in self.request.query_params.get('fields', '').split(',') if f.strip()]
+        unknown = set(requested) - set(JobSerializer().fields)
+        if unknown:
+            raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+        return requested or None
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.selected_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    # Lists are versioned by the newest updated_at and the row count of the filtered set
+    # (one aggregate over jobs_job_updated_idx) plus the newest job deletion, so deleting
+    # an older job moves Last-Modified as well as the ETag for If-Modified-Since-only
+    # clients; pages differ by their query string
+    def list(self, request, *args, **kwargs):
+        version = self.get_queryset().aggregate(latest=Max('updated_at'), count=Count('id'))
+        deleted = JobTombstone.objects.aggregate(latest=Max('deleted_at'))['latest']
+        last_modified = max((stamp for stamp in (version['latest'], deleted) if stamp), default=None)
+        etag = make_etag('jobs', version['latest'], version['count'], deleted, request.get_full_path())
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        if request.query_params.get('export') == 'json':
+            response = self.export(request)
+        else:
+            response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    # The job's updated_at is read by primary key before the job itself is loaded
+    def retrieve(self, request, *args, **kwargs):
+        updated_at = Job.objects.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            raise NotFound()
+        etag = make_etag('job', kwargs['pk'], updated_at.isoformat(), request.get_full_path())
+        response = not_modified(request, etag, updated_at)
+        if response is not None:
+            return response
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, updated_at)
+
+    # Every matching job as one JSON array, serialized a chunk of rows at a time
+    def export(self, request):
+        fields = self.selected_fields()
+        jobs = self.get_queryset().order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        def rows():
+            yield '['
+            for i, job in enumerate(jobs):
+                yield (',' if i else '') + json.dumps(JobSerializer(job, fields=fields).data)
+            yield ']'
+        return StreamingHttpResponse(rows(), content_type='application/json')
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    # GET /api/jobs/changes/?cursor= - jobs changed and deleted since the cursor (jobs/changes.py)
+    # Start without a cursor for a full sync, then keep polling with the returned cursor;
+    # has_more means another batch is ready straight away
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        try:
+            jobs, tombstones, cursor, has_more = changes_since(
+                request.query_params.get('cursor'), page_size_from(request, MAX_PAGE_SIZE),
+            )
+        except InvalidCursor as exc:
+            raise ValidationError({'cursor': str(exc)})
+        return Response({
+            'changed': self.get_serializer(jobs, many=True).data,
+            'deleted': [{'id': t.job_id, 'deleted_at': t.deleted_at} for t in tombstones],
+            'cursor': cursor,
+            'has_more': has_more,
         })
 
-    elif request.method == 'PUT':
-        data = json.loads(request.body)
-        job.title = data.get('title', job.title)
-        job.description = data.get('description', job.description)
-        job.location = data.get('location', job.location)
-        job.hourly_rate = data.get('hourly_rate', job.hourly_rate)
-        job.save()
-        return JsonResponse({'message': 'Job updated successfully'})
-
-    elif request.method == 'DELETE':
-        job.delete()
-        return JsonResponse({'message': 'Job deleted successfully'})
+    # POST a list of new jobs, or PATCH a list of {"id": ..., changed fields} of your own
+    # jobs; each batch is one transaction with set-based writes
+    @action(detail=False, methods=['post', 'patch'])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': 'Expected a non-empty list of jobs.'})
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': f'At most {BULK_MAX_ITEMS} jobs per request.'})
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        return self._bulk_update(items)
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            jobs = serializer.save(owner=self.request.user)
+            # bulk_create() sends no post_save, so open jobs reach the tradesman feeds here
+            for job in jobs:
+                fan_out_job(job)
+        return Response(self.get_serializer(jobs, many=True).data, status=status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items):
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        if not all(isinstance(pk, int) for pk in ids) or len(set(ids)) != len(ids):
+            raise ValidationError({'id': 'Every job needs a distinct integer id.'})
+        jobs = Job.objects.in_bulk(ids)
+        if len(jobs) != len(ids):
+            raise NotFound(f'Unknown jobs: {sorted(set(ids) - set(jobs))}')
+        for job in jobs.values():
+            self.check_object_permissions(self.request, job)
+
+        updates, errors = [], []
+        for pk, item in zip(ids, items):
+            serializer = self.get_serializer(jobs[pk], data=item, partial=True)
+            errors.append({} if serializer.is_valid() else serializer.errors)
+            updates.append(serializer.validated_data)
+        if any(errors):
+            raise ValidationError(errors)
+
+        changed = {'updated_at'}  # bulk_update() doesn't apply auto_now
+        retraded = []
+        now = timezone.now()
+        for pk, data in zip(ids, updates):
+            for field, value in data.items():
+                setattr(jobs[pk], field, value)
+            jobs[pk].updated_at = now
+            changed.update(data)
+            if 'trade' in data:
+                retraded.append(jobs[pk])
+        with transaction.atomic():
+            if retraded:
+                resolve_trades(retraded)
+                changed.add('trade_category')
+            Job.objects.bulk_update(list(jobs.values()), sorted(changed), batch_size=500)
+            for job in retraded:
+                fan_out_job(job)
+        return Response(self.get_serializer([jobs[pk] for pk in ids], many=True).data)
+
+
+job_list = JobViewSet.as_view({'get': 'list', 'post': 'create'})
+job_detail = JobViewSet.as_view({'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'})
+job_bulk = JobViewSet.as_view({'post': 'bulk', 'patch': 'bulk'})
+job_changes = JobViewSet.as_view({'get': 'changes'})
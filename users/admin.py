@@ -1,23 +1,51 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import Profile, Notification, Favourite, Qualification
+from .models import Profile, Notification, Favourite, OutboundEmail, Qualification, TradesmanStats
 
 # REF-031: Iteration 4 - admin registration for Favourite, Qualification; qualification verification action
 
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ("user", "role", "trade", "service_area", "average_rating")
-    list_filter = ("role", "trade")
+    list_display = ("user", "role", "trade", "trade_category", "service_area", "average_rating")
+    # "Trade category: Empty" lists profiles whose trade text matches no alias yet
+    list_filter = ("role", "trade_category", "trade")
     search_fields = ("user__username", "company_name", "trade", "service_area")
+    # average_rating reads TradesmanStats - fetch it with the profile rather than per row
+    list_select_related = ("user", "user__tradesman_stats", "trade_category")
+
+
+@admin.register(TradesmanStats)
+class TradesmanStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "review_count", "average_rating", "updated_at")
+    search_fields = ("user__username",)
+    readonly_fields = (
+        "review_count", "rating_sum", "average_rating", "rating_1_count", "rating_2_count",
+        "rating_3_count", "rating_4_count", "rating_5_count", "updated_at",
+    )
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ("user", "notification_type", "message", "is_read", "created_at")
+    list_display = ("user", "notification_type", "message", "count", "is_read", "updated_at")
     list_filter = ("notification_type", "is_read")
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("to_email", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to_email", "subject")
+    readonly_fields = ("notification", "attempts", "leased_until", "last_error", "created_at", "sent_at")
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected emails")
+    def requeue(self, request, queryset):
+        # Rows being sent right now are left to their worker's lease
+        updated = queryset.exclude(status__in=['sent', 'sending']).update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} email(s) requeued.")
+
+
 @admin.register(Favourite)
 class FavouriteAdmin(admin.ModelAdmin):
     list_display = ("customer", "tradesman", "created_at")
@@ -37,4 +65,5 @@ class QualificationAdmin(admin.ModelAdmin):
     def mark_verified(self, request, queryset):
         now = timezone.now()
         updated = queryset.update(verified=True, verified_at=now)
+        Profile.touch(queryset.values_list('tradesman_id', flat=True))
         self.message_user(request, f"{updated} qualification(s) marked as verified.")
@@ -0,0 +1,95 @@
+# Live notification events for the Server-Sent Events stream (users.views.notification_stream)
+# Notification writes publish to a per-user channel layer group (core/layers.py) once
+# they commit: new notifications as "notification" events and every change to the
+# unread total as an "unread" event; a coalesced notification (users/outbox.py) is sent
+# again with its new count. Open dashboards keep their badge current from the stream
+# instead of counting unread rows on each render or polling.
+# Only the ASGI server (core/asgi.py) holds streams open; served over WSGI the view
+# answers with poll_snapshot() and the browser reconnects after POLL_RETRY_MS.
+# With the in-process channel layer events only reach streams open in the process
+# that made the write - see CHANNEL_LAYER in settings.
+# REF-005: Django ORM - filter().count()
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from core.layers import get_channel_layer
+from .models import Notification
+
+# Seconds between keep-alive comments so proxies don't close an idle stream
+KEEPALIVE_INTERVAL = 25
+# Client reconnect delay sent to EventSource (milliseconds)
+RETRY_MS = 5000
+# Reconnect delay for the one-shot WSGI response, which makes EventSource a slow poll
+POLL_RETRY_MS = 30000
+
+
+def notification_group(user_id):
+    return f'notifications.{user_id}'
+
+
+def unread_count(user_id):
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def notification_event(notification):
+    return {
+        'id': notification.id,
+        'notification_type': notification.notification_type,
+        'message': notification.message,
+        'link': notification.link,
+        'is_read': notification.is_read,
+        'count': notification.count,
+        'created_at': notification.created_at.isoformat(),
+        'updated_at': notification.updated_at.isoformat(),
+    }
+
+
+# Send the events to the user's open streams; the unread total is only counted when
+# there is one, so writes for users without a dashboard open cost no extra query
+def _publish(user_id, events):
+    layer = get_channel_layer()
+    group = notification_group(user_id)
+    if not layer.has_subscribers(group):
+        return
+    events = [*events, ('unread', {'count': unread_count(user_id)})]
+    for event, data in events:
+        layer.group_send(group, {'event': event, 'data': data})
+
+
+# Publish after the surrounding transaction commits (immediately outside one)
+def publish_notification(notification):
+    event = notification_event(notification)
+    user_id = notification.user_id
+    transaction.on_commit(lambda: _publish(user_id, [('notification', event)]))
+
+
+def publish_unread_count(user_id):
+    transaction.on_commit(lambda: _publish(user_id, []))
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+# Async iterator of SSE frames for one user: the current unread count first, then
+# every event published for them until the client disconnects
+async def event_stream(user_id, keepalive=KEEPALIVE_INTERVAL):
+    async with get_channel_layer().subscribe(notification_group(user_id)) as subscription:
+        yield f'retry: {RETRY_MS}\n\n'
+        yield format_event('unread', {'count': await sync_to_async(unread_count)(user_id)})
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(message['event'], message['data'])
+
+
+# The whole response for a server that can't hold a stream open: the current unread
+# count, then the connection closes and EventSource comes back after POLL_RETRY_MS
+def poll_snapshot(user_id):
+    return f'retry: {POLL_RETRY_MS}\n\n' + format_event('unread', {'count': unread_count(user_id)})
@@ -0,0 +1,28 @@
+# Delete read notifications older than the retention age (users/retention.py)
+# Usage: python manage.py prune_notifications [--days 90] [--chunk-size 1000]
+#        [--archive notifications.jsonl] [--pause 0.1] [--dry-run]
+from django.core.management.base import BaseCommand
+
+from users.retention import DEFAULT_CHUNK_SIZE, prune_read_notifications, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Prune (and optionally archive) read notifications older than the retention age in small chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Retention age in days (default NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows deleted per transaction')
+        parser.add_argument('--archive', help='Append pruned rows to this file as JSON lines')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between chunks')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the notifications that would be pruned')
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(options['days'])
+        kwargs = {'chunk_size': options['chunk_size'], 'pause': options['pause'], 'dry_run': options['dry_run']}
+        if options['archive'] and not options['dry_run']:
+            with open(options['archive'], 'a', encoding='utf-8') as archive:
+                pruned = prune_read_notifications(cutoff, archive=archive, **kwargs)
+        else:
+            pruned = prune_read_notifications(cutoff, **kwargs)
+        verb = 'Would prune' if options['dry_run'] else 'Pruned'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {pruned} read notifications older than {cutoff:%Y-%m-%d %H:%M}.'))
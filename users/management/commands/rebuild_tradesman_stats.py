@@ -0,0 +1,13 @@
+# Recompute all TradesmanStats rows from JobReview
+# Usage: python manage.py rebuild_tradesman_stats
+from django.core.management.base import BaseCommand
+
+from users.stats import rebuild_tradesman_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalised per-tradesman rating aggregates from all job reviews'
+
+    def handle(self, *args, **options):
+        count = rebuild_tradesman_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating stats for {count} tradesmen.'))
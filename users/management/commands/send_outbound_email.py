@@ -0,0 +1,43 @@
+# Drain the notification email outbox (users/outbox.py)
+# Usage: python manage.py send_outbound_email [--loop] [--interval 5] [--batch-size 50]
+#        python manage.py send_outbound_email --stats [--reset-stats] [--requeue-dead]
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import drain_outbox, outbox_stats, requeue_dead, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails in batches over a single mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Emails per batch (default OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--max-attempts', type=int, help='Attempts before an email is dead-lettered')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+        parser.add_argument('--stats', action='store_true', help='Report outbox backlog and throughput, then exit')
+        parser.add_argument('--reset-stats', action='store_true', help='Reset the throughput counters')
+        parser.add_argument('--requeue-dead', action='store_true', help='Retry dead-lettered emails')
+
+    def handle(self, *args, **options):
+        if options['stats'] or options['reset_stats'] or options['requeue_dead']:
+            if options['requeue_dead']:
+                self.stdout.write(self.style.SUCCESS(f'Requeued {requeue_dead()} dead emails.'))
+            if options['reset_stats']:
+                reset_stats()
+                self.stdout.write(self.style.SUCCESS('Counters reset.'))
+            stats = outbox_stats()
+            self.stdout.write(' '.join(f'{key}={value}' for key, value in stats.items()))
+            return
+
+        while True:
+            totals = drain_outbox(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+            if totals['batches'] or not options['loop']:
+                self.stdout.write(
+                    f"sent={totals['sent']} failed={totals['failed']} dead={totals['dead']} "
+                    f"batches={totals['batches']} seconds={totals['seconds']} per_second={totals['per_second']}"
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+# Show (or reset) the tradesman search result cache counters
+# Usage: python manage.py tradesman_search_cache [--reset] [--invalidate]
+from django.core.management.base import BaseCommand
+
+from users.search_cache import bump_version, cache_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Report hit/miss counters for the tradesman search result cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the hit/miss counters')
+        parser.add_argument('--invalidate', action='store_true', help='Drop all cached result lists')
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']} version={stats['version']}"
+        )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
+        if options['invalidate']:
+            bump_version()
+            self.stdout.write(self.style.SUCCESS('Cached result lists invalidated.'))
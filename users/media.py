@@ -0,0 +1,20 @@
+# Access checks for uploads served by core/media.py (listed in MEDIA_ACCESS_CHECKS)
+# Qualification documents are proof of identity and training, shown only to the
+# tradesman who uploaded them and to staff verifying them in the admin.
+# REF-002: Django Authentication - request.user
+from jobs.models import JobRequestImage, JobReview
+from .models import Qualification
+
+
+def qualification_document_access(request, name):
+    owners = set(Qualification.objects.filter(document=name).values_list('tradesman_id', flat=True))
+    if not owners:
+        return None
+    user = request.user
+    if user.is_staff or user.id in owners:
+        return True
+    # Identical bytes uploaded as a job or review photo are already served openly
+    # under the same content-addressed name
+    if JobReview.objects.filter(photo=name).exists() or JobRequestImage.objects.filter(image=name).exists():
+        return None
+    return False
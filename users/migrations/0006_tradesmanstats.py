@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_tradesman_stats(apps, schema_editor):
+    """Build TradesmanStats rows from the existing reviews"""
+    JobReview = apps.get_model('jobs', 'JobReview')
+    TradesmanStats = apps.get_model('users', 'TradesmanStats')
+    histogram = {f'rating_{r}_count': Count('id', filter=Q(rating=r)) for r in range(1, 6)}
+    rows = (
+        JobReview.objects.filter(job_request__job__owner__isnull=False)
+        .values('job_request__job__owner_id')
+        .annotate(review_count=Count('id'), rating_sum=Sum('rating'), **histogram)
+        .order_by()
+    )
+    stats = []
+    for row in rows:
+        user_id = row.pop('job_request__job__owner_id')
+        average = row['rating_sum'] / row['review_count'] if row['review_count'] else None
+        stats.append(TradesmanStats(user_id=user_id, average_rating=average, **row))
+    TradesmanStats.objects.bulk_create(stats, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_profile_photo_qualification_favourite'),
+        ('jobs', '0009_openjobcompletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradesmanStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.FloatField(blank=True, db_index=True, null=True)),
+                ('rating_1_count', models.PositiveIntegerField(default=0)),
+                ('rating_2_count', models.PositiveIntegerField(default=0)),
+                ('rating_3_count', models.PositiveIntegerField(default=0)),
+                ('rating_4_count', models.PositiveIntegerField(default=0)),
+                ('rating_5_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tradesman_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'tradesman stats',
+            },
+        ),
+        migrations.RunPython(
+            code=backfill_tradesman_stats,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:30
+
+import re
+
+from django.db import migrations, models
+
+# Copies of the search helpers as they were when this migration was written, so later
+# changes to users/search.py and core/text.py don't change what it does
+FTS_TABLE = 'users_profile_fts'
+WORD_RE = re.compile(r'[a-z0-9]+')
+SUFFIXES = (
+    ('ians', ''), ('ings', ''), ('ical', 'ic'), ('ries', ''), ('ian', ''), ('ing', ''),
+    ('ers', ''), ('ies', 'y'), ('er', ''), ('ry', ''), ('s', ''),
+)
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document)
+                VALUES ('delete', old.id, old.search_document);
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document)
+                VALUES ('delete', old.id, old.search_document);
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+}
+
+
+def stem(word):
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def build_search_document(profile):
+    user = profile.user
+    fields = [profile.company_name, user.first_name, user.last_name, user.username, profile.trade, profile.service_area]
+    return ' '.join(stem(word) for field in fields for word in WORD_RE.findall((field or '').lower()))
+
+
+def install_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "ALTER TABLE users_profile ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(search_document, ''))) STORED"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS users_profile_search_vector_gin "
+                "ON users_profile USING GIN (search_vector)"
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"search_document, content='users_profile', content_rowid='id', tokenize='unicode61')"
+            )
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS users_profile_search_vector_gin")
+            cursor.execute("ALTER TABLE users_profile DROP COLUMN IF EXISTS search_vector")
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def populate_search_documents(apps, schema_editor):
+    """Fill search_document for existing profiles"""
+    Profile = apps.get_model('users', 'Profile')
+    for profile in Profile.objects.select_related('user').iterator(chunk_size=500):
+        Profile.objects.filter(pk=profile.pk).update(search_document=build_search_document(profile))
+
+
+def create_search_index(apps, schema_editor):
+    """tsvector + GIN index on PostgreSQL, FTS5 shadow table on SQLite"""
+    install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_tradesmanstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(
+            code=populate_search_documents,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            code=create_search_index,
+            reverse_code=drop_search_index,
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:36
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copy of the taxonomy lookup as it was when this migration was written, so later
+# changes to jobs/trades.py don't change what it does. Unknown trades stay unlinked.
+WORD_RE = re.compile(r'[a-z0-9]+')
+SUFFIXES = (
+    ('ians', ''), ('ings', ''), ('ical', 'ic'), ('ries', ''), ('ian', ''), ('ing', ''),
+    ('ers', ''), ('ies', 'y'), ('er', ''), ('ry', ''), ('s', ''),
+)
+
+
+def stem(word):
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def resolve_trade(text, TradeAlias):
+    key = ' '.join(stem(word) for word in WORD_RE.findall((text or '').lower()))
+    if not key:
+        return None
+    words = key.split()
+    aliases = {
+        alias.key: alias.trade
+        for alias in TradeAlias.objects.filter(key__in={key, *words}).select_related('trade')
+    }
+    for candidate in [key, *words]:
+        if candidate in aliases:
+            return aliases[candidate]
+    return None
+
+
+def map_profile_trades(apps, schema_editor):
+    """Link existing free-text Profile.trade values to the trade taxonomy"""
+    TradeAlias = apps.get_model('jobs', 'TradeAlias')
+    Profile = apps.get_model('users', 'Profile')
+    texts = Profile.objects.exclude(trade__isnull=True).exclude(trade='').values_list('trade', flat=True).distinct()
+    for text in list(texts):
+        trade = resolve_trade(text, TradeAlias)
+        if trade is not None:
+            Profile.objects.filter(trade=text).update(trade_category=trade)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_trade_taxonomy'),
+        ('users', '0007_profile_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='trade_category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profiles', to='jobs.trade'),
+        ),
+        migrations.RunPython(
+            code=map_profile_trades,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
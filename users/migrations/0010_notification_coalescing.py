@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:05
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Value
+from django.db.models.functions import Coalesce
+
+
+def collapse_duplicate_notifications(apps, schema_editor):
+    """Key message notifications by their link and merge duplicate unread ones into the newest
+
+    Only chat messages coalesce (users/outbox.py notify()): job status and job request
+    notifications keep no source, so each one - e.g. a completion notice with its own
+    confirmation code - stays a row of its own.
+    """
+    Notification = apps.get_model('users', 'Notification')
+    OutboundEmail = apps.get_model('users', 'OutboundEmail')
+    Notification.objects.update(updated_at=F('created_at'))
+    Notification.objects.filter(notification_type='message').update(source=Coalesce('link', Value('')))
+
+    groups = list(
+        Notification.objects.filter(is_read=False, notification_type='message').exclude(source='')
+        .values('user_id', 'notification_type', 'source')
+        .annotate(events=Count('id'), newest=Max('id'), latest=Max('created_at'))
+        .filter(events__gt=1)
+    )
+    for group in groups:
+        duplicates = Notification.objects.filter(
+            is_read=False, user_id=group['user_id'],
+            notification_type=group['notification_type'], source=group['source'],
+        ).exclude(id=group['newest'])
+        OutboundEmail.objects.filter(notification__in=duplicates).update(notification_id=group['newest'])
+        duplicates.delete()
+        Notification.objects.filter(id=group['newest']).update(count=group['events'], updated_at=group['latest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_outboundemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-updated_at']},
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='source',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(
+            code=collapse_duplicate_notifications,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False), models.Q(('source', ''), _negated=True)), fields=('user', 'notification_type', 'source'), name='users_notification_unread_source'),
+        ),
+    ]
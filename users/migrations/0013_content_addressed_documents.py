@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_profile_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='qualification',
+            name='document',
+            field=models.FileField(help_text='Certificate or proof document', storage=core.storage.blob_storage, upload_to='qualifications/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_content_addressed_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='qualification',
+            index=models.Index(fields=['document'], name='users_qualification_doc_idx'),
+        ),
+    ]
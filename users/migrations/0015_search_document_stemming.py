@@ -0,0 +1,86 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:10
+
+import re
+
+from django.db import migrations
+
+# search_document now holds plain lower-cased words and the index stems them: the
+# 'english' configuration on PostgreSQL, FTS5's porter tokenizer on SQLite. The helpers
+# are copied here so later changes to users/search.py don't change this migration.
+FTS_TABLE = 'users_profile_fts'
+WORD_RE = re.compile(r'[a-z0-9]+')
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document)
+                VALUES ('delete', old.id, old.search_document);
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document)
+                VALUES ('delete', old.id, old.search_document);
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+}
+
+
+def build_search_document(profile):
+    user = profile.user
+    fields = [profile.company_name, user.first_name, user.last_name, user.username, profile.trade, profile.service_area]
+    return ' '.join(word for field in fields for word in WORD_RE.findall((field or '').lower()))
+
+
+def drop_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS users_profile_search_vector_gin")
+            cursor.execute("ALTER TABLE users_profile DROP COLUMN IF EXISTS search_vector")
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def create_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "ALTER TABLE users_profile ADD COLUMN search_vector tsvector "
+                "GENERATED ALWAYS AS (to_tsvector('english', coalesce(search_document, ''))) STORED"
+            )
+            cursor.execute("CREATE INDEX users_profile_search_vector_gin ON users_profile USING GIN (search_vector)")
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"search_document, content='users_profile', content_rowid='id', tokenize='porter unicode61')"
+            )
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def reindex_search_documents(apps, schema_editor):
+    """Store unstemmed words and rebuild the index with a stemming tokenizer"""
+    Profile = apps.get_model('users', 'Profile')
+    drop_search_index(schema_editor.connection)
+    for profile in Profile.objects.select_related('user').iterator(chunk_size=500):
+        Profile.objects.filter(pk=profile.pk).update(search_document=build_search_document(profile))
+    create_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_qualification_document_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=reindex_search_documents,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -1,5 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from core.storage import blob_storage
+from jobs.trades import resolve_trade
+from .search import build_search_document
 
 # REF-001: Django Models Documentation - Model class definition and field types
 class Profile(models.Model):
@@ -17,6 +22,8 @@ class Profile(models.Model):
     # They show up on the public profile page and in search results
     company_name = models.CharField(max_length=150, blank=True, null=True)
     trade = models.CharField(max_length=100, blank=True, null=True)
+    # Normalised trade the free text maps to (set automatically on save)
+    trade_category = models.ForeignKey('jobs.Trade', on_delete=models.SET_NULL, related_name='profiles', blank=True, null=True)
     service_area = models.CharField(max_length=150, blank=True, null=True)
     location = models.CharField(max_length=100, blank=True, null=True)
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
@@ -28,10 +35,36 @@ class Profile(models.Model):
     website_url = models.URLField(blank=True, null=True)
     # REF-001: Django Models - ImageField for file uploads (Iteration 4 US 30)
     photo = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Stemmed words from the searchable fields - indexed for full-text search (see users/search.py)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    # Version stamp for conditional GETs of the public profile page - also moved by
+    # changes shown on that page that live elsewhere (reviews, qualifications, user name)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
 
+    # Bump updated_at for the profiles of these users without loading them
+    @classmethod
+    def touch(cls, user_ids):
+        return cls.objects.filter(user_id__in=user_ids).update(updated_at=timezone.now())
+
+    # Refresh the search document on every save so the full-text index stays in sync,
+    # and link the free-text trade to the trade taxonomy
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get('update_fields')
+        extra_fields = {'search_document', 'updated_at'}
+        previous_trade_id = self.trade_category_id
+        if update_fields is None or 'trade' in update_fields:
+            self.trade_category = resolve_trade(self.trade) if self.trade else None
+            extra_fields.add('trade_category')
+        # Read by the post_save handler that rebuilds this tradesman's open job feed
+        self._trade_changed = self._state.adding or previous_trade_id != self.trade_category_id
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *extra_fields}
+        super().save(*args, **kwargs)
+
     # Helper property - shows company name if they have one, otherwise their name
     # Used throughout the app to display tradesman names consistently
     @property
@@ -45,13 +78,16 @@ class Profile(models.Model):
     # This is used in search results and on profile pages
     # REF-005: Django ORM queries for filtering
     # REF-022: Django ORM aggregation (Avg) for calculating average rating
+    # Reads the maintained TradesmanStats row rather than aggregating reviews live
     @property
     def average_rating(self):
-        from jobs.models import JobReview
-        reviews = JobReview.objects.filter(job_request__job__owner=self.user)
-        if not reviews.exists():
+        try:
+            stats = self.user.tradesman_stats
+        except TradesmanStats.DoesNotExist:
+            return None
+        if not stats.review_count or stats.average_rating is None:
             return None
-        return round(reviews.aggregate(models.Avg('rating'))['rating__avg'], 1)
+        return round(stats.average_rating, 1)
 
     # Calculate profile completion percentage for tradesmen
     # Counts how many important fields are filled out
@@ -80,8 +116,44 @@ class Profile(models.Model):
         return int((filled_count / total_fields) * 100) if total_fields > 0 else 0
 
 
+# Denormalised rating aggregates for a tradesman (one row per reviewed tradesman)
+# Updated in the same transaction as every JobReview create/delete (see users/stats.py)
+# so the directory can sort and filter on an indexed average instead of joining
+# Profile -> User -> Job -> JobRequest -> JobReview on every page view
+# REF-001: Django Models Documentation - OneToOneField, db_index
+# REF-022: Django ORM aggregation - replaces live Avg('rating') calculations
+class TradesmanStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tradesman_stats')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(blank=True, null=True, db_index=True)
+    # Histogram of star ratings (1-5)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'tradesman stats'
+
+    def __str__(self):
+        return f"{self.user.username}: {self.average_rating} ({self.review_count} reviews)"
+
+    # Star rating -> number of reviews, e.g. {5: 12, 4: 3, 3: 0, 2: 0, 1: 1}
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f'rating_{rating}_count') for rating in range(5, 0, -1)}
+
+    def refresh_average(self):
+        self.average_rating = self.rating_sum / self.review_count if self.review_count else None
+
+
 # Notification model - tracks user notifications for messages and job requests
 # Users get notified when they receive new messages or job requests
+# Repeated events from the same source (e.g. messages from one sender) are coalesced
+# into the one unread notification for it, counting events (see users/outbox.py notify())
 # REF-001: Django Models Documentation - Model definition
 # REF-028: ChatGPT - Notification system design
 class Notification(models.Model):
@@ -99,14 +171,71 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     # Optional link to related object (e.g., job request ID, chat username)
     link = models.CharField(max_length=255, blank=True, null=True)
+    # What the notification is about (messages default to the link); unread notifications with the
+    # same user, type and source are one row whose count goes up with every event
+    source = models.CharField(max_length=255, blank=True, default='')
+    count = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        ordering = ['-created_at']  # Most recent first
+        ordering = ['-updated_at']  # Most recently active first
+        indexes = [
+            # Unread counts and mark-all-read: one user's unread rows
+            models.Index(fields=['user', 'is_read', 'created_at'], name='users_notification_user_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'notification_type', 'source'],
+                condition=models.Q(is_read=False) & ~models.Q(source=''),
+                name='users_notification_unread_source',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.get_notification_type_display()} ({'read' if self.is_read else 'unread'})"
 
 
+# Transactional outbox for notification emails
+# Rows are written in the same transaction as the Notification they belong to and sent
+# later by the send_outbound_email worker (see users/outbox.py), so no request waits on SMTP
+# REF-001: Django Models Documentation - Model definition, indexes
+# REF-008: Django Email Backend - queued instead of send_mail in the request
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead letter'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='outbound_emails', null=True, blank=True)
+    notification = models.ForeignKey(
+        Notification, on_delete=models.SET_NULL, related_name='emails', null=True, blank=True,
+    )
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not sent before this time - pushed back after each failed attempt
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # While 'sending': the worker that claimed the row owns it until this time, after
+    # which another worker may take it over (the first one died mid-batch)
+    leased_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at', 'id'], name='users_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject} ({self.status})"
+
+
 # Iteration 4 (US 29): Customers can save favourite tradesmen for quick rebooking
 # REF-001: Django Models Documentation - Model definition and ForeignKey relationships
 # REF-031: ChatGPT - Iteration 4 favourites feature design
@@ -129,13 +258,20 @@ class Favourite(models.Model):
 class Qualification(models.Model):
     tradesman = models.ForeignKey(User, on_delete=models.CASCADE, related_name='qualifications')
     title = models.CharField(max_length=200, help_text='e.g. City & Guilds Plumbing Level 2')
-    document = models.FileField(upload_to='qualifications/%Y/%m/', help_text='Certificate or proof document')
+    # Content-addressed: a certificate uploaded twice is stored once (core/storage.py)
+    document = models.FileField(
+        upload_to='qualifications/%Y/%m/', storage=blob_storage, help_text='Certificate or proof document',
+    )
     verified = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     verified_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Media requests look up who may read a document (users/media.py)
+            models.Index(fields=['document'], name='users_qualification_doc_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.tradesman.username}) - {'Verified' if self.verified else 'Pending'}"
@@ -0,0 +1,236 @@
+# Notifications and their emails, via a transactional outbox
+# notify() writes the Notification and an OutboundEmail row in one transaction, so an
+# email is queued exactly when its notification commits and the request never waits on
+# SMTP. Repeated events for one unread notification are coalesced into it. The
+# send_outbound_email worker calls drain_outbox(), which sends due rows in batches over
+# one reused backend connection (claiming each batch under a lease rather than holding
+# row locks across SMTP), retries failures with exponential backoff and moves
+# rows that keep failing to a dead-letter state.
+# REF-005: Django ORM - select_for_update(), bulk_update(), update() with F()
+# REF-008: Django Email Backend - get_connection(), EmailMessage, send_messages()
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, connection as db_connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .live import publish_notification
+from .models import Notification, OutboundEmail
+
+KEY_PREFIX = 'outbound-email'
+SENT_KEY = f'{KEY_PREFIX}:sent'
+FAILED_KEY = f'{KEY_PREFIX}:failed'
+DEAD_KEY = f'{KEY_PREFIX}:dead'
+SECONDS_KEY = f'{KEY_PREFIX}:seconds'
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+# Seconds a worker owns the rows it claimed before another worker may retry them
+DEFAULT_LEASE_SECONDS = 300
+# Seconds before the first retry - doubled after every further failure, capped at an hour
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 3600
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Create a notification for user and queue its email (when they have an address)
+# Events with the same source as one of the user's unread notifications of that type
+# are coalesced into it: its count and message are bumped in place, and only the first
+# event of a run emails. Only chat messages default their source to the link - every
+# other event (e.g. a job status change carrying a new confirmation code) gets its own
+# notification and email unless the caller passes a source. Returns the Notification.
+def notify(user, notification_type, message, link=None, email_subject=None, email_body=None, source=None):
+    if source is None:
+        source = (link or '') if notification_type == 'message' else ''
+    with transaction.atomic():
+        notification = _coalesce(user, notification_type, source, message, link) if source else None
+        if notification is not None:
+            return notification
+        try:
+            # Savepoint: a concurrent event for the same source may create the row first
+            with transaction.atomic():
+                notification = Notification.objects.create(
+                    user=user,
+                    notification_type=notification_type,
+                    message=message,
+                    link=link,
+                    source=source,
+                )
+        except IntegrityError:
+            return _coalesce(user, notification_type, source, message, link)
+        if email_subject:
+            queue_email(user, email_subject, email_body or message, notification=notification)
+    return notification
+
+
+# Bump the unread notification for (user, type, source) with one UPDATE (None if there isn't one)
+def _coalesce(user, notification_type, source, message, link):
+    unread = Notification.objects.filter(
+        user=user, notification_type=notification_type, source=source, is_read=False,
+    )
+    if not unread.update(count=F('count') + 1, message=message, link=link, updated_at=timezone.now()):
+        return None
+    notification = unread.first()
+    if notification is not None:
+        publish_notification(notification)
+    return notification
+
+
+def queue_email(user, subject, body, notification=None):
+    if not user.email:
+        return None
+    return OutboundEmail.objects.create(
+        user=user,
+        notification=notification,
+        to_email=user.email,
+        subject=subject[:255],
+        body=body,
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY))
+
+
+def _count(key, amount):
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key, amount)
+
+
+def _message_for(email, from_email):
+    return EmailMessage(subject=email.subject, body=email.body, from_email=from_email, to=[email.to_email])
+
+
+# Claim a batch in its own short transaction: due rows are locked (so parallel workers
+# on PostgreSQL take different batches), marked 'sending' with a lease and committed
+# before any SMTP traffic. Rows whose lease ran out (their worker died mid-batch) are due
+# again; each claim counts as an attempt so a row that keeps killing workers goes dead.
+# Returns (batch, rows that ran out of attempts).
+def _claim_batch(batch_size, max_attempts):
+    now = timezone.now()
+    due = OutboundEmail.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', leased_until__lte=now)
+    ).order_by('next_attempt_at', 'id')
+    with transaction.atomic():
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        rows = list(due[:batch_size])
+        batch, expired = [], []
+        leased_until = now + timedelta(seconds=_setting('OUTBOX_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+        for email in rows:
+            if email.attempts >= max_attempts:
+                email.status = 'dead'
+                email.leased_until = None
+                expired.append(email)
+            else:
+                email.status = 'sending'
+                email.attempts += 1
+                email.leased_until = leased_until
+                batch.append(email)
+        OutboundEmail.objects.bulk_update(rows, ['status', 'attempts', 'leased_until'])
+    return batch, expired
+
+
+# Send one batch of due emails - returns {'sent', 'failed', 'dead'} for the batch
+# No transaction or row lock is held while talking to the mail server; the outcomes are
+# written back in a second short transaction
+def send_batch(connection, batch_size=None, max_attempts=None):
+    batch_size = batch_size or _setting('OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    max_attempts = max_attempts or _setting('OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    from_email = settings.DEFAULT_FROM_EMAIL
+    batch, expired = _claim_batch(batch_size, max_attempts)
+    result = {'sent': 0, 'failed': 0, 'dead': len(expired)}
+    for email in batch:
+        try:
+            # One message per call so a rejected address only fails its own row;
+            # the connection itself stays open for the whole batch
+            connection.send_messages([_message_for(email, from_email)])
+        except Exception as exc:
+            email.last_error = f'{type(exc).__name__}: {exc}'[:1000]
+            if email.attempts >= max_attempts:
+                email.status = 'dead'
+                result['dead'] += 1
+            else:
+                email.status = 'pending'
+                email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                result['failed'] += 1
+        else:
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            result['sent'] += 1
+        email.leased_until = None
+    with transaction.atomic():
+        OutboundEmail.objects.bulk_update(
+            batch, ['status', 'next_attempt_at', 'leased_until', 'last_error', 'sent_at'],
+        )
+    return result
+
+
+# Send everything that is due, batch after batch, over a single connection
+# Returns totals plus the elapsed time and emails/second for the run
+def drain_outbox(batch_size=None, max_attempts=None, max_batches=None, connection=None):
+    totals = {'sent': 0, 'failed': 0, 'dead': 0, 'batches': 0}
+    started = time.monotonic()
+    connection = connection or get_connection()
+    connection.open()
+    try:
+        while max_batches is None or totals['batches'] < max_batches:
+            result = send_batch(connection, batch_size, max_attempts)
+            if not any(result.values()):
+                break
+            totals['batches'] += 1
+            for key, value in result.items():
+                totals[key] += value
+    finally:
+        connection.close()
+    elapsed = time.monotonic() - started
+    totals['seconds'] = round(elapsed, 3)
+    totals['per_second'] = round(totals['sent'] / elapsed, 1) if elapsed and totals['sent'] else 0.0
+    _count(SENT_KEY, totals['sent'])
+    _count(FAILED_KEY, totals['failed'])
+    _count(DEAD_KEY, totals['dead'])
+    _count(SECONDS_KEY, int(elapsed * 1000))
+    return totals
+
+
+# Cumulative worker counters plus the current outbox backlog by status
+def outbox_stats():
+    by_status = dict(
+        OutboundEmail.objects.order_by().values_list('status').annotate(total=Count('id'))
+    )
+    sent = cache.get(SENT_KEY, 0)
+    busy_ms = cache.get(SECONDS_KEY, 0)
+    return {
+        'pending': by_status.get('pending', 0),
+        'sending': by_status.get('sending', 0),
+        'sent_total': by_status.get('sent', 0),
+        'dead': by_status.get('dead', 0),
+        'worker_sent': sent,
+        'worker_failed': cache.get(FAILED_KEY, 0),
+        'worker_dead': cache.get(DEAD_KEY, 0),
+        'per_second': round(sent / (busy_ms / 1000), 1) if busy_ms else None,
+    }
+
+
+def reset_stats():
+    cache.delete_many([SENT_KEY, FAILED_KEY, DEAD_KEY, SECONDS_KEY])
+
+
+# Put dead-lettered rows back in the queue (e.g. after fixing SMTP credentials)
+def requeue_dead():
+    return OutboundEmail.objects.filter(status='dead').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(),
+    )
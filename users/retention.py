@@ -0,0 +1,59 @@
+# Retention for read notifications
+# prune_read_notifications() deletes read notifications whose last event is older than
+# the retention age in short chunks of primary keys, each its own small transaction, so
+# the table is never locked for long and unread notifications are never touched. An
+# optional archive file receives every pruned row as a JSON line before it is deleted.
+# REF-005: Django ORM - values(), filter(pk__in=...).delete()
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_CHUNK_SIZE = 1000
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'notification_type', 'message', 'link', 'source', 'count', 'created_at', 'updated_at',
+)
+
+
+def retention_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def _archive_line(row):
+    return json.dumps({
+        key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in row.items()
+    })
+
+
+# Delete (and optionally archive to the open text file `archive`) read notifications
+# last updated before cutoff. Returns the number pruned; dry_run only counts them.
+def prune_read_notifications(cutoff, chunk_size=DEFAULT_CHUNK_SIZE, archive=None, pause=0, dry_run=False):
+    expired = Notification.objects.filter(is_read=True, updated_at__lt=cutoff)
+    if dry_run:
+        return expired.count()
+    pruned = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(expired.filter(pk__gt=last_pk).order_by('pk').values(*ARCHIVE_FIELDS)[:chunk_size])
+            if not rows:
+                return pruned
+            if archive is not None:
+                # Written out before the delete commits, so no row is lost unarchived
+                archive.write(''.join(_archive_line(row) + '\n' for row in rows))
+                archive.flush()
+            ids = [row['id'] for row in rows]
+            # Re-checks is_read so a row that became unread again isn't lost
+            _, deleted = expired.filter(pk__in=ids).delete()
+        pruned += deleted.get(Notification._meta.label, 0)
+        last_pk = ids[-1]
+        if pause:
+            time.sleep(pause)
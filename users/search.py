@@ -0,0 +1,138 @@
+# Full-text search for the tradesman directory
+# Profile.search_document holds the lower-cased words of the searchable profile fields.
+# It is indexed by a generated tsvector column with a GIN index on PostgreSQL (Supabase)
+# and by an FTS5 shadow table kept in sync by triggers on the SQLite fallback, so a
+# directory search is one index lookup ranked by relevance instead of icontains scans.
+# Each database stems the words itself, indexed text and queries alike: PostgreSQL with
+# the 'english' text search configuration (Snowball), SQLite with FTS5's porter tokenizer.
+# REF-005: Django ORM - RawSQL annotations and subqueries
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from core.text import stem, words
+
+FTS_TABLE = 'users_profile_fts'
+
+
+# Words to look up for a search box query (single characters are ignored as before)
+def query_terms(query):
+    terms = []
+    for word in words(query):
+        if len(word) >= 2 and word not in terms:
+            terms.append(word)
+    return terms
+
+
+# Text stored in Profile.search_document - same six fields the old icontains search covered
+def build_search_document(profile):
+    user = profile.user
+    fields = [
+        profile.company_name,
+        user.first_name,
+        user.last_name,
+        user.username,
+        profile.trade,
+        profile.service_area,
+    ]
+    return ' '.join(word for field in fields for word in words(field))
+
+
+# Filter a Profile queryset to full-text matches and annotate search_rank (higher is better)
+# Every query word is stemmed and matched as a prefix of an indexed stem, any word may match
+def search_profiles(queryset, query):
+    terms = query_terms(query)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = ' | '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            "SELECT id FROM users_profile WHERE search_vector @@ to_tsquery('english', %s)",
+            (tsquery,),
+        )
+        rank = RawSQL(
+            "ts_rank(\"users_profile\".\"search_vector\", to_tsquery('english', %s))",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+    elif vendor == 'sqlite':
+        fts_query = ' OR '.join(f'"{term}"*' for term in terms)
+        matches = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            (fts_query,),
+        )
+        # bm25() is lower for better matches, so negate it
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = \"users_profile\".\"id\")",
+            (fts_query,),
+            output_field=FloatField(),
+        )
+    else:
+        # No index support on other backends - look for the stems in the stored words
+        q_obj = Q()
+        for term in terms:
+            q_obj |= Q(search_document__icontains=stem(term))
+        return queryset.filter(q_obj).annotate(search_rank=RawSQL('0', (), output_field=FloatField()))
+    return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+# SQLite keeps the FTS5 table in sync with triggers. Django rebuilds the whole
+# users_profile table for many schema changes on SQLite, which drops its triggers,
+# so this runs after every migrate and reinstalls them (and repopulates) when missing.
+_SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document)
+                VALUES ('delete', old.id, old.search_document);
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON users_profile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document)
+                VALUES ('delete', old.id, old.search_document);
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+}
+
+
+def install_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "ALTER TABLE users_profile ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                "GENERATED ALWAYS AS (to_tsvector('english', coalesce(search_document, ''))) STORED"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS users_profile_search_vector_gin "
+                "ON users_profile USING GIN (search_vector)"
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"search_document, content='users_profile', content_rowid='id', tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'users_profile'"
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [name for name in _SQLITE_TRIGGERS if name not in existing]
+            for name in missing:
+                cursor.execute(_SQLITE_TRIGGERS[name])
+            if missing:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS users_profile_search_vector_gin")
+            cursor.execute("ALTER TABLE users_profile DROP COLUMN IF EXISTS search_vector")
+        elif connection.vendor == 'sqlite':
+            for name in _SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
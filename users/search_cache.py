@@ -0,0 +1,164 @@
+# Result cache for the tradesman directory (customer dashboard and search_tradesmen)
+# Most searches repeat a handful of filter combinations, so the ordered result list for
+# each normalised filter tuple is cached as (sort keys..., profile id) rows and pages are
+# cut from it without touching the search query again.
+# Entries are keyed on a version number that is bumped after any Profile, User name,
+# JobReview, Trade or TradeAlias change commits, which orphans every cached list at once.
+# The bump has to reach every worker, so the cache is only used with a shared backend
+# (file-based, Redis, database): TRADESMAN_SEARCH_CACHE_ENABLED, checked by
+# check_shared_cache() below.
+# Lists are always filled from the primary: the bump lands as soon as a write commits,
+# and a replica still behind it would otherwise store the old results under the new
+# version for the whole timeout.
+# REF-005: Django ORM - values_list(), in_bulk-style id lookups
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from core.pagination import (
+    CursorOutOfRange, InvalidCursor, ordering_for, paginate_key_list, paginate_keyset,
+)
+from core.routers import reading_from_replica
+from jobs.trades import trade_key
+from .search import query_terms
+
+KEY_PREFIX = 'tradesman-search'
+VERSION_KEY = f'{KEY_PREFIX}:version'
+HITS_KEY = f'{KEY_PREFIX}:hits'
+MISSES_KEY = f'{KEY_PREFIX}:misses'
+
+# Longest result list worth caching - deeper pages fall back to the database
+MAX_CACHED_ROWS = 1000
+
+
+# Backends whose entries live in one process (or nowhere)
+PER_PROCESS_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def _timeout():
+    return getattr(settings, 'TRADESMAN_SEARCH_CACHE_TIMEOUT', 300)
+
+
+def cache_enabled():
+    return getattr(settings, 'TRADESMAN_SEARCH_CACHE_ENABLED', False)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_enabled() and settings.CACHES['default']['BACKEND'] in PER_PROCESS_BACKENDS:
+        return [checks.Error(
+            'TRADESMAN_SEARCH_CACHE_ENABLED needs a cache shared by all workers.',
+            hint='Set CACHE_DIR (or configure Redis/database caching), or disable the search cache.',
+            id='users.E001',
+        )]
+    return []
+
+
+# Canonical form of the directory filters so equivalent searches share an entry
+# Invalid numbers are dropped exactly like the views ignore them
+def normalize_filters(query='', trade='', location='', min_rating='', min_experience='', availability=''):
+    try:
+        min_rating = float(min_rating) if min_rating else None
+    except ValueError:
+        min_rating = None
+    try:
+        min_experience = int(min_experience) if min_experience else None
+    except ValueError:
+        min_experience = None
+    return (
+        ' '.join(sorted(query_terms(query))),
+        trade_key(trade),
+        (location or '').strip().lower(),
+        min_rating,
+        min_experience,
+        (availability or '').strip().lower(),
+    )
+
+
+# Current cache generation - started from the clock so an evicted counter never
+# comes back at a value that old entries were stored under
+def get_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 3) if total else None,
+        'version': cache.get(VERSION_KEY),
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def _cache_key(filters, keys):
+    digest = hashlib.sha1(json.dumps([filters, list(keys)]).encode()).hexdigest()
+    return f'{KEY_PREFIX}:v{get_version()}:{digest}'
+
+
+# Ordered key rows for the filtered queryset, from the cache when possible
+def _cached_key_rows(queryset, keys, filters):
+    key = _cache_key(filters, keys)
+    entry = cache.get(key)
+    if entry is not None:
+        _count(HITS_KEY)
+        return entry
+    _count(MISSES_KEY)
+    if reading_from_replica():
+        queryset = queryset.using(DEFAULT_DB_ALIAS)
+    fields = [k.lstrip('-') for k in keys]
+    rows = list(
+        queryset.order_by(*ordering_for(keys)).values_list(*fields)[:MAX_CACHED_ROWS + 1]
+    )
+    entry = {'rows': [list(row) for row in rows[:MAX_CACHED_ROWS]], 'complete': len(rows) <= MAX_CACHED_ROWS}
+    cache.set(key, entry, _timeout())
+    return entry
+
+
+# One page of tradesmen for the directory views, served from the cached id list
+# queryset must already be filtered; filters is the normalize_filters() tuple and
+# profiles is the (unfiltered) queryset the page's rows are loaded from by id.
+# Cursors are the same as core.pagination.paginate_keyset(), which is used directly
+# when a page isn't covered by the cached rows.
+def cached_tradesman_page(queryset, keys, filters, profiles, cursor=None, per_page=20):
+    if not cache_enabled():
+        return paginate_keyset(queryset, keys, cursor, per_page)
+    entry = _cached_key_rows(queryset, keys, filters)
+    try:
+        page = paginate_key_list(entry['rows'], keys, cursor, per_page, complete=entry['complete'])
+    except (CursorOutOfRange, InvalidCursor):
+        return paginate_keyset(queryset, keys, cursor, per_page)
+    ids = [row[-1] for row in page.items]
+    profiles = profiles.order_by().filter(id__in=ids)
+    by_id = {profile.id: profile for profile in profiles}
+    page.items = [by_id[pk] for pk in ids if pk in by_id]
+    return page
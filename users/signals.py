@@ -0,0 +1,189 @@
+# Signal handlers for the users app
+# Keeps TradesmanStats in sync with JobReview inside the same transaction as the write,
+# the full-text search document in sync with User name changes, a tradesman's open job
+# feed in sync with their trade, invalidates the tradesman search result cache once
+# those writes commit, publishes notification changes to the live stream and moves the
+# profile version stamp (Profile.updated_at) when something on the profile page changes,
+# and queues downscaled variants of new profile photos (core/images.py)
+# REF-001: Django Models Documentation - model signals (pre_save, post_save, pre_delete, post_delete)
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.images import schedule_variants_on_commit
+from jobs.feed import clear_tradesman_feed, rebuild_tradesman_feed
+from jobs.models import JobReview, Trade, TradeAlias
+from .live import publish_notification, publish_unread_count
+from .models import Notification, Profile, Qualification
+from .search import build_search_document, install_search_index
+from .search_cache import bump_version
+from .stats import apply_review, reviewed_tradesman_id
+
+# User fields that feed Profile.search_document
+SEARCHABLE_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+# Remember the stored rating so an edited review (e.g. in the admin) moves the aggregates correctly
+@receiver(pre_save, sender=JobReview)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            JobReview.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=JobReview)
+def add_review_to_stats(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if not created and previous == instance.rating:
+        return
+    with transaction.atomic():
+        tradesman_id = reviewed_tradesman_id(instance)
+        if not created and previous is not None:
+            apply_review(tradesman_id, previous, -1)
+        apply_review(tradesman_id, instance.rating, 1)
+
+
+# Resolve the tradesman before the delete - the job request may be removed in the same cascade
+@receiver(pre_delete, sender=JobReview)
+def remember_reviewed_tradesman(sender, instance, **kwargs):
+    instance._stats_tradesman_id = reviewed_tradesman_id(instance)
+
+
+@receiver(post_delete, sender=JobReview)
+def remove_review_from_stats(sender, instance, **kwargs):
+    apply_review(getattr(instance, '_stats_tradesman_id', None), instance.rating, -1)
+
+
+# Reviews and qualifications are shown on the tradesman's profile page, so they move its
+# version stamp (conditional GETs in users.views.tradesman_profile_detail)
+@receiver(post_save, sender=JobReview)
+def touch_reviewed_profile(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        Profile.touch([reviewed_tradesman_id(instance)])
+
+
+@receiver(post_delete, sender=JobReview)
+def touch_unreviewed_profile(sender, instance, **kwargs):
+    Profile.touch([getattr(instance, '_stats_tradesman_id', None)])
+
+
+@receiver(post_save, sender=Qualification)
+@receiver(post_delete, sender=Qualification)
+def touch_qualified_profile(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        Profile.touch([instance.tradesman_id])
+
+
+# Username / name changes are part of the profile's search document
+# Saves that only touch other fields (e.g. last_login on every login) are skipped
+@receiver(post_save, sender=User)
+def refresh_profile_search_document(sender, instance, created, update_fields=None, **kwargs):
+    if created or kwargs.get('raw'):
+        return
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS.intersection(update_fields):
+        return
+    profile = Profile.objects.filter(user=instance).first()
+    if profile is None:
+        return
+    profile.user = instance
+    Profile.objects.filter(pk=profile.pk).update(
+        search_document=build_search_document(profile), updated_at=timezone.now(),
+    )
+
+
+# Reinstall the SQLite FTS triggers if a table rebuild dropped them (no-op once present)
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    if sender.name != 'users':
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if 'users_profile' not in connection.introspection.table_names(cursor):
+            return
+        columns = {col.name for col in connection.introspection.get_table_description(cursor, 'users_profile')}
+    if 'search_document' in columns:
+        install_search_index(connection)
+
+
+# Any change that can alter directory results invalidates the cached result lists
+# The bump waits for commit so a concurrent search can't cache pre-commit data as current
+def _invalidate_search_cache():
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=JobReview)
+def invalidate_search_cache(sender, **kwargs):
+    if not kwargs.get('raw'):
+        _invalidate_search_cache()
+
+
+@receiver(post_save, sender=JobReview)
+def invalidate_search_cache_for_review(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if created or getattr(instance, '_previous_rating', None) != instance.rating:
+        _invalidate_search_cache()
+
+
+# Trade filters resolve through the taxonomy
+@receiver(post_save, sender=Trade)
+@receiver(post_delete, sender=Trade)
+@receiver(post_save, sender=TradeAlias)
+@receiver(post_delete, sender=TradeAlias)
+def invalidate_search_cache_for_trades(sender, **kwargs):
+    if not kwargs.get('raw'):
+        _invalidate_search_cache()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_search_cache_for_user(sender, update_fields=None, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS.intersection(update_fields):
+        return
+    _invalidate_search_cache()
+
+
+# A tradesman who changes trade gets the open jobs of the new trade in their feed
+@receiver(post_save, sender=Profile)
+def rebuild_open_job_feed(sender, instance, **kwargs):
+    if kwargs.get('raw') or not getattr(instance, '_trade_changed', False):
+        return
+    if instance.role == 'tradesman':
+        rebuild_tradesman_feed(instance.user_id, instance.trade_category_id)
+    else:
+        clear_tradesman_feed(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+def generate_photo_variants(sender, instance, update_fields=None, **kwargs):
+    if kwargs.get('raw') or (update_fields is not None and 'photo' not in update_fields):
+        return
+    schedule_variants_on_commit([instance.photo.name])
+
+
+# New notifications and unread-count changes go out on the user's live stream (users/live.py)
+@receiver(post_save, sender=Notification)
+def publish_notification_change(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if created:
+        publish_notification(instance)
+    else:
+        publish_unread_count(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def publish_notification_delete(sender, instance, **kwargs):
+    # Pruning read notifications (users/retention.py) doesn't change the count
+    if not instance.is_read:
+        publish_unread_count(instance.user_id)
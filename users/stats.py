@@ -0,0 +1,78 @@
+# Maintenance of the denormalised TradesmanStats rows
+# Every JobReview create/update/delete goes through apply_review() inside a transaction
+# and rebuild_tradesman_stats() recomputes everything from scratch (used by the
+# rebuild_tradesman_stats management command and to repair drift)
+# REF-005: Django ORM - select_for_update(), values(), annotate()
+# REF-022: Django ORM - Count/Sum aggregation
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import TradesmanStats
+
+RATING_VALUES = range(1, 6)
+
+
+# Tradesman a review counts towards - the owner of the reviewed service job, or the
+# tradesman who completed the reviewed open job
+def reviewed_tradesman_id(review):
+    from jobs.models import JobRequest, OpenJobCompletion
+    if review.completion_id:
+        return (
+            OpenJobCompletion.objects.filter(pk=review.completion_id)
+            .values_list('tradesman_id', flat=True)
+            .first()
+        )
+    return (
+        JobRequest.objects.filter(pk=review.job_request_id)
+        .values_list('job__owner_id', flat=True)
+        .first()
+    )
+
+
+# Add (delta=1) or remove (delta=-1) a single rating from a tradesman's aggregates
+# The row is locked for the read-modify-write so concurrent reviews don't lose updates
+def apply_review(tradesman_id, rating, delta):
+    if not tradesman_id or rating is None:
+        return
+    with transaction.atomic():
+        TradesmanStats.objects.get_or_create(user_id=tradesman_id)
+        stats = TradesmanStats.objects.select_for_update().get(user_id=tradesman_id)
+        stats.review_count = max(stats.review_count + delta, 0)
+        stats.rating_sum = max(stats.rating_sum + delta * rating, 0)
+        if rating in RATING_VALUES:
+            field = f'rating_{rating}_count'
+            setattr(stats, field, max(getattr(stats, field) + delta, 0))
+        stats.refresh_average()
+        stats.save()
+
+
+# Per-tradesman aggregates computed straight from the review table
+def _aggregate_reviews():
+    from jobs.models import JobReview
+    histogram = {f'rating_{r}_count': Count('id', filter=Q(rating=r)) for r in RATING_VALUES}
+    return (
+        JobReview.objects.annotate(
+            tradesman_id=Coalesce('job_request__job__owner_id', 'completion__tradesman_id'),
+        )
+        .filter(tradesman_id__isnull=False)
+        .values('tradesman_id')
+        .annotate(review_count=Count('id'), rating_sum=Sum('rating'), **histogram)
+        .order_by()
+    )
+
+
+# Recompute every TradesmanStats row from the reviews - returns the number of rows written
+def rebuild_tradesman_stats():
+    rows = []
+    for row in _aggregate_reviews():
+        stats = TradesmanStats(
+            user_id=row.pop('tradesman_id'),
+            **row,
+        )
+        stats.refresh_average()
+        rows.append(stats)
+    with transaction.atomic():
+        TradesmanStats.objects.all().delete()
+        TradesmanStats.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
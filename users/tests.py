@@ -1,3 +1,979 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
 
-# Create tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+
+from core import blobs, images
+from core.models import Blob
+from core.pagination import InvalidCursor, encode_cursor, paginate_keyset
+from core.routers import PIN_COOKIE, REPLICA_DB_ALIAS
+from core.storage import blob_storage, is_blob_name
+from core.text import tokenize
+from jobs.models import Job, JobRequest, JobRequestImage, JobReview, OpenJobCompletion, Trade, TradeAlias
+from .models import Favourite, Notification, OutboundEmail, Profile, Qualification, TradesmanStats
+from .live import event_stream
+from .outbox import drain_outbox, notify
+from .retention import prune_read_notifications, retention_cutoff
+from .search import FTS_TABLE, install_search_index, search_profiles
+from .search_cache import cache_stats, check_shared_cache, reset_stats
+
+
+# The customer dashboard must cost the same number of queries however much history
+# the customer has (open jobs, completions, reviews and requests)
+class CustomerDashboardQueryBudgetTests(TestCase):
+    QUERY_BUDGET = 12
+
+    def setUp(self):
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        Profile.objects.create(user=self.tradesman, role='tradesman', trade='Plumber', location='Cork')
+        self.service = Job.objects.create(
+            owner=self.tradesman, title='Plumbing service', description='d', location='Cork', trade='Plumber',
+        )
+
+    # Bulk-create n open jobs (alternately completed and awaiting confirmation, with
+    # reviews on every other completed one) and n requests, half reviewed, for one customer
+    def _customer_with_history(self, n):
+        customer = User.objects.create_user(username=f'customer{n}', password='pw')
+        Profile.objects.create(user=customer, role='customer')
+        open_jobs = Job.objects.bulk_create([
+            Job(owner=customer, title=f'Open job {i}', description='d', location='Cork', trade='Plumber')
+            for i in range(n)
+        ])
+        completions = OpenJobCompletion.objects.bulk_create([
+            OpenJobCompletion(
+                job=job, tradesman=self.tradesman,
+                status='completed' if i % 2 == 0 else 'awaiting_confirmation',
+            )
+            for i, job in enumerate(open_jobs)
+        ])
+        requests = JobRequest.objects.bulk_create([
+            JobRequest(job=self.service, customer=customer, message='m', status='completed') for _ in range(n)
+        ])
+        JobReview.objects.bulk_create(
+            [
+                JobReview(completion=completion, rating=i % 5 + 1)
+                for i, completion in enumerate(completions) if i % 4 == 0
+            ]
+            + [
+                JobReview(job_request=job_request, rating=i % 5 + 1)
+                for i, job_request in enumerate(requests) if i % 2 == 0
+            ]
+        )
+        return customer
+
+    def _dashboard_queries(self, customer):
+        self.client.force_login(customer)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_constant(self):
+        counts = {}
+        for n in (1, 100, 1000):
+            with self.subTest(history=n):
+                counts[n] = self._dashboard_queries(self._customer_with_history(n))
+                self.assertLessEqual(counts[n], self.QUERY_BUDGET)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_open_job_review_ratings_are_shown(self):
+        customer = self._customer_with_history(4)
+        self.client.force_login(customer)
+        response = self.client.get(reverse('dashboard'))
+        completed = [
+            data for item in response.context['my_open_jobs'] for data in item['completed']
+        ]
+        self.assertEqual(len(completed), 2)
+        reviewed = {data['completion'].job.title: data['review_rating'] for data in completed}
+        self.assertEqual(reviewed, {'Open job 0': 1, 'Open job 2': None})
+
+
+# TradesmanStats follows every review write (users/signals.py, users/stats.py)
+class TradesmanStatsTests(TestCase):
+    def setUp(self):
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        Profile.objects.create(user=self.tradesman, role='tradesman')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.job = Job.objects.create(owner=self.tradesman, title='Service', description='d', location='Cork')
+
+    def _review(self, rating):
+        job_request = JobRequest.objects.create(job=self.job, customer=self.customer, status='completed')
+        return JobReview.objects.create(job_request=job_request, rating=rating)
+
+    def _stats(self):
+        stats = TradesmanStats.objects.get(user=self.tradesman)
+        return stats.review_count, stats.rating_sum, stats.average_rating, stats.histogram
+
+    def test_create_edit_and_delete_move_the_aggregates(self):
+        first = self._review(5)
+        self._review(3)
+        self.assertEqual(self._stats(), (2, 8, 4.0, {5: 1, 4: 0, 3: 1, 2: 0, 1: 0}))
+
+        first.rating = 1
+        first.save()
+        self.assertEqual(self._stats(), (2, 4, 2.0, {5: 0, 4: 0, 3: 1, 2: 0, 1: 1}))
+
+        first.delete()
+        self.assertEqual(self._stats(), (1, 3, 3.0, {5: 0, 4: 0, 3: 1, 2: 0, 1: 0}))
+        # Deleting the job request cascades to its review
+        JobRequest.objects.all().delete()
+        self.assertEqual(self._stats(), (0, 0, None, {5: 0, 4: 0, 3: 0, 2: 0, 1: 0}))
+
+    def test_migration_backfills_from_existing_reviews(self):
+        self._review(4)
+        self._review(2)
+        TradesmanStats.objects.all().delete()
+        migration = importlib.import_module('users.migrations.0006_tradesmanstats')
+        migration.backfill_tradesman_stats(apps, None)
+        self.assertEqual(self._stats(), (2, 6, 3.0, {5: 0, 4: 1, 3: 0, 2: 1, 1: 0}))
+
+
+# Full-text directory search (users/search.py)
+class TradesmanSearchTests(TestCase):
+    def setUp(self):
+        self.cork_plumber = self._tradesman('corkplumb', 'Cork Plumbing Services', 'Plumber', 'Cork')
+        self.galway_plumber = self._tradesman('galwayplumb', '', 'Plumber', 'Galway')
+        self.electrician = self._tradesman('sparks', 'Bright Sparks', 'Electrician', 'Cork')
+
+    def _tradesman(self, username, company, trade, area):
+        user = User.objects.create_user(username=username, password='pw')
+        return Profile.objects.create(user=user, role='tradesman', company_name=company, trade=trade, service_area=area)
+
+    def _search(self, query):
+        results = search_profiles(Profile.objects.filter(role='tradesman'), query).order_by('-search_rank', 'id')
+        return list(results)
+
+    def test_matches_other_word_forms(self):
+        self.assertEqual(set(self._search('plumbing')), {self.cork_plumber, self.galway_plumber})
+        self.assertEqual(self._search('electrical'), [self.electrician])
+        self.assertEqual(self._search('roofer'), [])
+
+    def test_stemming_neither_overreaches_nor_misses_trade_words(self):
+        painter = self._tradesman('painter', 'Kerry Decorators', 'Painter', 'Tralee')
+        self.assertEqual(self._search('decorating'), [painter])
+        self.assertEqual(self._search('kerry'), [painter])
+        self.assertEqual(tokenize('Kerry decorator decorating'), ['kerri', 'decor', 'decor'])
+
+    def test_profiles_matching_more_words_rank_first(self):
+        results = self._search('plumbing cork')
+        self.assertEqual(results[0], self.cork_plumber)
+        self.assertEqual(set(results[1:]), {self.galway_plumber, self.electrician})
+
+    def test_index_follows_profile_and_user_changes(self):
+        self.galway_plumber.company_name = 'Westside Heating'
+        self.galway_plumber.save()
+        self.assertEqual(self._search('westside'), [self.galway_plumber])
+
+        user = self.electrician.user
+        user.first_name = 'Aoife'
+        user.save()
+        self.assertEqual(self._search('aoife'), [self.electrician])
+
+        self.cork_plumber.delete()
+        self.assertEqual(self._search('plumbing'), [self.galway_plumber])
+
+    def test_sqlite_triggers_are_reinstalled(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 triggers are SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_au")
+        # A rebuilt users_profile table has lost its triggers until the next migrate
+        Profile.objects.filter(pk=self.electrician.pk).update(search_document='lighting')
+        self.assertEqual(self._search('lighting'), [])
+        install_search_index(connection)
+        self.assertEqual(self._search('lighting'), [self.electrician])
+
+
+# Directory result cache (users/search_cache.py)
+@override_settings(TRADESMAN_SEARCH_CACHE_ENABLED=True)
+class TradesmanSearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+        user = User.objects.create_user(username='plumber', password='pw')
+        self.profile = Profile.objects.create(user=user, role='tradesman', trade='Plumber', company_name='Cork Pipes')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.client.force_login(self.customer)
+
+    def _names(self, **params):
+        response = self.client.get(reverse('search_tradesmen'), {'format': 'json', **params})
+        return [row['display_name'] for row in response.json()['results']]
+
+    def _counts(self):
+        stats = cache_stats()
+        return stats['hits'], stats['misses']
+
+    def test_repeat_search_is_a_hit_until_a_change_commits(self):
+        self.assertEqual(self._names(trade='plumbing'), ['Cork Pipes'])
+        self.assertEqual(self._names(trade='Plumbing '), ['Cork Pipes'])
+        self.assertEqual(self._counts(), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.company_name = 'Cork Pipes & Drains'
+            self.profile.save()
+        self.assertEqual(self._names(trade='plumbing'), ['Cork Pipes & Drains'])
+        self.assertEqual(self._counts(), (1, 2))
+
+        job = Job.objects.create(owner=self.profile.user, title='Service', description='d', location='Cork')
+        job_request = JobRequest.objects.create(job=job, customer=self.customer, status='completed')
+        self._names(min_rating='4')
+        with self.captureOnCommitCallbacks(execute=True):
+            JobReview.objects.create(job_request=job_request, rating=5)
+        self.assertEqual(self._names(min_rating='4'), ['Cork Pipes & Drains'])
+
+    def test_taxonomy_changes_invalidate(self):
+        self.assertEqual(self._names(trade='pipefitter'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            TradeAlias.objects.create(key='pipefitt', trade=Trade.objects.get(name='Plumber'))
+        self.assertEqual(self._names(trade='pipefitter'), ['Cork Pipes'])
+        self.assertEqual(self._counts(), (0, 2))
+
+    def test_requires_a_shared_backend(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['users.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/x'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(TRADESMAN_SEARCH_CACHE_ENABLED=False):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+# Keyset pagination (core/pagination.py) and the list views using it
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.user, role='customer')
+        Notification.objects.bulk_create([
+            Notification(user=self.user, notification_type='message', message=f'n{i}') for i in range(5)
+        ])
+        # Ties on the first key are broken by the unique id
+        self.notifications = Notification.objects.filter(user=self.user)
+        self.keys = ('-updated_at', '-id')
+        self.ordered = list(self.notifications.order_by('-updated_at', '-id'))
+
+    def test_next_and_previous_cursors_walk_the_list(self):
+        first = paginate_keyset(self.notifications, self.keys, None, per_page=2)
+        self.assertEqual(first.items, self.ordered[:2])
+        self.assertFalse(first.has_previous)
+
+        second = paginate_keyset(self.notifications, self.keys, first.next_cursor, per_page=2)
+        self.assertEqual(second.items, self.ordered[2:4])
+        last = paginate_keyset(self.notifications, self.keys, second.next_cursor, per_page=2)
+        self.assertEqual(last.items, self.ordered[4:])
+        self.assertFalse(last.has_next)
+
+        back = paginate_keyset(self.notifications, self.keys, last.prev_cursor, per_page=2)
+        self.assertEqual(back.items, self.ordered[2:4])
+        self.assertEqual(paginate_keyset(self.notifications, self.keys, back.prev_cursor, per_page=2).items, self.ordered[:2])
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', encode_cursor('x', [1, 2]), encode_cursor('n', ['yesterday', 1]), encode_cursor('n', [1])):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginate_keyset(self.notifications, self.keys, cursor, per_page=2)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('notifications'), {'cursor': 'not-a-cursor'}).status_code, 400)
+        response = self.client.get(reverse('dashboard'), {'cursor': encode_cursor('n', ['yesterday', 1])})
+        self.assertEqual(response.status_code, 400)
+
+
+# Reviews of open job completions link straight to the completion and count towards
+# the tradesman's rating aggregates
+class OpenJobReviewTests(TestCase):
+    def setUp(self):
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        Profile.objects.create(user=self.tradesman, role='tradesman', trade='Plumber')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.job = Job.objects.create(owner=self.customer, title='Leaky tap', description='d', location='Cork')
+        OpenJobCompletion.objects.create(job=self.job, tradesman=self.tradesman, status='completed')
+
+    def test_review_links_to_completion_and_updates_stats(self):
+        self.client.force_login(self.customer)
+        url = reverse('submit_open_job_review', args=[self.job.id, self.tradesman.id])
+        response = self.client.post(url, {'rating': 4, 'comment': 'Great'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        review = JobReview.objects.get()
+        self.assertEqual(review.completion.job, self.job)
+        self.assertIsNone(review.job_request)
+        self.assertFalse(Job.objects.filter(title__startswith='Completed: ').exists())
+        stats = TradesmanStats.objects.get(user=self.tradesman)
+        self.assertEqual((stats.review_count, stats.average_rating), (1, 4.0))
+
+        self.client.post(url, {'rating': 1})
+        self.assertEqual(JobReview.objects.count(), 1)
+
+
+# Rejects mail for one address and delivers the rest to the locmem outbox
+class FlakyBackend(EmailBackend):
+    def send_messages(self, messages):
+        if any('bounce@example.com' in message.to for message in messages):
+            raise ConnectionError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+class OutboundEmailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw', email='alice@example.com')
+
+    def test_notify_queues_email_instead_of_sending(self):
+        notification = notify(self.user, 'job_status', 'Done', email_subject='Job done', email_body='Body')
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.notification, email.to_email, email.status), (notification, 'alice@example.com', 'pending'))
+
+    def test_no_email_without_address(self):
+        self.user.email = ''
+        notify(self.user, 'job_status', 'Done', email_subject='Job done')
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_drain_sends_in_batches(self):
+        for i in range(5):
+            notify(self.user, 'message', f'Message {i}', email_subject=f'Subject {i}')
+        totals = drain_outbox(batch_size=2)
+        self.assertEqual((totals['sent'], totals['batches']), (5, 3))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(drain_outbox()['sent'], 0)
+
+    def test_failures_back_off_then_dead_letter(self):
+        bouncer = User.objects.create_user(username='bob', email='bounce@example.com')
+        notify(bouncer, 'message', 'Hi', email_subject='Hi')
+        notify(self.user, 'message', 'Hi', email_subject='Hi')
+
+        totals = drain_outbox(max_attempts=2, connection=FlakyBackend())
+        self.assertEqual((totals['sent'], totals['failed']), (1, 1))
+        failed = OutboundEmail.objects.get(to_email='bounce@example.com')
+        self.assertEqual((failed.status, failed.attempts), ('pending', 1))
+        self.assertGreater(failed.next_attempt_at, failed.created_at)
+        self.assertIn('mailbox unavailable', failed.last_error)
+
+        # Not due yet, so nothing is retried until the backoff has passed
+        self.assertEqual(drain_outbox(max_attempts=2, connection=FlakyBackend())['failed'], 0)
+        OutboundEmail.objects.filter(pk=failed.pk).update(next_attempt_at=failed.created_at)
+        totals = drain_outbox(max_attempts=2, connection=FlakyBackend())
+        self.assertEqual(totals['dead'], 1)
+        self.assertEqual(OutboundEmail.objects.get(pk=failed.pk).status, 'dead')
+
+    def test_batch_is_leased_before_sending(self):
+        notify(self.user, 'message', 'Hi', email_subject='Hi')
+        seen = []
+
+        class RecordingBackend(EmailBackend):
+            def send_messages(self, messages):
+                email = OutboundEmail.objects.get()
+                seen.append((email.status, email.attempts, email.leased_until is not None))
+                return super().send_messages(messages)
+
+        drain_outbox(connection=RecordingBackend())
+        self.assertEqual(seen, [('sending', 1, True)])
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.leased_until), ('sent', None))
+
+    def test_expired_lease_is_retried(self):
+        notify(self.user, 'message', 'Hi', email_subject='Hi')
+        past = timezone.now() - timedelta(seconds=1)
+        OutboundEmail.objects.update(status='sending', attempts=1, leased_until=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(drain_outbox()['sent'], 0)  # still owned by another worker
+
+        OutboundEmail.objects.update(leased_until=past)
+        self.assertEqual(drain_outbox()['sent'], 1)
+        self.assertEqual(OutboundEmail.objects.get().attempts, 2)
+
+        # A row whose worker keeps dying runs out of attempts like a failing one
+        OutboundEmail.objects.update(status='sending', attempts=2, leased_until=past)
+        self.assertEqual(drain_outbox(max_attempts=2)['dead'], 1)
+        self.assertEqual(OutboundEmail.objects.get().status, 'dead')
+
+
+class NotificationCoalescingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw', email='alice@example.com')
+
+    def _message(self, i, link='/chat/bob/'):
+        return notify(self.user, 'message', f'New message {i} from bob', link=link, email_subject='New message')
+
+    def test_repeated_events_bump_one_unread_notification(self):
+        first = self._message(1)
+        for i in range(2, 5):
+            self.assertEqual(self._message(i).pk, first.pk)
+        self._message(1, link='/chat/carol/')
+
+        notification = Notification.objects.get(pk=first.pk)
+        self.assertEqual((notification.count, notification.message), (4, 'New message 4 from bob'))
+        self.assertGreaterEqual(notification.updated_at, first.updated_at)
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(OutboundEmail.objects.count(), 2)  # the first event of each source
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notifications'), {'format': 'json'})
+        self.assertEqual([n['count'] for n in response.json()['results']], [1, 4])
+
+    def test_job_status_events_are_not_coalesced_by_link(self):
+        link = '/api/users/open-job/1/verify/'
+        for code in ('AAA111', 'BBB222'):
+            notify(
+                self.user, 'job_status', 'Job marked complete', link=link,
+                email_subject='Confirm completion', email_body=f'Confirmation code: {code}',
+            )
+        self.assertEqual(Notification.objects.filter(link=link).count(), 2)
+        self.assertEqual(
+            [email.body for email in OutboundEmail.objects.order_by('id')],
+            ['Confirmation code: AAA111', 'Confirmation code: BBB222'],
+        )
+
+    def test_migration_keys_only_messages_by_link(self):
+        def create(notification_type, link):
+            return Notification.objects.create(user=self.user, notification_type=notification_type, message='m', link=link)
+
+        message = create('message', '/chat/bob/')
+        completions = [create('job_status', '/api/users/open-job/1/verify/') for _ in range(2)]
+        Notification.objects.update(source='')
+        migration = importlib.import_module('users.migrations.0010_notification_coalescing')
+        migration.collapse_duplicate_notifications(apps, None)
+
+        self.assertEqual(Notification.objects.get(pk=message.pk).source, '/chat/bob/')
+        # Unread job status events with the same link are not merged
+        self.assertEqual(
+            list(Notification.objects.filter(notification_type='job_status').order_by('id').values_list('id', 'count', 'source')),
+            [(completion.pk, 1, '') for completion in completions],
+        )
+
+    def test_read_notification_starts_a_new_one(self):
+        first = self._message(1)
+        Notification.objects.filter(pk=first.pk).update(is_read=True)
+        second = self._message(2)
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(second.count, 1)
+
+
+class NotificationRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.client.force_login(self.user)
+
+    def _notifications(self, n, **fields):
+        return Notification.objects.bulk_create(
+            Notification(user=self.user, notification_type='job_status', message=f'n{i}', **fields) for i in range(n)
+        )
+
+    def test_mark_all_read_is_one_update(self):
+        self._notifications(5)
+        other = User.objects.create_user(username='bob')
+        Notification.objects.create(user=other, notification_type='message', message='not yours')
+        url = reverse('mark_all_notifications_read')
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'{url}?format=json')
+        self.assertEqual(response.json(), {'updated': 5})
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "users_notification"')]), 1)
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+        self.assertTrue(Notification.objects.filter(user=other, is_read=False).exists())
+
+    def test_prune_deletes_old_read_notifications_in_chunks(self):
+        old = timezone.now() - timedelta(days=100)
+        self._notifications(5, is_read=True, updated_at=old)
+        self._notifications(2, is_read=False, updated_at=old)
+        self._notifications(3, is_read=True)
+        archive = StringIO()
+
+        pruned = prune_read_notifications(retention_cutoff(90), chunk_size=2, archive=archive)
+        self.assertEqual(pruned, 5)
+        self.assertEqual([json.loads(line)['message'] for line in archive.getvalue().splitlines()],
+                         ['n0', 'n1', 'n2', 'n3', 'n4'])
+        self.assertEqual(Notification.objects.filter(is_read=True).count(), 3)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 2)
+
+        out = StringIO()
+        call_command('prune_notifications', days=0, stdout=out)
+        self.assertIn('Pruned 3', out.getvalue())
+
+
+class ProfileConditionalGetTests(TestCase):
+    def setUp(self):
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        self.profile = Profile.objects.create(user=self.tradesman, role='tradesman', trade='Plumber')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.client.force_login(self.customer)
+        self.url = reverse('tradesman_profile_detail', args=[self.profile.id])
+
+    def _revalidate(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_profile_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._revalidate(etag).status_code, 304)
+        profile_queries = [q for q in queries if 'users_profile' in q['sql'] or 'jobs_jobreview' in q['sql']]
+        self.assertEqual(len(profile_queries), 1)
+
+    def test_page_changes_move_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        job = Job.objects.create(owner=self.tradesman, title='Service', description='d', location='Cork')
+        job_request = JobRequest.objects.create(job=job, customer=self.customer, status='completed')
+        JobReview.objects.create(job_request=job_request, rating=5, comment='Great')
+        response = self._revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.client.get(reverse('toggle_favourite', args=[self.tradesman.id]))
+        response = self._revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._revalidate(response['ETag']).status_code, 304)
+
+    def test_if_modified_since_alone_never_gets_a_stale_page(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        self.client.get(reverse('toggle_favourite', args=[self.tradesman.id]))
+        since = http_date(timezone.now().timestamp() + 60)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+
+def _jpeg(width, height, **options):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'orange').save(buffer, 'JPEG', **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _media_root(test):
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    media = override_settings(MEDIA_ROOT=media_root)
+    media.enable()
+    test.addCleanup(media.disable)
+
+
+# Downscaled photo variants (core/images.py) and the responsive_images template tags
+@override_settings(IMAGE_VARIANT_WIDTHS=(160, 320, 640))
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        _media_root(self)
+        cache.clear()
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        self.profile = Profile.objects.create(user=self.tradesman, role='tradesman', trade='Plumber')
+        self.client.force_login(self.tradesman)
+
+    def _upload_photo(self, width, height):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.photo.save('me.jpg', _jpeg(width, height))
+        images.wait_for_image_tasks()
+        return self.profile.photo.name
+
+    def test_upload_gets_variants_narrower_than_the_original(self):
+        name = self._upload_photo(1000, 500)
+        self.assertEqual(images.available_widths(name), (160, 320, 640))
+        with default_storage.open(images.variant_name(name, 320, 'webp')) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 160))
+
+        html = self.client.get(reverse('tradesman_profile_detail', args=[self.profile.id])).content.decode()
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(default_storage.url(images.variant_name(name, 640, 'jpg')) + ' 640w', html)
+        self.assertEqual(images.variant_url(self.profile.photo, 200), default_storage.url(images.variant_name(name, 320, 'jpg')))
+
+    def test_small_or_broken_uploads_serve_the_original(self):
+        name = self._upload_photo(120, 90)
+        self.assertEqual(images.available_widths(name), ())
+        self.assertEqual(images.variant_url(self.profile.photo, 160), self.profile.photo.url)
+        html = self.client.get(reverse('tradesman_profile_detail', args=[self.profile.id])).content.decode()
+        self.assertIn(f'src="{self.profile.photo.url}"', html)
+        self.assertNotIn('<picture', html)
+
+        broken = default_storage.save('profiles/broken.jpg', ContentFile(b'not an image'))
+        self.assertEqual(images.generate_variants(broken), ())
+
+
+# Upload caps (core/uploads.py) on the photo and document forms
+@override_settings(UPLOAD_MAX_FILE_BYTES=50_000, UPLOAD_MAX_IMAGE_PIXELS=250_000, UPLOAD_MAX_REQUEST_PIXELS=400_000)
+class UploadLimitTests(TestCase):
+    def setUp(self):
+        _media_root(self)
+        tradesman = User.objects.create_user(username='tradesman', password='pw')
+        Profile.objects.create(user=tradesman, role='tradesman', trade='Plumber')
+        self.job = Job.objects.create(owner=tradesman, title='Service', description='d', location='Cork')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.client.force_login(self.customer)
+
+    def _file(self, name, width=400, height=300, **options):
+        return SimpleUploadedFile(name, _jpeg(width, height, **options).read(), content_type='image/jpeg')
+
+    def _request_job(self, images):
+        return self.client.post(reverse('request_job', args=[self.job.id]), {'message': 'Leaking tap', 'images': images})
+
+    def test_request_images_are_inserted_together(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self._request_job([self._file('a.jpg'), self._file('b.jpg')])
+        self.assertEqual(response.status_code, 302)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "jobs_jobrequestimage"')]
+        self.assertEqual(len(inserts), 1)
+        stored = JobRequestImage.objects.filter(job_request__customer=self.customer)
+        self.assertEqual(stored.count(), 2)
+        self.assertTrue(all(default_storage.exists(row.image.name) for row in stored))
+
+    def test_oversized_or_bad_files_reject_the_request(self):
+        noisy = SimpleUploadedFile('noise.jpg', os.urandom(60_000), content_type='image/jpeg')
+        cases = [
+            ([noisy], 'noise.jpg is larger than'),
+            ([self._file('huge.jpg', 1000, 1000)], 'huge.jpg is 1000x1000 pixels'),
+            ([self._file('a.jpg'), self._file('b.jpg'), self._file('c.jpg', 450, 400)], 'c.jpg was not uploaded'),
+            ([SimpleUploadedFile('notes.jpg', b'not a photo')], 'notes.jpg is not a JPEG'),
+        ]
+        for images, error in cases:
+            with self.subTest(error=error):
+                response = self._request_job(images)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, error)
+        self.assertFalse(JobRequest.objects.exists())
+
+    def test_profile_photo_metadata_is_stripped(self):
+        tradesman = User.objects.get(username='tradesman')
+        self.client.force_login(tradesman)
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees
+        exif[0x010f] = 'PhoneMaker'
+        photo = self._file('me.jpg', 400, 200, exif=exif.tobytes())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_profile'), {'trade': 'Plumber', 'photo': photo})
+        images.wait_for_image_tasks()
+        with default_storage.open(Profile.objects.get(user=tradesman).photo.name) as stored:
+            image = Image.open(stored)
+            self.assertEqual((image.size, 'exif' in image.info), ((200, 400), False))
+
+
+# Content-addressed uploads (core/storage.py) and their reference counts (core/blobs.py)
+class BlobStorageTests(TestCase):
+    def setUp(self):
+        _media_root(self)
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        Profile.objects.create(user=self.tradesman, role='tradesman', trade='Plumber')
+        self.job = Job.objects.create(owner=self.tradesman, title='Service', description='d', location='Cork')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        self.photo = _jpeg(300, 200).read()
+
+    def _blob_files(self):
+        root = blob_storage().path('blobs')
+        return sorted(name for _, _, names in os.walk(root) for name in names)
+
+    def test_repeated_uploads_share_one_counted_blob(self):
+        self.client.force_login(self.customer)
+        for _ in range(2):
+            self.client.post(reverse('request_job', args=[self.job.id]), {
+                'message': 'Same photo again', 'images': SimpleUploadedFile('tap.JPG', self.photo),
+            })
+        names = set(JobRequestImage.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_blob_name(name) and name.endswith('.jpg'))
+        self.assertEqual(Blob.objects.get(name=name).refcount, 2)
+
+        qualification = Qualification.objects.create(
+            tradesman=self.tradesman, title='Gas Safe', document=ContentFile(self.photo, name='gas.jpg'),
+        )
+        self.assertEqual(qualification.document.name, name)
+        self.assertEqual((Blob.objects.get(name=name).refcount, len(self._blob_files())), (3, 1))
+
+    def test_unreferenced_blobs_are_collected(self):
+        job_request = JobRequest.objects.create(job=self.job, customer=self.customer, status='completed')
+        review = JobReview.objects.create(job_request=job_request, rating=5, photo=ContentFile(self.photo, name='r.jpg'))
+        kept = Qualification.objects.create(
+            tradesman=self.tradesman, title='Gas Safe', document=ContentFile(b'%PDF-1.4 cert', name='gas.pdf'),
+        ).document.name
+        orphan = blob_storage().save('upload.jpg', ContentFile(b'rolled back upload'))
+        os.utime(blob_storage().path(orphan), (0, 0))
+
+        review.delete()
+        blob = Blob.objects.get(name=review.photo.name)
+        self.assertEqual(blob.refcount, 0)
+        self.assertIsNotNone(blob.released_at)
+        self.assertEqual(blobs.collect_garbage(blobs.gc_cutoff(1)), [orphan])
+
+        call_command('collect_blobs', hours=0, stdout=StringIO())
+        self.assertFalse(Blob.objects.filter(name=review.photo.name).exists())
+        self.assertEqual(self._blob_files(), [os.path.basename(kept)])
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+    def test_upload_revives_an_unreferenced_blob(self):
+        name = blob_storage().save('r.jpg', ContentFile(self.photo))
+        blobs.retain([name])
+        blobs.release([name])
+        Blob.objects.filter(name=name).update(released_at=timezone.now() - timedelta(days=2))
+
+        # The same bytes arrive again before the upload's row is saved
+        self.assertEqual(blob_storage().save('again.jpg', ContentFile(self.photo)), name)
+        self.assertEqual(blobs.collect_garbage(blobs.gc_cutoff(1)), [])
+        self.assertTrue(blob_storage().exists(name))
+
+        # A blob whose file was collected is written again
+        Blob.objects.filter(name=name).update(released_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(blobs.collect_garbage(blobs.gc_cutoff(1)), [name])
+        self.assertEqual(blob_storage().save('third.jpg', ContentFile(self.photo)), name)
+        blobs.retain([name])
+        self.assertEqual(Blob.objects.get(name=name).size, len(self.photo))
+
+    def test_stripping_metadata_moves_references_to_a_new_blob(self):
+        exif = Image.Exif()
+        exif[0x010f] = 'PhoneMaker'
+        photo = _jpeg(300, 200, exif=exif.tobytes()).read()
+        job_request = JobRequest.objects.create(job=self.job, customer=self.customer)
+        rows = [JobRequestImage.objects.create(job_request=job_request, image=ContentFile(photo, name='p.jpg')) for _ in range(2)]
+        original = rows[0].image.name
+
+        self.assertTrue(images.strip_metadata(original, blob_storage()))
+        stripped = set(JobRequestImage.objects.values_list('image', flat=True))
+        self.assertEqual(len(stripped), 1)
+        self.assertNotEqual(stripped, {original})
+        counts = dict(Blob.objects.values_list('name', 'refcount'))
+        self.assertEqual(counts, {original: 0, stripped.pop(): 2})
+
+
+# Upload serving at MEDIA_URL (core/media.py)
+class MediaServingTests(TestCase):
+    def setUp(self):
+        _media_root(self)
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        Profile.objects.create(user=self.tradesman, role='tradesman')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        job = Job.objects.create(owner=self.tradesman, title='Service', description='d', location='Cork')
+        job_request = JobRequest.objects.create(job=job, customer=self.customer, status='completed')
+        self.photo = _jpeg(300, 200).read()
+        self.review = JobReview.objects.create(job_request=job_request, rating=5, photo=ContentFile(self.photo, name='r.jpg'))
+        self.url = settings.MEDIA_URL + self.review.photo.name
+
+    def _get(self, url, **headers):
+        response = self.client.get(url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_blob_is_immutable_and_revalidates(self):
+        response, body = self._get(self.url)
+        self.assertEqual((response.status_code, body, response['Content-Type']), (200, self.photo, 'image/jpeg'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn(response['ETag'].strip('"'), self.review.photo.name)
+        self.assertEqual(self._get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+
+    def test_byte_ranges(self):
+        size = len(self.photo)
+        response, body = self._get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual((response.status_code, body, response['Content-Range']), (206, self.photo[10:20], f'bytes 10-19/{size}'))
+        response, body = self._get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual((response.status_code, body), (206, self.photo[-5:]))
+        response, _ = self._get(self.url, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, f'bytes */{size}'))
+        response, body = self._get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.photo))
+
+    def test_qualification_documents_are_private(self):
+        document = Qualification.objects.create(
+            tradesman=self.tradesman, title='Gas Safe', document=ContentFile(b'%PDF-1.4 cert', name='gas.pdf'),
+        ).document
+        url = settings.MEDIA_URL + document.name
+        self.assertEqual(self._get(url)[0].status_code, 404)
+        self.client.force_login(self.customer)
+        self.assertEqual(self._get(url)[0].status_code, 404)
+        self.client.force_login(self.tradesman)
+        response, body = self._get(url)
+        self.assertEqual((response.status_code, body), (200, b'%PDF-1.4 cert'))
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+
+    def test_unsafe_types_and_paths(self):
+        page = default_storage.save('profiles/page.html', ContentFile(b'<script>alert(1)</script>'))
+        response, _ = self._get(settings.MEDIA_URL + page)
+        self.assertEqual((response['Content-Disposition'], response['Cache-Control']), ('attachment', 'public, max-age=3600'))
+        self.assertEqual(self._get(settings.MEDIA_URL + '../core/settings.py')[0].status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected/')
+    def test_proxy_offload(self):
+        response, body = self._get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual((response.status_code, body), (200, b''))
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/' + self.review.photo.name)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+
+# Server-Sent Events notification stream (users/live.py)
+# TransactionTestCase so events are published when their transaction commits
+class NotificationStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pw')
+        Notification.objects.create(user=self.user, notification_type='message', message='Earlier')
+
+    def _frames(self, action, count):
+        async def run():
+            stream = event_stream(self.user.id, keepalive=5)
+            frames = [await stream.__anext__(), await stream.__anext__()]
+            await action()
+            while len(frames) < count:
+                frames.append(await stream.__anext__())
+            await stream.aclose()
+            return frames
+        return async_to_sync(run)()
+
+    def _event(self, frame):
+        event, data = frame.strip().split('\n')
+        return event[len('event: '):], json.loads(data[len('data: '):])
+
+    def test_new_notification_is_pushed_with_unread_count(self):
+        async def create():
+            await sync_to_async(notify)(self.user, 'message', 'New message from bob')
+
+        frames = self._frames(create, 4)
+        self.assertTrue(frames[0].startswith('retry: '))
+        self.assertEqual(self._event(frames[1]), ('unread', {'count': 1}))
+        event, data = self._event(frames[2])
+        self.assertEqual((event, data['message']), ('notification', 'New message from bob'))
+        self.assertEqual(self._event(frames[3]), ('unread', {'count': 2}))
+
+    def test_marking_read_updates_count(self):
+        async def mark_read():
+            notification = await Notification.objects.aget(user=self.user)
+            notification.is_read = True
+            await sync_to_async(notification.save)()
+
+        frames = self._frames(mark_read, 3)
+        self.assertEqual(self._event(frames[2]), ('unread', {'count': 0}))
+
+    def test_no_count_without_an_open_stream(self):
+        with CaptureQueriesContext(connection) as queries:
+            notify(self.user, 'message', 'New message from bob')
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+
+    def test_view_streams_event_stream_under_asgi(self):
+        async def run():
+            await self.async_client.aforce_login(self.user)
+            response = await self.async_client.get(reverse('notification_stream'))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertTrue(response.streaming)
+            await sync_to_async(response.close)()
+        async_to_sync(run)()
+
+    def test_view_returns_one_snapshot_under_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.streaming)
+        retry, frame = response.content.decode().split('\n\n', 1)
+        self.assertEqual(retry, 'retry: 30000')
+        self.assertEqual(self._event(frame), ('unread', {'count': 1}))
+
+
+# Read replica routing (core/routers.py) against a second SQLite database that, unlike a
+# real replica, never receives the primary's writes - so every row shows where it was read
+class ReplicaRoutingTests(TestCase):
+    # The alias is added for this class only (replacing the test mirror of a configured
+    # replica), so it joins databases once it exists
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.mkdtemp()
+        cls.configured_replica = connections.settings.get(REPLICA_DB_ALIAS)
+        cls._drop_replica_connection()
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3')}
+        connections.settings[REPLICA_DB_ALIAS] = connections.configure_settings({'default': {}, REPLICA_DB_ALIAS: replica})[REPLICA_DB_ALIAS]
+        call_command('migrate', database=REPLICA_DB_ALIAS, verbosity=0)
+        cls.databases = {'default', REPLICA_DB_ALIAS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._drop_replica_connection()
+        if cls.configured_replica is None:
+            del connections.settings[REPLICA_DB_ALIAS]
+        else:
+            connections.settings[REPLICA_DB_ALIAS] = cls.configured_replica
+        shutil.rmtree(cls.replica_dir)
+
+    @staticmethod
+    def _drop_replica_connection():
+        if REPLICA_DB_ALIAS in connections.settings:
+            connections[REPLICA_DB_ALIAS].close()
+            del connections[REPLICA_DB_ALIAS]
+
+    def setUp(self):
+        cache.clear()
+        self.tradesman = User.objects.create_user(username='tradesman', password='pw')
+        self.profile = Profile.objects.create(user=self.tradesman, role='tradesman', company_name='Primary Plumbing')
+        self.customer = User.objects.create_user(username='customer', password='pw')
+        Profile.objects.create(user=self.customer, role='customer')
+        # The replica's copy of the tradesman, under a different name
+        self.tradesman.save(using=REPLICA_DB_ALIAS)
+        self.profile.save(using=REPLICA_DB_ALIAS)
+        Profile.objects.using(REPLICA_DB_ALIAS).filter(pk=self.profile.pk).update(company_name='Replica Plumbing')
+        self.client.force_login(self.customer)
+        self.url = reverse('tradesman_profile_detail', args=[self.profile.id])
+
+    def test_read_only_view_reads_replica(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Replica Plumbing')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_other_views_read_primary(self):
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica_queries:
+            self.assertEqual(self.client.get(reverse('favourites_list')).status_code, 200)
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_write_pins_browser_to_primary(self):
+        # toggle_favourite writes on GET, so the pin follows writes rather than methods
+        response = self.client.get(reverse('toggle_favourite', args=[self.tradesman.id]))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.DATABASE_REPLICA_PIN_SECONDS)
+        self.assertTrue(Favourite.objects.filter(customer=self.customer).exists())
+        self.assertFalse(Favourite.objects.using(REPLICA_DB_ALIAS).exists())
+
+        self.assertContains(self.client.get(self.url), 'Primary Plumbing')
+        # Once the pin expires the page is read from the replica again
+        self.client.cookies.pop(PIN_COOKIE)
+        self.assertContains(self.client.get(self.url), 'Replica Plumbing')
+
+    @override_settings(TRADESMAN_SEARCH_CACHE_ENABLED=True)
+    def test_search_cache_is_filled_from_primary(self):
+        # A tradesman the replica hasn't received yet
+        newcomer = User.objects.create_user(username='newcomer', password='pw')
+        Profile.objects.create(user=newcomer, role='tradesman', company_name='Newcomer Plumbing')
+        url = reverse('search_tradesmen')
+        self.assertNotContains(self.client.get(url, {'format': 'json'}), 'newcomer')
+
+        # Once it catches up, the cached list already holds the new row
+        newcomer.save(using=REPLICA_DB_ALIAS)
+        Profile.objects.get(user=newcomer).save(using=REPLICA_DB_ALIAS)
+        self.assertContains(self.client.get(url, {'format': 'json'}), 'newcomer')
+        self.assertEqual(cache_stats()['hits'], 1)
+
+    def test_reads_after_a_write_in_the_same_request_use_primary(self):
+        # The dashboard creates a missing profile before listing the directory
+        newcomer = User.objects.create_user(username='newcomer', password='pw')
+        self.client.force_login(newcomer)
+        with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica_queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Primary Plumbing')
+        self.assertEqual(len(replica_queries), 0)
+        self.assertIn(PIN_COOKIE, response.cookies)
@@ -28,5 +28,7 @@ urlpatterns = [
     path('favourites/', views.favourites_list, name='favourites_list'),
     path('favourites/toggle/<int:tradesman_id>/', views.toggle_favourite, name='toggle_favourite'),
     path('notifications/', views.notifications, name='notifications'),
+    path('notifications/read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
     path('notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
 ]
@@ -1,17 +1,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.models import User
+from django.core.exceptions import BadRequest
 from django.contrib.auth import authenticate, login, logout
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Profile, Notification, Favourite, Qualification
+from .live import event_stream, poll_snapshot, publish_unread_count
+from .outbox import notify
+from .search import search_profiles
+from .search_cache import cached_tradesman_page, normalize_filters
+from core.blobs import retain
+from core.conditional import make_etag, not_modified, set_validators
+from core.images import schedule_variants_on_commit, variant_url
+from core.pagination import InvalidCursor, page_size_from, paginate_keyset
+from core.routers import replica_reads
+from core.uploads import check_images, process_uploads_on_commit, upload_errors
 from django.db import models
-from django.db.models import Avg, Q
-from jobs.models import Job, JobRequest, JobReview, JobRequestImage, OpenJobCompletion
+from django.db.models import Exists, F, OuterRef, Prefetch, Q
+from jobs.models import Job, JobRequest, JobReview, JobRequestImage, OpenJobCompletion, OpenJobFeedEntry
+from jobs.trades import matching_trade_ids
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
 import uuid
 
 
@@ -29,24 +42,6 @@ def generate_confirmation_code():
 import json
 
 
-# Helper function to send email notifications
-# Sends an email when a notification is created for important events
-# REF-008: Django Email Backend - send_mail function
-def send_notification_email(user, subject, message_text):
-    try:
-        if user.email:
-            send_mail(
-                subject=subject,
-                message=message_text,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=True,  # Don't crash if email fails
-            )
-    except Exception:
-        # Silently fail - email is optional, notifications still work
-        pass
-
-
 # User registration - handles both JSON API calls and form submissions
 # Creates a new user and their profile with role (customer or tradesman)
 # REF-002: Django Authentication - User creation
@@ -158,33 +153,106 @@ def logout_user(request):
 # REF-010: Django Q Objects - Complex queries
 # REF-017: Aaron Jack - Separate dashboards for different user types
 # REF-021: Django ORM - select_related for query optimization
-# REF-022: Django ORM - Aggregation (Avg) for ratings
+# REF-022: Ratings read from the maintained TradesmanStats aggregates
 # REF-025: Stack Overflow - Q objects for multiple field search
-# Build search terms from query so "plumbing" also matches "Plumber" (Iteration 4 US 31)
-# REF-010: Django Q Objects - term expansion for complex lookups
+# Open customer jobs for a tradesman's trade (all of them for one without a trade), read
+# from their fan-out feed (jobs/feed.py writes an entry per matching tradesman when a job
+# is posted, with the completion state kept on the entry, so this is one range scan and
+# no trade matching)
 # REF-030: ChatGPT - Trade filtering / search variant logic
-def _search_terms_for_query(query):
-    if not query or not query.strip():
-        return []
-    terms = set()
-    for word in query.strip().lower().split():
-        if len(word) < 2:
-            continue
-        terms.add(word)
-        # Word variants: "plumbing" -> also match "plumber"; "electrician" -> "electric"
-        if word.endswith('ing') and len(word) > 3:
-            terms.add(word[:-3])  # plumbing -> plumb
-        if word.endswith('er') and len(word) > 2:
-            terms.add(word[:-2])  # plumber -> plumb
-        if word.endswith('ians'):
-            terms.add(word[:-4])  # electricians -> electric
-        if word.endswith('ian') and len(word) > 3:
-            terms.add(word[:-3])  # electrician -> electric
-    return list(terms)
+def _open_job_feed(user):
+    return OpenJobFeedEntry.objects.filter(tradesman=user).select_related('job', 'job__owner')
+
+
+# Split feed entries into jobs plus the completed / awaiting-confirmation job id sets
+def _feed_jobs(entries):
+    jobs, completed, awaiting = [], set(), set()
+    for entry in entries:
+        jobs.append(entry.job)
+        if entry.completion_status == 'completed':
+            completed.add(entry.job_id)
+        elif entry.completion_status == 'awaiting_confirmation':
+            awaiting.add(entry.job_id)
+    return jobs, completed, awaiting
+
+
+# All tradesmen with avg_rating read from the denormalised TradesmanStats row
+# Sorting/filtering on the indexed average replaces Avg() across four joins
+# REF-021: Django ORM - select_related(); REF-022: ratings maintained in users/stats.py
+def _tradesmen_with_ratings():
+    return (
+        Profile.objects.filter(role='tradesman')
+        .select_related('user', 'user__tradesman_stats')
+        .annotate(avg_rating=F('user__tradesman_stats__average_rating'))
+        .order_by(F('avg_rating').desc(nulls_last=True), 'user__username')
+    )
+
+
+# Keyset sort keys for each paginated list (the last key is unique)
+TRADESMAN_SORT_KEYS = ('-avg_rating', 'user__username', 'id')
+SEARCH_SORT_KEYS = ('-search_rank',) + TRADESMAN_SORT_KEYS  # best matches first
+OPEN_JOB_SORT_KEYS = ('-date_posted', '-job_id')
+REQUEST_SORT_KEYS = ('-date_requested', '-id')
+NOTIFICATION_SORT_KEYS = ('-updated_at', '-id')
+
+
+# Full-text search results are ordered by relevance, everything else by rating
+def _tradesman_sort_keys(tradesmen):
+    return SEARCH_SORT_KEYS if 'search_rank' in tradesmen.query.annotations else TRADESMAN_SORT_KEYS
+
+
+# One keyset page of queryset from ?cursor=
+# A malformed or edited cursor is a 400 rather than a silent restart at page 1, which
+# would hand the client pages it has already seen
+# REF-005: Django ORM - keyset pagination helpers in core/pagination.py
+def _paginate(request, queryset, keys):
+    try:
+        page = paginate_keyset(queryset, keys, request.GET.get('cursor'), page_size_from(request))
+    except InvalidCursor:
+        raise BadRequest('Invalid cursor')
+    return page.build_links(request)
+
+
+# Directory page served from the filter-keyed result cache (users/search_cache.py)
+def _paginate_tradesmen(request, tradesmen, filters):
+    keys = _tradesman_sort_keys(tradesmen)
+    profiles = _tradesmen_with_ratings()
+    try:
+        page = cached_tradesman_page(tradesmen, keys, filters, profiles, request.GET.get('cursor'), page_size_from(request))
+    except InvalidCursor:
+        raise BadRequest('Invalid cursor')
+    return page.build_links(request)
+
+
+# JSON variant of the paginated list views (?format=json)
+def _wants_json(request):
+    return request.GET.get('format') == 'json'
+
+
+def _page_json(page, serialize):
+    return JsonResponse({'results': [serialize(item) for item in page], 'cursors': page.cursors()})
 
 
+def _tradesman_json(profile):
+    return {
+        'id': profile.id,
+        'user_id': profile.user_id,
+        'username': profile.user.username,
+        'display_name': profile.display_name,
+        'trade': profile.trade,
+        'location': profile.location,
+        'service_area': profile.service_area,
+        'years_experience': profile.years_experience,
+        'avg_rating': profile.avg_rating,
+        # Card thumbnail - a small variant rather than the original upload
+        'photo': variant_url(profile.photo, 160) or None,
+    }
+
+
+# Reads run on the read replica when one is configured (core/routers.py)
 # REF-030: ChatGPT - Trade filtering implementation
 @login_required
+@replica_reads
 def dashboard(request):
     profile, created = Profile.objects.get_or_create(user=request.user, defaults={'role': 'customer'})
 
@@ -195,39 +263,16 @@ def dashboard(request):
         my_jobs = Job.objects.filter(owner=request.user).order_by('-date_posted')
 
         # Open-ended jobs that customers have posted (potential work opportunities)
-        # Filter to only show jobs matching this tradesman's trade
-        open_jobs = Job.objects.filter(owner__profile__role='customer').order_by('-date_posted')
-        
-        # If tradesman has a trade specified, only show jobs matching that trade (Iteration 4: term expansion)
-        if profile.trade:
-            terms = _search_terms_for_query(profile.trade)
-            if terms:
-                q_trade = Q()
-                for term in terms:
-                    q_trade |= Q(trade__icontains=term)
-                open_jobs = open_jobs.filter(q_trade)
-
-        # Check which open jobs this tradesman has completed
-        completed_open_job_ids = set(
-            OpenJobCompletion.objects.filter(tradesman=request.user, status='completed')
-            .values_list('job_id', flat=True)
-        )
-        awaiting_open_job_ids = set(
-            OpenJobCompletion.objects.filter(tradesman=request.user, status='awaiting_confirmation')
-            .values_list('job_id', flat=True)
-        )
+        # The feed only holds jobs matching this tradesman's trade, with completion state
+        open_jobs, completed_open_job_ids, awaiting_open_job_ids = _feed_jobs(_open_job_feed(request.user))
 
         # Count of how many job requests customers have sent them
         request_count = JobRequest.objects.filter(job__owner=request.user).count()
-        
-        # Get unread notification count
-        unread_notifications = Notification.objects.filter(user=request.user, is_read=False).count()
 
         return render(request, 'users/tradesman_dashboard.html', {
             'my_jobs': my_jobs,
             'open_jobs': open_jobs,
             'request_count': request_count,
-            'unread_notifications': unread_notifications,
             'completed_open_job_ids': completed_open_job_ids,
             'awaiting_open_job_ids': awaiting_open_job_ids,
         })
@@ -243,44 +288,20 @@ def dashboard(request):
         min_experience = request.GET.get('min_experience', '').strip()
         availability_filter = request.GET.get('availability', '').strip()
 
-        # Start with all tradesmen, calculate their average rating in one query
+        # Start with all tradesmen, reading their average rating from TradesmanStats
         # select_related optimises the database query to avoid multiple hits
         # REF-005: Django ORM - filter() and order_by()
         # REF-021: Django ORM - select_related() for query optimization
-        # REF-022: Django ORM - annotate() with Avg() for calculating average rating
-        tradesmen = (
-            Profile.objects.filter(role='tradesman')
-            .select_related('user')
-            .annotate(avg_rating=Avg('user__jobs__requests__review__rating'))
-            .order_by('-avg_rating', 'user__username')  # Best rated first
-        )
+        tradesmen = _tradesmen_with_ratings()  # Best rated first
 
-        # Multi-field search - case-insensitive; expanded terms so "plumbing" matches "Plumber" (Iteration 4)
-        # REF-005: Django ORM - filter() with multiple conditions
-        # REF-010: Django Q Objects - Complex OR queries across multiple fields
+        # Full-text search over name, company, trade and service area, most relevant first
+        # Stemmed so "plumbing" matches "Plumber" (see users/search.py)
         if query:
-            terms = _search_terms_for_query(query)
-            if terms:
-                q_obj = Q()
-                for term in terms:
-                    q_obj |= (
-                        Q(company_name__icontains=term) |
-                        Q(user__first_name__icontains=term) |
-                        Q(user__last_name__icontains=term) |
-                        Q(user__username__icontains=term) |
-                        Q(trade__icontains=term) |
-                        Q(service_area__icontains=term)
-                    )
-                tradesmen = tradesmen.filter(q_obj)
-
-        # Filter by specific trade type - case-insensitive with term expansion (Iteration 4)
+            tradesmen = search_profiles(tradesmen, query)
+
+        # Filter by specific trade type - resolved through the trade taxonomy to trade ids
         if trade_filter:
-            terms = _search_terms_for_query(trade_filter)
-            if terms:
-                q_trade = Q()
-                for term in terms:
-                    q_trade |= Q(trade__icontains=term)
-                tradesmen = tradesmen.filter(q_trade)
+            tradesmen = tradesmen.filter(trade_category__in=matching_trade_ids(trade_filter))
 
         # Filter by location (checks both location and service_area fields)
         # REF-010: Django Q Objects - OR condition for multiple fields
@@ -310,48 +331,61 @@ def dashboard(request):
         if availability_filter:
             tradesmen = tradesmen.filter(availability__icontains=availability_filter)
 
+        # Keyset pagination on (rating, username) over the cached result list for these filters
+        tradesmen_page = _paginate_tradesmen(request, tradesmen, normalize_filters(
+            query, trade_filter, location_filter, min_rating, min_experience, availability_filter,
+        ))
+        if _wants_json(request):
+            return _page_json(tradesmen_page, _tradesman_json)
+
         # Get all job requests this customer has made (for tracking status)
+        # The tradesman's profile and any review come back in the same join
         my_requests = (
-            JobRequest.objects.select_related('job', 'job__owner')
+            JobRequest.objects.select_related('job', 'job__owner', 'job__owner__profile', 'review')
             .filter(customer=request.user)
             .order_by('-date_requested')
         )
         # Get open jobs this customer posted and their completion status
-        my_open_jobs = Job.objects.filter(owner=request.user, owner__profile__role='customer').order_by('-date_posted')
+        # All completions and their reviews arrive in one prefetch, so the number of
+        # queries doesn't grow with the customer's history
+        # REF-021: Django ORM - prefetch_related() with Prefetch objects
+        my_open_jobs = (
+            Job.objects.filter(owner=request.user, owner__profile__role='customer')
+            .prefetch_related(Prefetch(
+                'completions',
+                queryset=OpenJobCompletion.objects.select_related('tradesman', 'review').order_by('-completed_at'),
+            ))
+            .order_by('-date_posted')
+        )
         open_jobs_with_completions = []
         for job in my_open_jobs:
-            completions = OpenJobCompletion.objects.filter(job=job).select_related('tradesman').order_by('-completed_at')
+            completions = list(job.completions.all())
             completed_list = []
-            for comp in completions.filter(status='completed'):
+            for comp in completions:
+                if comp.status != 'completed':
+                    continue
                 # Check if review exists for this completion
-                tradesman_job = Job.objects.filter(owner=comp.tradesman, title__startswith=f"Completed: {job.title}").first()
-                has_review = False
-                review_rating = None
-                if tradesman_job:
-                    job_req = JobRequest.objects.filter(job=tradesman_job, customer=request.user).first()
-                    if job_req and hasattr(job_req, 'review'):
-                        has_review = True
-                        review_rating = job_req.review.rating
+                review = getattr(comp, 'review', None)
                 completed_list.append({
                     'completion': comp,
-                    'has_review': has_review,
-                    'review_rating': review_rating,
+                    'has_review': review is not None,
+                    'review_rating': review.rating if review else None,
                 })
             open_jobs_with_completions.append({
                 'job': job,
                 'completions': completions,
-                'awaiting_confirmation': completions.filter(status='awaiting_confirmation'),
+                'awaiting_confirmation': [c for c in completions if c.status == 'awaiting_confirmation'],
                 'completed': completed_list,
             })
-        
+
         # REF-005: Django ORM - values_list() for favourite IDs (Iteration 4 US 29)
         favourite_tradesman_ids = set(
             Favourite.objects.filter(customer=request.user).values_list('tradesman_id', flat=True)
         )
-        unread_notifications = Notification.objects.filter(user=request.user, is_read=False).count()
 
         return render(request, 'users/customer_dashboard.html', {
-            'tradesmen': tradesmen,
+            'tradesmen': tradesmen_page,
+            'page': tradesmen_page,
             'filters': {
                 'q': query,
                 'trade': trade_filter,
@@ -363,7 +397,6 @@ def dashboard(request):
             'rating_choices': range(1, 6),
             'my_requests': my_requests,
             'my_open_jobs': open_jobs_with_completions,
-            'unread_notifications': unread_notifications,
             'favourite_tradesman_ids': favourite_tradesman_ids,
         })
 
@@ -417,9 +450,19 @@ def view_requests(request):
         return JsonResponse({'error': 'Only tradesmen can view job requests'}, status=403)
 
     # Get all requests for jobs owned by this tradesman, ordered by most recent
-    requests = JobRequest.objects.select_related('job', 'customer').filter(job__owner=request.user).order_by('-date_requested')
+    requests = JobRequest.objects.select_related('job', 'customer').filter(job__owner=request.user)
+    requests_page = _paginate(request, requests, REQUEST_SORT_KEYS)
+    if _wants_json(request):
+        return _page_json(requests_page, lambda req: {
+            'id': req.id,
+            'job_id': req.job_id,
+            'job_title': req.job.title,
+            'customer': req.customer.username,
+            'status': req.status,
+            'date_requested': req.date_requested.isoformat(),
+        })
 
-    return render(request, 'users/view_requests.html', {'requests': requests})
+    return render(request, 'users/view_requests.html', {'requests': requests_page, 'page': requests_page})
 
 
 # Detailed view of a specific job request
@@ -479,18 +522,13 @@ def complete_request(request, request_id):
     
     # Notify customer that job is awaiting confirmation
     # REF-028: ChatGPT - Notification creation for job status updates
-    Notification.objects.create(
-        user=job_request.customer,
-        notification_type='job_status',
-        message=f'Your job "{job_request.job.title}" is awaiting confirmation. Enter the code to verify completion.',
-        link=f'/api/users/request/{job_request.id}/confirm/'
-    )
-    # Send email notification
-    # REF-008: Django Email Backend
-    send_notification_email(
+    notify(
         job_request.customer,
-        f'Job Awaiting Confirmation: {job_request.job.title}',
-        f'Your job "{job_request.job.title}" has been marked as complete by {request.user.get_full_name() or request.user.username}.\n\nPlease enter the confirmation code to verify completion and leave a review.\n\nConfirmation code: {job_request.confirmation_code}'
+        'job_status',
+        f'Your job "{job_request.job.title}" is awaiting confirmation. Enter the code to verify completion.',
+        link=f'/api/users/request/{job_request.id}/confirm/',
+        email_subject=f'Job Awaiting Confirmation: {job_request.job.title}',
+        email_body=f'Your job "{job_request.job.title}" has been marked as complete by {request.user.get_full_name() or request.user.username}.\n\nPlease enter the confirmation code to verify completion and leave a review.\n\nConfirmation code: {job_request.confirmation_code}',
     )
 
     return render(request, 'users/awaiting_confirmation.html', {
@@ -535,30 +573,20 @@ def confirm_completion(request, request_id):
             # Mark chat as JobDone if one exists between customer and tradesman
             # Iteration 5: Auto-complete chat when job is verified
             # REF-036: ChatGPT - Chat model with Job Done status (auto-completion)
-            from chat.models import Chat
-            chat = Chat.objects.filter(
-                Q(user1=request.user, user2=job_request.job.owner) | Q(user1=job_request.job.owner, user2=request.user),
-                status='active'
-            ).first()
+            from chat.messaging import close_chat, find_active_chat
+            chat = find_active_chat(request.user, job_request.job.owner)
             if chat:
-                chat.status = 'job_done'
-                chat.completed_at = timezone.now()
-                chat.save()
+                close_chat(chat)
             
             # Notify tradesman that job was confirmed
             # REF-028: ChatGPT - Notification creation
-            Notification.objects.create(
-                user=job_request.job.owner,
-                notification_type='job_status',
-                message=f'Your job "{job_request.job.title}" has been confirmed as completed by {request.user.get_full_name() or request.user.username}.',
-                link=f'/api/users/request/{job_request.id}/'
-            )
-            # Send email notification
-            # REF-008: Django Email Backend
-            send_notification_email(
+            notify(
                 job_request.job.owner,
-                f'Job Confirmed: {job_request.job.title}',
-                f'Your job "{job_request.job.title}" has been confirmed as completed by {request.user.get_full_name() or request.user.username}.\n\nThe customer will now be able to leave a review.'
+                'job_status',
+                f'Your job "{job_request.job.title}" has been confirmed as completed by {request.user.get_full_name() or request.user.username}.',
+                link=f'/api/users/request/{job_request.id}/',
+                email_subject=f'Job Confirmed: {job_request.job.title}',
+                email_body=f'Your job "{job_request.job.title}" has been confirmed as completed by {request.user.get_full_name() or request.user.username}.\n\nThe customer will now be able to leave a review.',
             )
             
             messages.success(request, 'Job confirmed! Please leave a review for your tradesman.')
@@ -607,16 +635,21 @@ def submit_review(request, request_id):
         comment = request.POST.get('comment', '').strip()
         # REF-003: Django Views - request.FILES for file upload (Iteration 4 US 28)
         photo = request.FILES.get('photo')
+        upload_problems = upload_errors(request) + check_images([photo] if photo else [])
 
         if rating is None or rating < 1 or rating > 5:
             messages.error(request, 'Please provide a rating between 1 and 5.')
+        elif upload_problems:
+            for problem in upload_problems:
+                messages.error(request, problem)
         else:
-            JobReview.objects.create(
+            review = JobReview.objects.create(
                 job_request=job_request,
                 rating=rating,
                 comment=comment,
                 photo=photo,
             )
+            process_uploads_on_commit([review.photo])
             messages.success(request, 'Thank you for leaving a review!')
             return redirect('dashboard')
 
@@ -650,26 +683,33 @@ def request_job(request, job_id):
             messages.error(request, 'Message cannot be empty.')
             return render(request, 'users/request_job.html', {'job': job})
 
-        job_request = JobRequest.objects.create(job=job, customer=request.user, message=message)
         # Iteration 4 (US 28): Attach optional photos to job request
-        # REF-005: Django ORM - create() for related JobRequestImage records
-        for f in request.FILES.getlist('images'):
-            if f and f.size:
-                JobRequestImage.objects.create(job_request=job_request, image=f)
+        # Oversized or undecodable photos reject the whole request so nothing is half sent
+        images = [f for f in request.FILES.getlist('images') if f and f.size]
+        upload_problems = upload_errors(request) + check_images(images)
+        if upload_problems:
+            for problem in upload_problems:
+                messages.error(request, problem)
+            return render(request, 'users/request_job.html', {'job': job})
+
+        job_request = JobRequest.objects.create(job=job, customer=request.user, message=message)
+        # REF-005: Django ORM - bulk_create() for related JobRequestImage records
+        # bulk_create skips post_save, so the blob references and variants are handled here
+        request_images = JobRequestImage.objects.bulk_create(
+            [JobRequestImage(job_request=job_request, image=f) for f in images]
+        )
+        retain([row.image.name for row in request_images])
+        schedule_variants_on_commit([row.image.name for row in request_images], JobRequestImage.image.field.storage)
+        process_uploads_on_commit([row.image for row in request_images])
         # Create notification for the tradesman
         # REF-028: ChatGPT - Notification system design and creation
-        notification = Notification.objects.create(
-            user=job.owner,
-            notification_type='job_request',
-            message=f'New job request from {request.user.get_full_name() or request.user.username} for "{job.title}"',
-            link=f'/api/users/request/{job_request.id}/'
-        )
-        # Send email notification
-        # REF-008: Django Email Backend - send_mail via helper function
-        send_notification_email(
+        notify(
             job.owner,
-            f'New Job Request: {job.title}',
-            f'You have received a new job request from {request.user.get_full_name() or request.user.username} for "{job.title}".\n\nMessage: {message}\n\nView the request in your dashboard.'
+            'job_request',
+            f'New job request from {request.user.get_full_name() or request.user.username} for "{job.title}"',
+            link=f'/api/users/request/{job_request.id}/',
+            email_subject=f'New Job Request: {job.title}',
+            email_body=f'You have received a new job request from {request.user.get_full_name() or request.user.username} for "{job.title}".\n\nMessage: {message}\n\nView the request in your dashboard.',
         )
         messages.success(request, 'Request sent successfully!')
         return redirect('/api/users/dashboard/')
@@ -726,18 +766,17 @@ def request_tradesman(request, tradesman_id):
             message=description,
         )
 
-        Notification.objects.create(
-            user=tradesman_user,
-            notification_type='job_request',
-            message=f'New direct job request from {request.user.get_full_name() or request.user.username} for "{title}"',
-            link=f'/api/users/request/{job_request.id}/'
-        )
-        send_notification_email(
+        notify(
             tradesman_user,
-            f'New Direct Job Request: {title}',
-            f'You have received a new direct job request from {request.user.get_full_name() or request.user.username}.\n\n'
-            f'Job: {title}\nLocation: {location}\n\nMessage: {description}\n\n'
-            f'View the request in your dashboard.'
+            'job_request',
+            f'New direct job request from {request.user.get_full_name() or request.user.username} for "{title}"',
+            link=f'/api/users/request/{job_request.id}/',
+            email_subject=f'New Direct Job Request: {title}',
+            email_body=(
+                f'You have received a new direct job request from {request.user.get_full_name() or request.user.username}.\n\n'
+                f'Job: {title}\nLocation: {location}\n\nMessage: {description}\n\n'
+                f'View the request in your dashboard.'
+            ),
         )
 
         messages.success(request, f'Request sent to {tradesman_profile.display_name}!')
@@ -788,18 +827,31 @@ def edit_profile(request):
             messages.warning(request, 'Years of experience must be a number. Value ignored.')
         profile.bio = request.POST.get('bio')
         profile.contact_email = request.POST.get('contact_email')
-        if request.FILES.get('photo'):
-            profile.photo = request.FILES['photo']
+        # Files over the upload caps never reach request.FILES; the rest of the form is
+        # still saved and the problems shown back on this page
+        photo = request.FILES.get('photo')
+        photo_problems = check_images([photo]) if photo else []
+        upload_problems = upload_errors(request) + photo_problems
+        new_photo = photo is not None and not photo_problems
+        if new_photo:
+            profile.photo = photo
         profile.save()
+        uploaded = [profile.photo] if new_photo else []
         qual_title = request.POST.get('qualification_title', '').strip()
         # REF-005: Django ORM - create() for Qualification (Iteration 4 US 27)
         if qual_title and request.FILES.get('qualification_document'):
-            Qualification.objects.create(
+            qualification = Qualification.objects.create(
                 tradesman=request.user,
                 title=qual_title,
                 document=request.FILES['qualification_document'],
             )
+            uploaded.append(qualification.document)
             messages.success(request, 'Qualification uploaded. It will show as pending until verified.')
+        process_uploads_on_commit(uploaded)
+        if upload_problems:
+            for problem in upload_problems:
+                messages.error(request, problem)
+            return redirect('edit_profile')
         messages.success(request, 'Profile updated successfully!')
         return redirect('/api/users/dashboard/')
 
@@ -809,47 +861,73 @@ def edit_profile(request):
 
 
 # Public profile page for a tradesman (Iteration 4: qualifications, photo, favourite state)
+# Conditional GET: ETag from the profile's version stamp (core/conditional.py); no
+# Last-Modified, since the favourite state in the page has no timestamp to move it
+# Reads run on the read replica when one is configured (core/routers.py)
 # REF-003: Django Views - Function-based views
-# REF-005: Django ORM - filter(), get(), exists()
+# REF-005: Django ORM - filter(), get(), Exists()
 # REF-006: Django Decorators - @login_required
 # REF-021: Django ORM - select_related() for query optimization
 @login_required
+@replica_reads
 def tradesman_profile_detail(request, profile_id):
+    # Version of the page for this viewer, from one primary key lookup: the profile stamp
+    # (moved by review and qualification changes too), the review counter and whether
+    # the viewer has favourited them. A current client copy gets 304 without the reviews.
+    version = (
+        Profile.objects.filter(id=profile_id, role='tradesman')
+        .annotate(is_favourite=Exists(Favourite.objects.filter(customer=request.user, tradesman=OuterRef('user'))))
+        .values('updated_at', 'user__tradesman_stats__review_count', 'is_favourite')
+        .first()
+    )
+    if version is None:
+        return JsonResponse({'error': 'Tradesman not found'}, status=404)
+    etag = make_etag(
+        'profile', profile_id, request.user.id, version['updated_at'].isoformat(),
+        version['user__tradesman_stats__review_count'], version['is_favourite'],
+    )
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
     try:
-        tradesman_profile = Profile.objects.select_related('user').get(id=profile_id, role='tradesman')
+        tradesman_profile = Profile.objects.select_related('user', 'user__tradesman_stats').get(id=profile_id, role='tradesman')
     except Profile.DoesNotExist:
         return JsonResponse({'error': 'Tradesman not found'}, status=404)
 
+    # Reviews of the tradesman's own jobs and of open jobs they completed
     reviews = (
-        JobReview.objects.filter(job_request__job__owner=tradesman_profile.user)
-        .select_related('job_request__customer')
+        JobReview.objects.filter(
+            Q(job_request__job__owner=tradesman_profile.user) | Q(completion__tradesman=tradesman_profile.user)
+        )
+        .select_related('job_request__customer', 'completion__job__owner')
         .order_by('-created_at')
     )
     # REF-005: Django ORM - filter() for verified qualifications (Iteration 4 US 27)
     qualifications = Qualification.objects.filter(tradesman=tradesman_profile.user, verified=True).order_by('-verified_at')
-    # REF-005: Django ORM - exists() for favourite check (Iteration 4 US 29)
-    is_favourite = False
-    if request.user.is_authenticated and getattr(request.user, 'profile', None):
-        try:
-            p = Profile.objects.get(user=request.user)
-            if p.role == 'customer':
-                is_favourite = Favourite.objects.filter(customer=request.user, tradesman=tradesman_profile.user).exists()
-        except Profile.DoesNotExist:
-            pass
+    # REF-005: Django ORM - Exists() for favourite check (Iteration 4 US 29), read with the version
+    # (only customers can save favourites)
+    is_favourite = version['is_favourite']
 
-    return render(request, 'users/tradesman_profile.html', {
+    response = render(request, 'users/tradesman_profile.html', {
         'tradesman': tradesman_profile,
         'reviews': reviews,
         'qualifications': qualifications,
         'is_favourite': is_favourite,
     })
+    response['Cache-Control'] = 'private, no-cache'
+    return set_validators(response, etag)
+
+
 # Standalone search page for finding tradesmen (Iteration 4: term expansion, favourite IDs)
+# Reads run on the read replica when one is configured (core/routers.py)
 # REF-003: Django Views - Function-based views
 # REF-005: Django ORM - filter(), annotate(), values_list()
 # REF-006: Django Decorators - @login_required
 # REF-010: Django Q Objects - multi-field search with expanded terms
-# REF-021: Django ORM - select_related(); REF-022: annotate with Avg()
+# REF-021: Django ORM - select_related(); REF-022: ratings from TradesmanStats
 @login_required
+@replica_reads
 def search_tradesmen(request):
     # Get search parameters from URL
     query = request.GET.get('q', '').strip()
@@ -857,37 +935,15 @@ def search_tradesmen(request):
     location_filter = request.GET.get('location', '').strip()
     min_rating = request.GET.get('min_rating', '').strip()
 
-    # Base query - all tradesmen with average rating calculated
-    tradesmen = (
-        Profile.objects.filter(role='tradesman')
-        .select_related('user')
-        .annotate(avg_rating=Avg('user__jobs__requests__review__rating'))
-        .order_by('-avg_rating', 'user__username')
-    )
+    # Base query - all tradesmen with their maintained average rating
+    tradesmen = _tradesmen_with_ratings()
 
-    # Case-insensitive search with term expansion:
+    # Full-text search with stemming, ranked by relevance
     if query:
-        terms = _search_terms_for_query(query)
-        if terms:
-            q_obj = Q()
-            for term in terms:
-                q_obj |= (
-                    Q(company_name__icontains=term) |
-                    Q(user__first_name__icontains=term) |
-                    Q(user__last_name__icontains=term) |
-                    Q(user__username__icontains=term) |
-                    Q(trade__icontains=term) |
-                    Q(service_area__icontains=term)
-                )
-            tradesmen = tradesmen.filter(q_obj)
+        tradesmen = search_profiles(tradesmen, query)
 
     if trade_filter:
-        terms = _search_terms_for_query(trade_filter)
-        if terms:
-            q_trade = Q()
-            for term in terms:
-                q_trade |= Q(trade__icontains=term)
-            tradesmen = tradesmen.filter(q_trade)
+        tradesmen = tradesmen.filter(trade_category__in=matching_trade_ids(trade_filter))
 
     if location_filter:
         tradesmen = tradesmen.filter(
@@ -902,6 +958,12 @@ def search_tradesmen(request):
         except ValueError:
             messages.warning(request, 'Invalid rating filter ignored.')
 
+    tradesmen_page = _paginate_tradesmen(request, tradesmen, normalize_filters(
+        query, trade_filter, location_filter, min_rating,
+    ))
+    if _wants_json(request):
+        return _page_json(tradesmen_page, _tradesman_json)
+
     # REF-005: Django ORM - values_list() for favourite IDs (Iteration 4 US 29)
     favourite_tradesman_ids = set()
     if request.user.is_authenticated:
@@ -909,7 +971,8 @@ def search_tradesmen(request):
             Favourite.objects.filter(customer=request.user).values_list('tradesman_id', flat=True)
         )
     return render(request, 'users/search_tradesmen.html', {
-        'tradesmen': tradesmen,
+        'tradesmen': tradesmen_page,
+        'page': tradesmen_page,
         'filters': {
             'q': query,
             'trade': trade_filter,
@@ -952,29 +1015,22 @@ def toggle_favourite(request, tradesman_id):
 # REF-003: Django Views - Function-based views
 # REF-005: Django ORM - filter(), select_related()
 # REF-006: Django Decorators - @login_required
-# REF-022: Django ORM - aggregation (Avg) for rating display
+# REF-022: Ratings read from the maintained TradesmanStats row
 @login_required
 def favourites_list(request):
     profile, _ = Profile.objects.get_or_create(user=request.user, defaults={'role': 'customer'})
     if profile.role != 'customer':
         return JsonResponse({'error': 'Only customers can view favourites'}, status=403)
-    from django.db.models import Avg
+    # Profiles and rating stats come back in the same query as the favourites
     favs = (
-        Favourite.objects.filter(customer=request.user)
-        .select_related('tradesman')
+        Favourite.objects.filter(customer=request.user, tradesman__profile__role='tradesman')
+        .select_related('tradesman__profile', 'tradesman__tradesman_stats')
         .order_by('-created_at')
     )
-    # Get profile and avg rating for each tradesman
-    tradesmen_data = []
-    for fav in favs:
-        try:
-            p = Profile.objects.get(user=fav.tradesman, role='tradesman')
-            avg_rating = JobReview.objects.filter(
-                job_request__job__owner=fav.tradesman
-            ).aggregate(avg=Avg('rating'))['avg']
-            tradesmen_data.append({'profile': p, 'avg_rating': round(avg_rating, 1) if avg_rating else None})
-        except Profile.DoesNotExist:
-            continue
+    tradesmen_data = [
+        {'profile': fav.tradesman.profile, 'avg_rating': fav.tradesman.profile.average_rating}
+        for fav in favs
+    ]
     return render(request, 'users/favourites_list.html', {'tradesmen_data': tradesmen_data})
 
 
@@ -994,7 +1050,8 @@ def post_open_job(request):
         hourly_rate = request.POST.get('hourly_rate')
         trade = request.POST.get('trade', '').strip()
 
-        if not title or not description or not location:
+        # The trade decides which tradesmen see the job on their board
+        if not title or not description or not location or not trade:
             messages.error(request, 'Please fill in all required fields.')
             return render(request, 'users/post_open_job.html')
 
@@ -1004,7 +1061,7 @@ def post_open_job(request):
             location=location,
             hourly_rate=hourly_rate if hourly_rate else None,
             owner=request.user,
-            trade=trade if trade else None,
+            trade=trade,
         )
 
         messages.success(request, 'Your job has been posted to the Open Jobs Board!')
@@ -1015,7 +1072,9 @@ def post_open_job(request):
 
 # Tradesmen can browse all open-ended jobs that customers have posted
 # This is where they can find new work opportunities
+# Reads run on the read replica when one is configured (core/routers.py)
 @login_required
+@replica_reads
 def open_jobs_board(request):
     profile, created = Profile.objects.get_or_create(user=request.user, defaults={'role': 'customer'})
 
@@ -1024,33 +1083,30 @@ def open_jobs_board(request):
 
     location_filter = request.GET.get('location', '').strip()
 
-    # Get all jobs posted by customers (not tradesmen)
-    open_jobs = Job.objects.filter(owner__profile__role='customer').order_by('-date_posted')
-    # If tradesman has a trade specified, only show jobs matching that trade (Iteration 4: term expansion)
-    if profile.trade:
-        terms = _search_terms_for_query(profile.trade)
-        if terms:
-            q_trade = Q()
-            for term in terms:
-                q_trade |= Q(trade__icontains=term)
-            open_jobs = open_jobs.filter(q_trade)
+    # Jobs posted by customers in this tradesman's trade (or every one without a trade), from their feed
+    feed = _open_job_feed(request.user)
 
     # Filter by location if provided
     if location_filter:
-        open_jobs = open_jobs.filter(location__icontains=location_filter)
-
-    # Check which jobs this tradesman has already completed
-    completed_job_ids = set(
-        OpenJobCompletion.objects.filter(tradesman=request.user, status='completed')
-        .values_list('job_id', flat=True)
-    )
-    awaiting_job_ids = set(
-        OpenJobCompletion.objects.filter(tradesman=request.user, status='awaiting_confirmation')
-        .values_list('job_id', flat=True)
-    )
+        feed = feed.filter(job__location__icontains=location_filter)
+
+    open_jobs_page = _paginate(request, feed, OPEN_JOB_SORT_KEYS)
+    open_jobs_page.items, completed_job_ids, awaiting_job_ids = _feed_jobs(open_jobs_page.items)
+    if _wants_json(request):
+        return _page_json(open_jobs_page, lambda job: {
+            'id': job.id,
+            'title': job.title,
+            'description': job.description,
+            'location': job.location,
+            'trade': job.trade,
+            'hourly_rate': str(job.hourly_rate) if job.hourly_rate else None,
+            'date_posted': job.date_posted.isoformat(),
+            'owner': job.owner.username,
+        })
 
     return render(request, 'users/open_jobs_board.html', {
-        'open_jobs': open_jobs,
+        'open_jobs': open_jobs_page,
+        'page': open_jobs_page,
         'completed_job_ids': completed_job_ids,
         'awaiting_job_ids': awaiting_job_ids,
         'location_filter': location_filter,
@@ -1065,30 +1121,75 @@ def open_jobs_board(request):
 # REF-028: ChatGPT - Notification system design
 @login_required
 def notifications(request):
-    notifications_list = Notification.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'users/notifications.html', {'notifications': notifications_list})
+    notifications_page = _paginate(request, Notification.objects.filter(user=request.user), NOTIFICATION_SORT_KEYS)
+    if _wants_json(request):
+        return _page_json(notifications_page, lambda n: {
+            'id': n.id,
+            'notification_type': n.notification_type,
+            'message': n.message,
+            'count': n.count,
+            'is_read': n.is_read,
+            'created_at': n.created_at.isoformat(),
+            'updated_at': n.updated_at.isoformat(),
+            'link': n.link,
+        })
+    return render(request, 'users/notifications.html', {'notifications': notifications_page, 'page': notifications_page})
+
+
+# Live stream of the user's new notifications and unread count (Server-Sent Events)
+# Async so an open stream holds no worker thread when served from core/asgi.py; events
+# come from the per-user channel layer group fed by notification writes (users/live.py)
+# Under WSGI an endless stream would pin a worker per open dashboard, so the response
+# is a single snapshot and the browser polls instead
+# REF-006: Django Decorators - @login_required (async view)
+@login_required
+async def notification_stream(request):
+    user = await request.auser()
+    if not isinstance(request, ASGIRequest):
+        response = HttpResponse(await sync_to_async(poll_snapshot)(user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+    response = StreamingHttpResponse(event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
 
 
 # Mark a notification as read when user clicks on it
 # Also redirects to the link if one is provided
 # REF-003: Django Views - Function-based views
-# REF-005: Django ORM - get() and save() methods
+# REF-005: Django ORM - values() and update() methods
 # REF-006: Django Decorators - @login_required
 # REF-007: Django Messages Framework
 @login_required
 def mark_notification_read(request, notification_id):
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.is_read = True
-        notification.save()
-        
-        # Redirect to the link if provided, otherwise back to notifications
-        if notification.link:
-            return redirect(notification.link)
-        return redirect('notifications')
-    except Notification.DoesNotExist:
+    notification = Notification.objects.filter(id=notification_id, user=request.user)
+    row = notification.values('link').first()
+    if row is None:
         messages.error(request, 'Notification not found.')
         return redirect('dashboard')
+    if notification.filter(is_read=False).update(is_read=True):
+        publish_unread_count(request.user.id)
+
+    # Redirect to the link if provided, otherwise back to notifications
+    if row['link']:
+        return redirect(row['link'])
+    return redirect('notifications')
+
+
+# Mark all of the user's notifications as read with one UPDATE
+# REF-003: Django Views - Function-based views
+# REF-005: Django ORM - update() method
+# REF-006: Django Decorators - @login_required
+@login_required
+@require_http_methods(['POST'])
+def mark_all_notifications_read(request):
+    updated = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    if updated:
+        publish_unread_count(request.user.id)
+    if _wants_json(request):
+        return JsonResponse({'updated': updated})
+    return redirect('notifications')
 
 
 # Tradesman marks an open-ended job as complete (generates confirmation code)
@@ -1131,17 +1232,13 @@ def mark_open_job_complete(request, job_id):
         completion.save()
 
     # Notify customer
-    Notification.objects.create(
-        user=job.owner,
-        notification_type='job_status',
-        message=f'Your open job "{job.title}" has been marked as complete by {request.user.get_full_name() or request.user.username}. Enter the code to verify.',
-        link=f'/api/users/open-job/{job.id}/verify/'
-    )
-    
-    send_notification_email(
+    notify(
         job.owner,
-        f'Job Complete: {job.title}',
-        f'Your open job "{job.title}" has been marked as complete by {request.user.get_full_name() or request.user.username}.\n\nConfirmation code: {completion.confirmation_code}\n\nEnter this code to verify completion and leave a review.'
+        'job_status',
+        f'Your open job "{job.title}" has been marked as complete by {request.user.get_full_name() or request.user.username}. Enter the code to verify.',
+        link=f'/api/users/open-job/{job.id}/verify/',
+        email_subject=f'Job Complete: {job.title}',
+        email_body=f'Your open job "{job.title}" has been marked as complete by {request.user.get_full_name() or request.user.username}.\n\nConfirmation code: {completion.confirmation_code}\n\nEnter this code to verify completion and leave a review.',
     )
 
     return render(request, 'users/open_job_complete.html', {
@@ -1196,28 +1293,19 @@ def verify_open_job_completion(request, job_id):
             # Mark chat as JobDone if one exists between customer and tradesman
             # Iteration 5: Auto-complete chat when open job is verified
             # REF-036: ChatGPT - Chat model with Job Done status (auto-completion)
-            from chat.models import Chat
-            chat = Chat.objects.filter(
-                Q(user1=request.user, user2=completion.tradesman) | Q(user1=completion.tradesman, user2=request.user),
-                status='active'
-            ).first()
+            from chat.messaging import close_chat, find_active_chat
+            chat = find_active_chat(request.user, completion.tradesman)
             if chat:
-                chat.status = 'job_done'
-                chat.completed_at = timezone.now()
-                chat.save()
+                close_chat(chat)
 
             # Notify tradesman
-            Notification.objects.create(
-                user=completion.tradesman,
-                notification_type='job_status',
-                message=f'Your completion of "{job.title}" has been confirmed by {request.user.get_full_name() or request.user.username}.',
-                link=f'/api/users/open-job/{job.id}/review/'
-            )
-
-            send_notification_email(
+            notify(
                 completion.tradesman,
-                f'Job Confirmed: {job.title}',
-                f'Your completion of "{job.title}" has been confirmed by {request.user.get_full_name() or request.user.username}.\n\nThe customer can now leave a review.'
+                'job_status',
+                f'Your completion of "{job.title}" has been confirmed by {request.user.get_full_name() or request.user.username}.',
+                link=f'/api/users/open-job/{job.id}/review/',
+                email_subject=f'Job Confirmed: {job.title}',
+                email_body=f'Your completion of "{job.title}" has been confirmed by {request.user.get_full_name() or request.user.username}.\n\nThe customer can now leave a review.',
             )
 
             messages.success(request, 'Job confirmed! Please leave a review for the tradesman.')
@@ -1250,13 +1338,10 @@ def submit_open_job_review(request, job_id, tradesman_id):
     except (Job.DoesNotExist, User.DoesNotExist, OpenJobCompletion.DoesNotExist):
         return JsonResponse({'error': 'Job, tradesman, or completion not found'}, status=404)
 
-    # Check if review already exists - look for JobRequest created for tradesman's job
-    tradesman_job = Job.objects.filter(owner=tradesman, title__startswith=f"Completed: {job.title}").first()
-    if tradesman_job:
-        existing_request = JobRequest.objects.filter(job=tradesman_job, customer=request.user).first()
-        if existing_request and hasattr(existing_request, 'review'):
-            messages.info(request, 'You have already submitted a review for this job.')
-            return redirect('dashboard')
+    # Check if review already exists - the review hangs directly off the completion
+    if JobReview.objects.filter(completion=completion).exists():
+        messages.info(request, 'You have already submitted a review for this job.')
+        return redirect('dashboard')
 
     if request.method == 'POST':
         try:
@@ -1266,38 +1351,22 @@ def submit_open_job_review(request, job_id, tradesman_id):
 
         comment = request.POST.get('comment', '').strip()
         photo = request.FILES.get('photo')
+        upload_problems = upload_errors(request) + check_images([photo] if photo else [])
 
         if rating is None or rating < 1 or rating > 5:
             messages.error(request, 'Please provide a rating between 1 and 5.')
+        elif upload_problems:
+            for problem in upload_problems:
+                messages.error(request, problem)
         else:
             # Create review for open job completion
-            # Create a JobRequest linking customer to a job owned by the tradesman (for review system)
-            # First, get or create a job owned by the tradesman for this review
-            tradesman_job, _ = Job.objects.get_or_create(
-                owner=tradesman,
-                title=f"Completed: {job.title}",
-                defaults={
-                    'description': f'Completed open job: {job.description}',
-                    'location': job.location,
-                    'trade': job.trade,
-                }
+            # The OneToOne on completion stops a second review for the same completion
+            review, created = JobReview.objects.get_or_create(
+                completion=completion,
+                defaults={'rating': rating, 'comment': comment, 'photo': photo},
             )
-            
-            # Create JobRequest so review can be linked (customer requests tradesman's service)
-            job_request, _ = JobRequest.objects.get_or_create(
-                job=tradesman_job,
-                customer=request.user,
-                defaults={'message': f'Completed open job: {job.title}', 'status': 'completed'}
-            )
-            
-            # Only create review if one doesn't exist
-            if not hasattr(job_request, 'review'):
-                JobReview.objects.create(
-                    job_request=job_request,
-                    rating=rating,
-                    comment=comment,
-                    photo=photo,
-                )
+            if created:
+                process_uploads_on_commit([review.photo])
                 messages.success(request, 'Thank you for leaving a review!')
             else:
                 messages.info(request, 'You have already reviewed this job.')